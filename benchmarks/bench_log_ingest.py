@@ -0,0 +1,125 @@
+"""Micro-benchmark: solana-py notification parsing vs raw JSON frame ingest.
+
+Usage: python benchmarks/bench_log_ingest.py [--messages N] [--create-ratio R] [--error-ratio R]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solders.rpc.responses import parse_websocket_message
+from log_decoder import matches_new_token
+from subscriptions import loads
+
+# Typical pump.fun buy/sell log shape with an optional create
+TRADE_LOGS = [
+    "Program ComputeBudget111111111111111111111111111111 invoke [1]",
+    "Program ComputeBudget111111111111111111111111111111 success",
+    "Program 6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P invoke [1]",
+    "Program log: Instruction: Buy",
+    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA invoke [2]",
+    "Program log: Instruction: Transfer",
+    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA consumed 4645 of 53412 compute units",
+    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA success",
+    "Program data: vdt/007mYe4AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA",
+    "Program 6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P consumed 34121 of 80000 compute units",
+    "Program 6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P success",
+]
+CREATE_LOGS = TRADE_LOGS[:3] + [
+    "Program log: Instruction: Create",
+    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA invoke [2]",
+    "Program log: Instruction: InitializeMint2",
+    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA success",
+] + TRADE_LOGS[8:]
+
+def build_frames(count, create_ratio, error_ratio, seed=7):
+    rng = random.Random(seed)
+    frames = []
+    for index in range(count):
+        is_create = rng.random() < create_ratio
+        failed = rng.random() < error_ratio
+        frames.append(json.dumps({
+            "jsonrpc": "2.0",
+            "method": "logsNotification",
+            "params": {
+                "result": {
+                    "context": {"slot": 250_000_000 + index},
+                    "value": {
+                        "signature": f"{index:0>88}",
+                        "err": {"InstructionError": [2, {"Custom": 6002}]} if failed else None,
+                        "logs": CREATE_LOGS if is_create else TRADE_LOGS,
+                    },
+                },
+                "subscription": 1,
+            },
+        }))
+    return frames
+
+def legacy_path(frames):
+    """The original monitor_program path: parse into models, lower() every log line."""
+    matched = 0
+    for frame in frames:
+        for message in parse_websocket_message(frame):
+            value = message.result.value
+            for log in value.logs:
+                trigger = "initialize"
+                if trigger in log.lower():
+                    matched += 1
+                    break
+    return matched
+
+def raw_path(frames):
+    """The raw ingest path: fast JSON decode, skip failed transactions, precompiled matcher."""
+    matched = 0
+    for frame in frames:
+        value = loads(frame)["params"]["result"]["value"]
+        if value["err"] is not None:
+            continue
+        if matches_new_token("pumpfun", value["logs"]):
+            matched += 1
+    return matched
+
+def bench(fn, frames, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(frames)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--create-ratio", type=float, default=0.05)
+    parser.add_argument("--error-ratio", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    frames = build_frames(args.messages, args.create_ratio, args.error_ratio)
+    legacy_seconds, legacy_matched = bench(legacy_path, frames, args.repeat)
+    raw_seconds, raw_matched = bench(raw_path, frames, args.repeat)
+    results = {
+        "messages": args.messages,
+        "decoder": loads.__module__,
+        "legacy_us_per_message": legacy_seconds / args.messages * 1e6,
+        "raw_us_per_message": raw_seconds / args.messages * 1e6,
+        "speedup": legacy_seconds / raw_seconds if raw_seconds else None,
+        "legacy_matched": legacy_matched,
+        "raw_matched": raw_matched,
+    }
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"messages:            {results['messages']} (decoder: {results['decoder']})")
+    print(f"legacy (solana-py):  {results['legacy_us_per_message']:.2f} us/message, {legacy_matched} matched")
+    print(f"raw (precompiled):   {results['raw_us_per_message']:.2f} us/message, {raw_matched} matched")
+    print(f"speedup:             {results['speedup']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""End-to-end replay benchmark: recorded logsSubscribe streams through monitor_new_tokens.
+
+The stream is served by local stand-ins for every external endpoint (see standins.py),
+running in their own process, and the results are written as JSON so runs on different
+commits can be compared.
+
+Usage:
+    python benchmarks/replay.py record --output stream.jsonl [--seconds 600]
+    python benchmarks/replay.py synthesize --output stream.jsonl [--creates 1000] [--trades-per-create 20]
+    python benchmarks/replay.py run stream.jsonl [--speed 0] [--latency rpc=0.02] [--error-rate telegram=0.01]
+                                                 [--env KEY=VALUE] [--output results.json]
+    python benchmarks/replay.py compare baseline.json results.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import random
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Stand-in services, as named in --latency and --error-rate
+SERVICES = ("rpc", "ws", "dexscreener", "rugcheck", "pumpfun", "telegram")
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def latency_summary(values):
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.5) * 1000 if values else None,
+        "p99_ms": percentile(values, 0.99) * 1000 if values else None,
+        "max_ms": max(values) * 1000 if values else None,
+    }
+
+def rss_bytes():
+    """Current resident set size (Linux), falling back to the peak reported by getrusage."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_service_values(pairs, name):
+    values = {}
+    for pair in pairs or []:
+        service, _, value = pair.partition("=")
+        if service not in SERVICES:
+            raise SystemExit(f"Unknown service in {name}: {service} (expected one of {', '.join(SERVICES)})")
+        values[service] = float(value)
+    return values
+
+# Recording and synthesis
+
+async def record(endpoint, output, seconds):
+    """Write raw pump.fun and Raydium log notifications from a live endpoint with their arrival offsets."""
+    import websockets
+    from config import PUMP_FUN_PROGRAM_ID, RAYDIUM_PROGRAM_ID
+
+    programs = {PUMP_FUN_PROGRAM_ID: "pumpfun", RAYDIUM_PROGRAM_ID: "raydium"}
+    platforms = {}
+    written = 0
+    async with websockets.connect(endpoint, ping_interval=20, max_size=None) as ws:
+        for request_id, program_id in enumerate(programs, 1):
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "logsSubscribe",
+                "params": [{"mentions": [program_id]}, {"commitment": "confirmed"}],
+            }))
+        started = time.monotonic()
+        with open(output, "w", encoding="utf-8") as out:
+            while time.monotonic() - started < seconds:
+                try:
+                    frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=1))
+                except asyncio.TimeoutError:
+                    continue
+                if "id" in frame and "result" in frame:
+                    platforms[frame["result"]] = programs[list(programs)[frame["id"] - 1]]
+                    continue
+                params = frame.get("params")
+                if not params or params["subscription"] not in platforms:
+                    continue
+                value = params["result"]["value"]
+                out.write(json.dumps({
+                    "t": round(time.monotonic() - started, 6),
+                    "platform": platforms[params["subscription"]],
+                    "signature": value["signature"],
+                    "err": value["err"],
+                    "logs": value["logs"],
+                }) + "\n")
+                written += 1
+    print(f"Recorded {written} notifications in {seconds}s to {output}")
+
+def synthesize(output, creates, trades_per_create, create_rate, repeat_creator_ratio, seed):
+    """Generate a pump.fun stream of creates with dev buys followed by trades on the same curves."""
+    from solders.signature import Signature
+    from log_decoder import PUMP_CREATE_EVENT_DISCRIMINATOR, PUMP_TRADE_EVENT_DISCRIMINATOR, PUMP_TRADE_EVENT_LAYOUT
+    from pumpfun import INITIAL_VIRTUAL_TOKEN_RESERVES, INITIAL_VIRTUAL_SOL_RESERVES, LAMPORTS_PER_SOL
+    from config import PUMP_FUN_PROGRAM_ID
+
+    rng = random.Random(seed)
+    invoke = f"Program {PUMP_FUN_PROGRAM_ID} invoke [1]"
+    success = f"Program {PUMP_FUN_PROGRAM_ID} success"
+
+    def borsh_string(value):
+        encoded = value.encode()
+        return struct.pack("<I", len(encoded)) + encoded
+
+    def program_data(data):
+        return "Program data: " + base64.b64encode(data).decode()
+
+    def signature():
+        return str(Signature(rng.randbytes(64)))
+
+    frames = []
+    creators = []
+    for index in range(creates):
+        t = index / create_rate
+        mint = rng.randbytes(32)
+        if creators and rng.random() < repeat_creator_ratio:
+            creator = rng.choice(creators)
+        else:
+            creator = rng.randbytes(32)
+            creators.append(creator)
+        virtual_sol = INITIAL_VIRTUAL_SOL_RESERVES
+        k = INITIAL_VIRTUAL_TOKEN_RESERVES * INITIAL_VIRTUAL_SOL_RESERVES
+
+        def trade(sol_amount, timestamp):
+            nonlocal virtual_sol
+            virtual_token = k // virtual_sol
+            virtual_sol = max(INITIAL_VIRTUAL_SOL_RESERVES, virtual_sol + sol_amount)
+            return PUMP_TRADE_EVENT_DISCRIMINATOR + PUMP_TRADE_EVENT_LAYOUT.pack(
+                mint, abs(sol_amount), abs(virtual_token - k // virtual_sol), sol_amount > 0, rng.randbytes(32),
+                timestamp, virtual_sol, k // virtual_sol,
+            )
+
+        create = PUMP_CREATE_EVENT_DISCRIMINATOR + borsh_string(f"Replay {index}") + borsh_string(f"RP{index}") \
+            + borsh_string(f"https://example.invalid/{index}.json") + mint + rng.randbytes(32) + creator
+        # Dev buys between 0.1 and 10 SOL, so liquidity lands on both sides of MIN_LIQUIDITY_USD
+        dev_buy = int(10 ** rng.uniform(-1, 1) * LAMPORTS_PER_SOL)
+        frames.append({"t": t, "platform": "pumpfun", "signature": signature(), "err": None, "logs": [
+            invoke, "Program log: Instruction: Create", program_data(create), success,
+            invoke, "Program log: Instruction: Buy", program_data(trade(dev_buy, int(t))), success,
+        ]})
+        trade_t = t
+        for _ in range(trades_per_create):
+            trade_t += rng.expovariate(1.0)
+            sol_amount = int(rng.uniform(-0.5, 1) * LAMPORTS_PER_SOL)
+            frames.append({"t": trade_t, "platform": "pumpfun", "signature": signature(), "err": None, "logs": [
+                invoke, "Program log: Instruction: Buy" if sol_amount > 0 else "Program log: Instruction: Sell",
+                program_data(trade(sol_amount, int(trade_t))), success,
+            ]})
+    frames.sort(key=lambda frame: frame["t"])
+    with open(output, "w", encoding="utf-8") as out:
+        for frame in frames:
+            frame["t"] = round(frame["t"], 6)
+            out.write(json.dumps(frame) + "\n")
+    print(f"Wrote {len(frames)} notifications ({creates} creates) spanning {frames[-1]['t']:.0f}s to {output}")
+
+# Replay
+
+def bot_environment(port, workdir, overrides):
+    base = f"http://127.0.0.1:{port}"
+    env = {
+        "RPC_ENDPOINT": f"{base}/rpc",
+        "RPC_SEND_ENDPOINTS": f"{base}/rpc",
+        "RPC_WEBSOCKET_ENDPOINT": f"ws://127.0.0.1:{port}/ws",
+        "RPC_WEBSOCKET_ENDPOINTS": f"ws://127.0.0.1:{port}/ws",
+        "DEXSCREENER_API_URL": f"{base}/dexscreener",
+        "RUGCHECK_API_URL": f"{base}/rugcheck",
+        "PUMP_FUN_API_URL": f"{base}/pumpfun",
+        "RAYDIUM_API_URL": f"{base}/raydium",
+        "TELEGRAM_API_URL": f"{base}/telegram",
+        "TELEGRAM_BOT_TOKEN": "replay",
+        "TELEGRAM_CHAT_ID": "1000",
+        "SUBSCRIBERS_FILE": os.path.join(workdir, "subscribers.log"),
+        "CREATOR_INDEX_PATH": os.path.join(workdir, "creators.db"),
+        "JOURNAL_PATH": os.path.join(workdir, "trades.db"),
+        "METRICS_PORT": "0",
+        "METRICS_TRACE_FILE": "",
+        "INGEST_STATS_INTERVAL_SECONDS": "86400",
+    }
+    for pair in overrides or []:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+async def drive(args, replay_done, memory):
+    """Run monitor_new_tokens against the stand-ins until the stream is replayed and the bot is idle."""
+    import metrics
+    import utils
+    from creator_index import close_creator_index
+    from subscribers import close_subscribers
+    from curve_state import curve_table
+    from http_client import close_session
+    from telegram_dispatcher import telegram
+
+    counts = {"notifications": 0, "passed": 0, "in_flight": 0, "handled": 0}
+    queues = []
+    monitor_program = utils.monitor_program
+    process_log_event = utils.process_log_event
+
+    class ObservedIngestQueue(utils.IngestQueue):
+        def __init__(self, *queue_args, **queue_kwargs):
+            super().__init__(*queue_args, **queue_kwargs)
+            queues.append(self)
+
+    def observed_monitor_program(*call_args, **call_kwargs):
+        counts["notifications"] += 1
+        return monitor_program(*call_args, **call_kwargs)
+
+    async def observed_process_log_event(*call_args, **call_kwargs):
+        counts["in_flight"] += 1
+        try:
+            return await process_log_event(*call_args, **call_kwargs)
+        finally:
+            counts["in_flight"] -= 1
+            counts["handled"] += 1
+
+    # Counting wrappers only; the code under test is unchanged
+    utils.IngestQueue = ObservedIngestQueue
+    utils.monitor_program = observed_monitor_program
+    utils.process_log_event = observed_process_log_event
+
+    async def handle_new_token(token_address, chat_id, platform="pumpfun", verdict=None):
+        # Stands in for main.handle_new_token without the buy, which needs a funded wallet
+        counts["passed"] += 1
+        await utils.send_token_notification(token_address, chat_id, platform)
+
+    def idle():
+        queue_idle = all(not queue.stats()["depth"] for queue in queues)
+        dispatcher = telegram.stats()
+        return queue_idle and not counts["in_flight"] and not dispatcher["depth"] and not dispatcher["in_flight"]
+
+    async def sample_memory():
+        while True:
+            memory.append((time.monotonic(), counts["notifications"], rss_bytes()))
+            await asyncio.sleep(args.memory_interval)
+
+    telegram.start()
+    await curve_table.refresh_sol_price()
+    curve_table.start()
+    memory_task = asyncio.create_task(sample_memory())
+    monitor_task = asyncio.create_task(utils.monitor_new_tokens(handle_new_token, os.environ["TELEGRAM_CHAT_ID"]))
+    last_busy_at = None
+    deadline = None
+    timed_out = False
+    while True:
+        await asyncio.sleep(0.05)
+        if monitor_task.done():
+            monitor_task.result()
+        if not replay_done.is_set():
+            continue
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + args.drain_timeout
+            last_busy_at = now
+        if not idle():
+            last_busy_at = now
+        # Idle long enough for replies chained on delivered alerts to have been queued
+        if now - last_busy_at >= args.settle:
+            break
+        if now >= deadline:
+            timed_out = True
+            break
+    drained_at = last_busy_at
+    monitor_task.cancel()
+    memory_task.cancel()
+    await asyncio.gather(monitor_task, memory_task, return_exceptions=True)
+    memory.append((time.monotonic(), counts["notifications"], rss_bytes()))
+    await curve_table.stop()
+    await telegram.stop(drain_timeout=0)
+    await close_creator_index()
+    close_subscribers()
+    await close_session()
+    return {
+        "counts": counts,
+        "drained_at": drained_at,
+        "timed_out": timed_out,
+        "ingest": queues[0].stats() if queues else None,
+        "telegram": telegram.stats(),
+        "curve_table": curve_table.stats(),
+        "stages": metrics.snapshot(),
+    }
+
+def memory_summary(samples):
+    if not samples:
+        return None
+    rss = [sample[2] for sample in samples]
+    summary = {"rss_start_bytes": rss[0], "rss_end_bytes": rss[-1], "rss_peak_bytes": max(rss), "growth_bytes": rss[-1] - rss[0]}
+    # Least-squares slope of RSS over notifications handled, so idle drain time does not count
+    n = len(samples)
+    mean_x = sum(sample[1] for sample in samples) / n
+    mean_y = sum(rss) / n
+    var_x = sum((sample[1] - mean_x) ** 2 for sample in samples)
+    if var_x:
+        slope = sum((sample[1] - mean_x) * (sample[2] - mean_y) for sample in samples) / var_x
+        summary["growth_bytes_per_1k_notifications"] = slope * 1000
+    return summary
+
+def run(args):
+    workdir = tempfile.TemporaryDirectory()
+    # Set before any of the bot's modules are imported, since config reads the environment once
+    os.environ.update(bot_environment(args.port, workdir.name, args.env))
+    import standins
+
+    context = multiprocessing.get_context("spawn")
+    ready, replay_done = context.Event(), context.Event()
+    parent, child = context.Pipe()
+    options = {
+        "speed": args.speed,
+        "latency": parse_service_values(args.latency, "--latency"),
+        "error_rate": parse_service_values(args.error_rate, "--error-rate"),
+        "sol_usd": args.sol_usd,
+        "top10_percent": args.top10_percent,
+        "rug_ratio": args.rug_ratio,
+        "seed": args.seed,
+    }
+    server = context.Process(target=standins.serve, args=(args.port, args.stream, options, ready, replay_done, child), daemon=True)
+    server.start()
+    if not ready.wait(30):
+        raise SystemExit("Stand-ins did not start")
+
+    memory = []
+    stdout = sys.stdout
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        bot = asyncio.run(drive(args, replay_done, memory))
+    finally:
+        if args.quiet:
+            sys.stdout.close()
+            sys.stdout = stdout
+        workdir.cleanup()
+    parent.send("results")
+    served = parent.recv()
+    server.join(5)
+
+    sent_at, delivered_at = served["sent_at"], served["delivered_at"]
+    detection_to_send = [delivered_at[mint] - sent_at[mint] for mint in delivered_at if mint in sent_at]
+    started, finished = served["replay_started_at"], served["replay_finished_at"]
+    busy_seconds = (bot["drained_at"] or finished) - started
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "stream": os.path.abspath(args.stream),
+        "options": {**options, "env": args.env or []},
+        "frames_sent": served["frames_sent"],
+        "frames_lost": served["frames_lost"],
+        "creates_sent": len(sent_at),
+        "replay_seconds": finished - started,
+        "busy_seconds": busy_seconds,
+        "events_per_second": bot["counts"]["notifications"] / busy_seconds if busy_seconds > 0 else None,
+        "notifications_received": bot["counts"]["notifications"],
+        "tokens_handled": bot["counts"]["handled"],
+        "tokens_passed": bot["counts"]["passed"],
+        "tokens_notified": len(detection_to_send),
+        "drain_timed_out": bot["timed_out"],
+        "detection_to_send": latency_summary(detection_to_send),
+        "memory": memory_summary(memory),
+        "stages": bot["stages"],
+        "ingest": bot["ingest"],
+        "telegram": bot["telegram"],
+        "curve_table": bot["curve_table"],
+        "stand_in_requests": served["requests"],
+        "injected_errors": served["injected_errors"],
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+    print(text)
+
+# Comparison
+
+HEADLINE_METRICS = [
+    ("events_per_second", lambda r: r["events_per_second"], True),
+    ("detection_to_send.p50_ms", lambda r: r["detection_to_send"]["p50_ms"], False),
+    ("detection_to_send.p99_ms", lambda r: r["detection_to_send"]["p99_ms"], False),
+    ("memory.growth_bytes", lambda r: (r["memory"] or {}).get("growth_bytes"), False),
+    ("memory.rss_peak_bytes", lambda r: (r["memory"] or {}).get("rss_peak_bytes"), False),
+    ("tokens_notified", lambda r: r["tokens_notified"], True),
+]
+
+def compare(baseline_path, results_path):
+    with open(baseline_path, encoding="utf-8") as baseline_file, open(results_path, encoding="utf-8") as results_file:
+        baseline, results = json.load(baseline_file), json.load(results_file)
+    print(f"baseline: {baseline.get('commit')}  results: {results.get('commit')}")
+    for name, get, higher_is_better in HEADLINE_METRICS:
+        old, new = get(baseline), get(results)
+        if old is None or new is None:
+            print(f"{name:<28} {old!s:>14} {new!s:>14}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = (change > 0) == higher_is_better if change else None
+        verdict = "" if better is None else ("better" if better else "worse")
+        print(f"{name:<28} {old:>14.2f} {new:>14.2f} {change:>+8.1f}% {verdict}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="record live pump.fun and Raydium log notifications")
+    record_parser.add_argument("--endpoint", help="websocket endpoint (default: RPC_WEBSOCKET_ENDPOINT)")
+    record_parser.add_argument("--seconds", type=float, default=600)
+    record_parser.add_argument("--output", required=True)
+
+    synth_parser = commands.add_parser("synthesize", help="generate a pump.fun stream without network access")
+    synth_parser.add_argument("--creates", type=int, default=1000)
+    synth_parser.add_argument("--trades-per-create", type=int, default=20)
+    synth_parser.add_argument("--create-rate", type=float, default=2.0, help="creates per second of stream time")
+    synth_parser.add_argument("--repeat-creator-ratio", type=float, default=0.1)
+    synth_parser.add_argument("--seed", type=int, default=7)
+    synth_parser.add_argument("--output", required=True)
+
+    run_parser = commands.add_parser("run", help="replay a stream through monitor_new_tokens")
+    run_parser.add_argument("stream")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier; 0 sends as fast as possible")
+    run_parser.add_argument("--latency", action="append", metavar="SERVICE=SECONDS", help="mean latency per stand-in service")
+    run_parser.add_argument("--error-rate", action="append", metavar="SERVICE=RATIO", help="injected error ratio per service")
+    run_parser.add_argument("--env", action="append", metavar="KEY=VALUE", help="bot configuration override")
+    run_parser.add_argument("--sol-usd", type=float, default=150.0)
+    run_parser.add_argument("--top10-percent", type=float, default=30.0, help="share of supply the stand-in RPC gives the top 10 holders")
+    run_parser.add_argument("--rug-ratio", type=float, default=0.1, help="share of mints RugCheck flags")
+    run_parser.add_argument("--seed", type=int, default=7)
+    run_parser.add_argument("--port", type=int, default=18899)
+    run_parser.add_argument("--settle", type=float, default=1.0, help="seconds the bot must stay idle after the replay")
+    run_parser.add_argument("--drain-timeout", type=float, default=120.0)
+    run_parser.add_argument("--memory-interval", type=float, default=1.0)
+    run_parser.add_argument("--quiet", action="store_true", help="silence the bot's own output")
+    run_parser.add_argument("--output")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        from config import RPC_WEBSOCKET_ENDPOINT
+        asyncio.run(record(args.endpoint or RPC_WEBSOCKET_ENDPOINT, args.output, args.seconds))
+    elif args.command == "synthesize":
+        synthesize(args.output, args.creates, args.trades_per_create, args.create_rate, args.repeat_creator_ratio, args.seed)
+    elif args.command == "run":
+        run(args)
+    else:
+        compare(args.baseline, args.results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Local stand-ins for the RPC/websocket, DexScreener, RugCheck, pump.fun and Telegram endpoints.
+
+Everything is served from one aiohttp app under a path prefix per service:
+
+    /rpc          Solana JSON-RPC (the methods the bot calls)
+    /ws           logsSubscribe websocket replaying a recorded stream
+    /dexscreener  DexScreener token pairs (only wrapped SOL is priced)
+    /rugcheck     RugCheck token reports
+    /pumpfun      pump.fun token and DEX-paid status
+    /telegram     Telegram Bot API methods
+
+Each service gets a configurable mean latency (jittered +/-50%) and error rate. Times
+are taken with time.monotonic(), which on Linux is one clock shared by every process,
+so the replay driver can compare them with its own.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import WSMsgType, web
+from log_decoder import WSOL_MINT, decode_pump_logs
+from pumpfun import (
+    BONDING_CURVE_LAYOUT,
+    PUMP_FUN_PROGRAM,
+    INITIAL_VIRTUAL_TOKEN_RESERVES,
+    INITIAL_VIRTUAL_SOL_RESERVES,
+    INITIAL_REAL_TOKEN_RESERVES,
+    TOKEN_TOTAL_SUPPLY,
+    TOKEN_DECIMALS,
+)
+from config import PUMP_FUN_PROGRAM_ID, RAYDIUM_PROGRAM_ID
+
+from replay import SERVICES
+PLATFORMS = {PUMP_FUN_PROGRAM_ID: "pumpfun", RAYDIUM_PROGRAM_ID: "raydium"}
+MINT_IN_TEXT = re.compile(r"`([1-9A-HJ-NP-Za-km-z]{32,44})`")
+
+def load_stream(path):
+    """Read a recorded stream: one {"t", "platform", "signature", "err", "logs"} object per line."""
+    frames = []
+    with open(path, encoding="utf-8") as lines:
+        for line in lines:
+            line = line.strip()
+            if line:
+                frames.append(json.loads(line))
+    frames.sort(key=lambda frame: frame["t"])
+    return frames
+
+class StandIns:
+    """State and handlers of the stand-in services for one replay run."""
+
+    def __init__(self, frames, speed=1.0, latency=None, error_rate=None, sol_usd=150.0,
+                 top10_percent=30.0, rug_ratio=0.1, seed=7):
+        self.frames = frames
+        self.speed = speed
+        self.latency = latency or {}
+        self.error_rate = error_rate or {}
+        self.sol_usd = sol_usd
+        self.top10_percent = top10_percent
+        self.rug_ratio = rug_ratio
+        self.rng = random.Random(seed)
+        self.transactions = {frame["signature"]: frame["transaction"] for frame in frames if frame.get("transaction")}
+        self.requests = dict.fromkeys(SERVICES, 0)
+        self.errors = dict.fromkeys(SERVICES, 0)
+        self.sent_at = {}  # mint -> time its create was due on the wire
+        self.delivered_at = {}  # mint -> time Telegram first received a message naming it
+        self.frames_sent = 0
+        self.frames_lost = 0
+        self.replay_started_at = None
+        self.replay_finished_at = None
+        self.telegram_messages = 0
+        self._ws = None
+        self._subscriptions = {}  # platform -> subscription id on the current connection
+        self._next_subscription = 1
+        self._replay_task = None
+        self._message_id = 0
+
+    def _delay(self, service):
+        mean = self.latency.get(service, 0)
+        return mean * self.rng.uniform(0.5, 1.5) if mean else 0
+
+    def _fail(self, service):
+        return self.rng.random() < self.error_rate.get(service, 0)
+
+    @web.middleware
+    async def inject(self, request, handler):
+        service = request.path.split("/")[1]
+        if service not in self.requests or service == "ws":
+            return await handler(request)
+        self.requests[service] += 1
+        delay = self._delay(service)
+        if delay:
+            await asyncio.sleep(delay)
+        if self._fail(service):
+            self.errors[service] += 1
+            return web.json_response({"ok": False, "error_code": 500, "description": "Injected error"}, status=500)
+        return await handler(request)
+
+    # Solana JSON-RPC
+
+    def _curve_account(self):
+        data = BONDING_CURVE_LAYOUT.pack(
+            bytes(8), INITIAL_VIRTUAL_TOKEN_RESERVES, INITIAL_VIRTUAL_SOL_RESERVES,
+            INITIAL_REAL_TOKEN_RESERVES, 0, TOKEN_TOTAL_SUPPLY, False,
+        )
+        return {
+            "data": [base64.b64encode(data).decode(), "base64"],
+            "executable": False,
+            "lamports": 1_000_000,
+            "owner": str(PUMP_FUN_PROGRAM),
+            "rentEpoch": 0,
+            "space": len(data),
+        }
+
+    def _token_amount(self, amount):
+        ui_amount = amount / 10 ** TOKEN_DECIMALS
+        return {"amount": str(amount), "decimals": TOKEN_DECIMALS, "uiAmount": ui_amount, "uiAmountString": str(ui_amount)}
+
+    def _rpc_result(self, method, params):
+        context = {"slot": 300_000_000}
+        if method == "getAccountInfo":
+            return {"context": context, "value": self._curve_account()}
+        if method == "getMultipleAccounts":
+            return {"context": context, "value": [self._curve_account() for _ in params[0]]}
+        if method == "getTokenLargestAccounts":
+            # Ten holders share top10_percent of the supply, ten more hold crumbs
+            top = int(TOKEN_TOTAL_SUPPLY * self.top10_percent / 100 / 10)
+            amounts = [top] * 10 + [top // 100] * 10
+            return {"context": context, "value": [
+                {"address": str(PUMP_FUN_PROGRAM), **self._token_amount(amount)} for amount in amounts
+            ]}
+        if method == "getTokenSupply":
+            return {"context": context, "value": self._token_amount(TOKEN_TOTAL_SUPPLY)}
+        if method == "getTransaction":
+            return self.transactions.get(params[0])
+        if method == "getLatestBlockhash":
+            return {"context": context, "value": {"blockhash": "11111111111111111111111111111111", "lastValidBlockHeight": 300_000_150}}
+        if method == "getBalance":
+            return {"context": context, "value": 100 * 10 ** 9}
+        if method == "getSignatureStatuses":
+            return {"context": context, "value": [
+                {"slot": context["slot"], "confirmations": None, "err": None, "confirmationStatus": "confirmed"} for _ in params[0]
+            ]}
+        if method == "getRecentPrioritizationFees":
+            return [{"slot": context["slot"], "prioritizationFee": 50_000}]
+        if method == "sendTransaction":
+            return "1" * 88
+        raise KeyError(method)
+
+    async def handle_rpc(self, request):
+        body = await request.json()
+        batch = body if isinstance(body, list) else [body]
+        responses = []
+        for call in batch:
+            try:
+                responses.append({"jsonrpc": "2.0", "id": call.get("id"), "result": self._rpc_result(call["method"], call.get("params") or [])})
+            except KeyError:
+                responses.append({"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "Method not found"}})
+        return web.json_response(responses if isinstance(body, list) else responses[0])
+
+    # logsSubscribe websocket
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self.requests["ws"] += 1
+        subscriptions = {}
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            call = json.loads(message.data)
+            if call.get("method") != "logsSubscribe":
+                continue
+            program = call["params"][0]["mentions"][0]
+            subscription = self._next_subscription
+            self._next_subscription += 1
+            subscriptions[PLATFORMS.get(program, program)] = subscription
+            await ws.send_str(json.dumps({"jsonrpc": "2.0", "result": subscription, "id": call["id"]}))
+            # Frames go to a connection once it is subscribed to both programs, as on a real node
+            if "pumpfun" in subscriptions and "raydium" in subscriptions:
+                self._ws, self._subscriptions = ws, subscriptions
+                if self._replay_task is None:
+                    self._replay_task = asyncio.create_task(self._replay())
+        if self._ws is ws:
+            self._ws = None
+        return ws
+
+    def _notification(self, frame, index):
+        return json.dumps({
+            "jsonrpc": "2.0",
+            "method": "logsNotification",
+            "params": {
+                "result": {
+                    "context": {"slot": 300_000_000 + index},
+                    "value": {"signature": frame["signature"], "err": frame.get("err"), "logs": frame["logs"]},
+                },
+                "subscription": self._subscriptions.get(frame["platform"], 0),
+            },
+        })
+
+    async def _replay(self):
+        """Send every frame at its recorded offset divided by speed (speed 0: as fast as possible)."""
+        started = self.replay_started_at = time.monotonic()
+        for index, frame in enumerate(self.frames):
+            due = started + frame["t"] / self.speed if self.speed else time.monotonic()
+            delay = self._delay("ws")
+            wait = due + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            elif index % 100 == 0:
+                await asyncio.sleep(0)
+            mint = frame.get("mint")
+            if mint and mint not in self.sent_at:
+                self.sent_at[mint] = due
+            ws = self._ws
+            if ws is None or ws.closed:
+                self.frames_lost += 1
+                continue
+            if self._fail("ws"):
+                # An injected websocket error drops the connection; the bot has to resubscribe
+                self.errors["ws"] += 1
+                self.frames_lost += 1
+                await ws.close()
+                continue
+            await ws.send_str(self._notification(frame, index))
+            self.frames_sent += 1
+        self.replay_finished_at = time.monotonic()
+
+    # HTTP APIs
+
+    async def handle_dexscreener(self, request):
+        mints = request.match_info["mints"].split(",")
+        pairs = []
+        if WSOL_MINT in mints:
+            pairs.append({
+                "chainId": "solana",
+                "baseToken": {"address": WSOL_MINT, "name": "Wrapped SOL", "symbol": "SOL"},
+                "quoteToken": {"address": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v", "symbol": "USDC"},
+                "priceUsd": str(self.sol_usd),
+                "liquidity": {"usd": 10_000_000},
+            })
+        # Bonding-curve tokens have no DexScreener pair yet
+        return web.json_response({"schemaVersion": "1.0.0", "pairs": pairs or None})
+
+    async def handle_rugcheck(self, request):
+        mint = request.match_info["mint"]
+        # Deterministic per mint, so a token is flagged the same way on every lookup
+        flagged = hashlib.sha256(mint.encode()).digest()[0] / 256 < self.rug_ratio
+        return web.json_response({"mint": mint, "risk_score": 80 if flagged else 5})
+
+    async def handle_pumpfun_status(self, request):
+        return web.json_response({"mint": request.match_info["mint"], "dex_paid": False})
+
+    async def handle_telegram(self, request):
+        method = request.match_info["method"]
+        payload = await request.json() if request.can_read_body else {}
+        if method in ("sendMessage", "sendPhoto"):
+            self.telegram_messages += 1
+            now = time.monotonic()
+            for mint in MINT_IN_TEXT.findall(payload.get("text") or payload.get("caption") or ""):
+                self.delivered_at.setdefault(mint, now)
+        self._message_id += 1
+        return web.json_response({"ok": True, "result": {"message_id": self._message_id, "chat": {"id": payload.get("chat_id")}}})
+
+    def app(self):
+        app = web.Application(middlewares=[self.inject], client_max_size=16 * 1024 ** 2)
+        app.router.add_post("/rpc", self.handle_rpc)
+        app.router.add_get("/ws", self.handle_ws)
+        app.router.add_get("/dexscreener/latest/dex/tokens/{mints}", self.handle_dexscreener)
+        app.router.add_get("/rugcheck/v1/tokens/{mint}/report", self.handle_rugcheck)
+        app.router.add_get("/pumpfun/tokens/{mint}/status", self.handle_pumpfun_status)
+        app.router.add_post("/telegram/{bot}/{method}", self.handle_telegram)
+        return app
+
+    def results(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_lost": self.frames_lost,
+            "replay_started_at": self.replay_started_at,
+            "replay_finished_at": self.replay_finished_at,
+            "requests": self.requests,
+            "injected_errors": self.errors,
+            "telegram_messages": self.telegram_messages,
+            "sent_at": self.sent_at,
+            "delivered_at": self.delivered_at,
+        }
+
+def annotate_mints(frames):
+    """Attach the created mint to every pump.fun create frame that carries its CreateEvent."""
+    for frame in frames:
+        if frame["platform"] == "pumpfun" and frame.get("err") is None:
+            event = decode_pump_logs(frame["logs"])
+            if event:
+                frame["mint"] = event["mint"]
+    return frames
+
+def serve(port, stream_path, options, ready, replay_done, connection):
+    """Process entry point: serve the stand-ins until the driver asks for the results."""
+    async def run():
+        stand_ins = StandIns(annotate_mints(load_stream(stream_path)), **options)
+        runner = web.AppRunner(stand_ins.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        ready.set()
+        while not connection.poll():
+            if stand_ins.replay_finished_at is not None:
+                replay_done.set()
+            await asyncio.sleep(0.05)
+        connection.recv()
+        connection.send(stand_ins.results())
+        await runner.cleanup()
+
+    asyncio.run(run())
@@ -9,21 +9,145 @@ load_dotenv(dotenv_path=dotenv_path)
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 RPC_ENDPOINT = os.getenv("RPC_ENDPOINT")
 RPC_WEBSOCKET_ENDPOINT = os.getenv("RPC_WEBSOCKET_ENDPOINT")
+# Comma-separated websocket endpoints raced for log subscriptions (defaults to RPC_WEBSOCKET_ENDPOINT,
+# else RPC_ENDPOINT with its scheme switched to ws:// or wss://)
+RPC_WEBSOCKET_ENDPOINTS = [url.strip() for url in os.getenv(
+    "RPC_WEBSOCKET_ENDPOINTS",
+    RPC_WEBSOCKET_ENDPOINT or (RPC_ENDPOINT or "").replace("https://", "wss://", 1).replace("http://", "ws://", 1),
+).split(",") if url.strip()]
+# "solana-py" parses notifications into model objects, "raw" reads the JSON frames directly
+LOG_INGEST_MODE = os.getenv("LOG_INGEST_MODE", "solana-py")
+LOG_SUBSCRIPTION_DEDUP_SIZE = int(os.getenv("LOG_SUBSCRIPTION_DEDUP_SIZE", 50000))
+WS_RECONNECT_MAX_BACKOFF_SECONDS = float(os.getenv("WS_RECONNECT_MAX_BACKOFF_SECONDS", 30))
+# Comma-separated RPC endpoints every buy is broadcast to (defaults to RPC_ENDPOINT)
+RPC_SEND_ENDPOINTS = [url.strip() for url in os.getenv("RPC_SEND_ENDPOINTS", RPC_ENDPOINT or "").split(",") if url.strip()]
+REBROADCAST_INTERVAL_SECONDS = float(os.getenv("REBROADCAST_INTERVAL_SECONDS", 2))
+CONFIRMATION_TIMEOUT_SECONDS = float(os.getenv("CONFIRMATION_TIMEOUT_SECONDS", 90))
+
+# Chain state prefetching
+BLOCKHASH_REFRESH_SECONDS = float(os.getenv("BLOCKHASH_REFRESH_SECONDS", 2))
+BLOCKHASH_MAX_AGE_SECONDS = float(os.getenv("BLOCKHASH_MAX_AGE_SECONDS", 30))
+PRIORITY_FEE_REFRESH_SECONDS = float(os.getenv("PRIORITY_FEE_REFRESH_SECONDS", 10))
+PRIORITY_FEE_MAX_AGE_SECONDS = float(os.getenv("PRIORITY_FEE_MAX_AGE_SECONDS", 60))
+PRIORITY_FEE_PERCENTILE = float(os.getenv("PRIORITY_FEE_PERCENTILE", 75))
+PRIORITY_FEE_MIN_MICRO_LAMPORTS = int(os.getenv("PRIORITY_FEE_MIN_MICRO_LAMPORTS", 10000))
+PRIORITY_FEE_MAX_MICRO_LAMPORTS = int(os.getenv("PRIORITY_FEE_MAX_MICRO_LAMPORTS", 5000000))
+
+# HTTP client pool
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 10))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 3))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+
+# Market data cache
+MARKET_DATA_TTL_SECONDS = float(os.getenv("MARKET_DATA_TTL_SECONDS", 5))
+MARKET_DATA_MAX_ENTRIES = int(os.getenv("MARKET_DATA_MAX_ENTRIES", 2048))
+
+# Validation verdict cache
+VERDICT_TTL_SECONDS = float(os.getenv("VERDICT_TTL_SECONDS", 3))
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", 4096))
+
+# Log ingest queue
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 1000))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 8))
+INGEST_OVERFLOW_POLICY = os.getenv("INGEST_OVERFLOW_POLICY", "drop_oldest")  # drop_oldest or drop_stale
+INGEST_MAX_EVENT_AGE_SECONDS = float(os.getenv("INGEST_MAX_EVENT_AGE_SECONDS", 30))
+INGEST_STATS_INTERVAL_SECONDS = float(os.getenv("INGEST_STATS_INTERVAL_SECONDS", 60))
+
+# Seen-mint / signature dedup: exact recent window, optionally backed by rotating Bloom filters
+SEEN_WINDOW_SECONDS = float(os.getenv("SEEN_WINDOW_SECONDS", 3600))
+SEEN_WINDOW_MAX_ENTRIES = int(os.getenv("SEEN_WINDOW_MAX_ENTRIES", 100000))
+# Keys that age out of the exact window are remembered in Bloom filters of this many entries
+# (about 2.4 MB each at the default rate); unseen keys are misreported as seen at SEEN_BLOOM_FP_RATE
+SEEN_BLOOM_CAPACITY = int(os.getenv("SEEN_BLOOM_CAPACITY", 1000000))
+SEEN_BLOOM_FP_RATE = float(os.getenv("SEEN_BLOOM_FP_RATE", 0.0001))
+
+# 30-day report price refresh
+REPORT_BATCH_CONCURRENCY = int(os.getenv("REPORT_BATCH_CONCURRENCY", 4))
+REPORT_REQUESTS_PER_MINUTE = int(os.getenv("REPORT_REQUESTS_PER_MINUTE", 240))
+
+# External API base URLs (overridable to point the bot at local stand-ins, e.g. for benchmarks)
+DEXSCREENER_API_URL = os.getenv("DEXSCREENER_API_URL", "https://api.dexscreener.com")
+RUGCHECK_API_URL = os.getenv("RUGCHECK_API_URL", "https://api.rugcheck.xyz")
+PUMP_FUN_API_URL = os.getenv("PUMP_FUN_API_URL", "https://api.pump.fun")
+RAYDIUM_API_URL = os.getenv("RAYDIUM_API_URL", "https://api.raydium.io")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
 # Telegram configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 ADMIN_USER_ID = os.getenv("ADMIN_USER_ID")
 
+# Telegram outbound dispatcher (Bot API limits: ~30 msg/s overall, 1 msg/s per chat, 20 msg/min per group)
+TELEGRAM_GLOBAL_RATE_PER_SECOND = float(os.getenv("TELEGRAM_GLOBAL_RATE_PER_SECOND", 25))
+TELEGRAM_CHAT_RATE_PER_SECOND = float(os.getenv("TELEGRAM_CHAT_RATE_PER_SECOND", 1))
+TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MINUTE", 20))
+TELEGRAM_MAX_IN_FLIGHT = int(os.getenv("TELEGRAM_MAX_IN_FLIGHT", 8))
+# Queued alerts for one chat beyond this many are merged into a single digest message
+TELEGRAM_DIGEST_THRESHOLD = int(os.getenv("TELEGRAM_DIGEST_THRESHOLD", 3))
+TELEGRAM_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", 3))
+# Telegram updates: webhook server when WEBHOOK_URL is set, long polling otherwise
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+WEBHOOK_LISTEN_HOST = os.getenv("WEBHOOK_LISTEN_HOST", "0.0.0.0")
+WEBHOOK_LISTEN_PORT = int(os.getenv("WEBHOOK_LISTEN_PORT", 8080))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", 8))
+TELEGRAM_UPDATE_QUEUE_SIZE = int(os.getenv("TELEGRAM_UPDATE_QUEUE_SIZE", 1000))
+# Append-only log of chats subscribed with /start
+SUBSCRIBERS_FILE = os.getenv("SUBSCRIBERS_FILE", "subscribers.log")
+
+# Trade journal (SQLite, WAL mode)
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "trades.db")
+JOURNAL_FLUSH_INTERVAL_SECONDS = float(os.getenv("JOURNAL_FLUSH_INTERVAL_SECONDS", 0.2))
+# Rewrite the recovery snapshot after this many buys
+JOURNAL_SNAPSHOT_EVERY = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", 5))
+
+# Creator-history index (SQLite)
+CREATOR_INDEX_PATH = os.getenv("CREATOR_INDEX_PATH", "creators.db")
+CREATOR_INDEX_COMMIT_EVERY = int(os.getenv("CREATOR_INDEX_COMMIT_EVERY", 200))
+CREATOR_INDEX_COMMIT_INTERVAL_SECONDS = float(os.getenv("CREATOR_INDEX_COMMIT_INTERVAL_SECONDS", 5))
+
+# Live bonding-curve table
+CURVE_TABLE_MAX_MINTS = int(os.getenv("CURVE_TABLE_MAX_MINTS", 50000))
+# Older curve states are re-fetched from the chain before they are trusted
+CURVE_STATE_MAX_AGE_SECONDS = float(os.getenv("CURVE_STATE_MAX_AGE_SECONDS", 30))
+SOL_PRICE_REFRESH_SECONDS = float(os.getenv("SOL_PRICE_REFRESH_SECONDS", 30))
+
+# Metrics: Prometheus endpoint (port 0 disables it) and per-token trace file (empty disables it)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+METRICS_TRACE_FILE = os.getenv("METRICS_TRACE_FILE", "")
+METRICS_TRACE_MAX_BYTES = int(os.getenv("METRICS_TRACE_MAX_BYTES", 10_000_000))
+METRICS_TRACE_BACKUP_COUNT = int(os.getenv("METRICS_TRACE_BACKUP_COUNT", 5))
+
 # Trading configuration
 NUM_BUYS = int(os.getenv("NUM_BUYS", 10))
 BUY_AMOUNT = float(os.getenv("BUY_AMOUNT", 0.1))
 TRANSACTION_FEE = float(os.getenv("TRANSACTION_FEE", 0.001))
+BUY_SLIPPAGE_BPS = int(os.getenv("BUY_SLIPPAGE_BPS", 100))
+COMPUTE_UNIT_LIMIT = int(os.getenv("COMPUTE_UNIT_LIMIT", 100000))
+COMPUTE_UNIT_PRICE_MICRO_LAMPORTS = int(os.getenv("COMPUTE_UNIT_PRICE_MICRO_LAMPORTS", 100000))
+
+# Paper trading: pump.fun buys are filled by a local simulator against the live curve table
+PAPER_TRADING = os.getenv("PAPER_TRADING", "false").lower() == "true"
+PAPER_STARTING_BALANCE_SOL = float(os.getenv("PAPER_STARTING_BALANCE_SOL", 10))
+# Time between sending a buy and it landing, during which the curve keeps moving
+PAPER_LANDING_DELAY_SECONDS = float(os.getenv("PAPER_LANDING_DELAY_SECONDS", 0.8))
+PAPER_JOURNAL_PATH = os.getenv("PAPER_JOURNAL_PATH", "paper_trades.db")
 
 # Filter thresholds
 MIN_LIQUIDITY_USD = float(os.getenv("MIN_LIQUIDITY_USD", 1000))
 MAX_TOKEN_AGE_MINUTES = float(os.getenv("MAX_TOKEN_AGE_MINUTES", 60))
 MAX_TOP_10_HOLDERS_PERCENT = float(os.getenv("MAX_TOP_10_HOLDERS_PERCENT", 50))
+# Creator history: reject serial launchers outright; rug and graduation ratios apply once a creator
+# has at least DEV_MIN_HISTORY earlier tokens
+DEV_MAX_LAUNCHES = int(os.getenv("DEV_MAX_LAUNCHES", 25))
+DEV_MIN_HISTORY = int(os.getenv("DEV_MIN_HISTORY", 3))
+DEV_MAX_RUG_RATIO = float(os.getenv("DEV_MAX_RUG_RATIO", 0.3))
+DEV_MIN_GRADUATION_RATE = float(os.getenv("DEV_MIN_GRADUATION_RATE", 0.0))
 
 # Program IDs
 PUMP_FUN_PROGRAM_ID = "6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P"
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from log_decoder import b58decode, decode_pump_transaction, decode_raydium_transaction
+from config import CREATOR_INDEX_PATH, CREATOR_INDEX_COMMIT_EVERY, CREATOR_INDEX_COMMIT_INTERVAL_SECONDS
+
+# Pubkeys are stored as raw 32-byte blobs in WITHOUT ROWID tables to keep the index compact
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS creators (
+    creator BLOB PRIMARY KEY,
+    launched INTEGER NOT NULL,
+    graduated INTEGER NOT NULL,
+    rug_flags INTEGER NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS mints (
+    mint BLOB PRIMARY KEY,
+    creator BLOB NOT NULL,
+    created_at INTEGER NOT NULL,
+    graduated INTEGER NOT NULL DEFAULT 0,
+    rugged INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+def _connect(path):
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+class CreatorIndex:
+    """On-disk history of pump.fun creators: tokens launched, graduated to Raydium and flagged as rugs.
+
+    Every statement runs on one executor thread, so recording an event never blocks the
+    event loop and a lookup queued after a write always sees it. Writes are committed
+    every CREATOR_INDEX_COMMIT_EVERY events or CREATOR_INDEX_COMMIT_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, path=CREATOR_INDEX_PATH, commit_every=CREATOR_INDEX_COMMIT_EVERY,
+                 commit_interval=CREATOR_INDEX_COMMIT_INTERVAL_SECONDS):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="creator-index")
+        self._db = _connect(path)
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self.creates = 0
+        self.migrations = 0
+        self.rug_flags = 0
+        self.lookups = 0
+        self.errors = 0
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+            self._db.commit()
+            self._uncommitted = 0
+            self._last_commit = time.monotonic()
+
+    def _submit(self, func, *args):
+        def run():
+            try:
+                return func(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"Creator index error in {func.__name__}: {e}")
+                return None
+        return self._executor.submit(run)
+
+    def _record_create(self, mint, creator, timestamp):
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO mints (mint, creator, created_at) VALUES (?, ?, ?)", (mint, creator, timestamp)
+        )
+        if cursor.rowcount:
+            self._db.execute(
+                "INSERT INTO creators (creator, launched, graduated, rug_flags, first_seen, last_seen) VALUES (?, 1, 0, 0, ?, ?) "
+                "ON CONFLICT(creator) DO UPDATE SET launched = launched + 1, last_seen = MAX(last_seen, excluded.last_seen)",
+                (creator, timestamp, timestamp),
+            )
+            self.creates += 1
+        self._maybe_commit()
+
+    def _flag_mint(self, mint, column, counter):
+        # Each mint counts once per flag towards its creator's totals
+        cursor = self._db.execute(f"UPDATE mints SET {column} = 1 WHERE mint = ? AND {column} = 0", (mint,))
+        if cursor.rowcount:
+            self._db.execute(
+                f"UPDATE creators SET {counter} = {counter} + 1 WHERE creator = (SELECT creator FROM mints WHERE mint = ?)",
+                (mint,),
+            )
+        self._maybe_commit()
+        return bool(cursor.rowcount)
+
+    def _record_migration(self, mint):
+        if self._flag_mint(mint, "graduated", "graduated"):
+            self.migrations += 1
+
+    def _record_rug_indicator(self, mint):
+        if self._flag_mint(mint, "rugged", "rug_flags"):
+            self.rug_flags += 1
+
+    def _lookup(self, mint):
+        self.lookups += 1
+        row = self._db.execute(
+            "SELECT c.creator, c.launched, c.graduated, c.rug_flags, c.first_seen, c.last_seen "
+            "FROM mints m JOIN creators c ON c.creator = m.creator WHERE m.mint = ?",
+            (mint,),
+        ).fetchone()
+        if row is None:
+            return None
+        _creator, launched, graduated, rug_flags, first_seen, last_seen = row
+        return {
+            "launched": launched,
+            "graduated": graduated,
+            "rug_flags": rug_flags,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+        }
+
+    def record_event(self, event, timestamp=None):
+        """Queue a decoded create (pump.fun) or migration (Raydium) event; returns immediately."""
+        mint = event.get("mint")
+        if not mint:
+            return None
+        if event["platform"] == "pumpfun" and event.get("creator"):
+            return self._submit(self._record_create, b58decode(mint), b58decode(event["creator"]), int(timestamp or time.time()))
+        if event["platform"] == "raydium":
+            # Pools for mints that never came through pump.fun are simply not in the index
+            return self._submit(self._record_migration, b58decode(mint))
+        return None
+
+    def record_rug_indicator(self, mint):
+        """Count a rug indicator (e.g. a RugCheck flag) against the mint's creator."""
+        return self._submit(self._record_rug_indicator, b58decode(mint))
+
+    async def creator_history(self, mint):
+        """Launch history of the creator of a mint, or None if the mint's create was never seen."""
+        return await asyncio.wrap_future(self._submit(self._lookup, b58decode(mint)))
+
+    async def close(self):
+        await asyncio.wrap_future(self._submit(self._db.commit))
+        await asyncio.wrap_future(self._submit(self._db.close))
+        self._executor.shutdown()
+
+    def stats(self):
+        return {
+            "creates": self.creates,
+            "migrations": self.migrations,
+            "rug_flags": self.rug_flags,
+            "lookups": self.lookups,
+            "errors": self.errors,
+            "uncommitted": self._uncommitted,
+        }
+
+_creator_index = None
+
+def get_creator_index():
+    """Return the shared creator index, opening it on first use."""
+    global _creator_index
+    if _creator_index is None:
+        _creator_index = CreatorIndex()
+    return _creator_index
+
+async def close_creator_index():
+    global _creator_index
+    if _creator_index is not None:
+        await _creator_index.close()
+        _creator_index = None
+
+def backfill(db_path, paths, batch_size=10000):
+    """Build the index from exported getTransaction (jsonParsed) results, one JSON object per line.
+
+    Creates are bulk-inserted first and migrations applied afterwards, so the files may be
+    in any order; creator totals are then rebuilt from the mints table in one pass.
+    """
+    db = _connect(db_path)
+    db.execute("PRAGMA synchronous=OFF")
+    started = time.monotonic()
+    creates = []
+    migrations = []
+    transactions = 0
+    skipped = 0
+
+    def flush_creates():
+        db.executemany("INSERT OR IGNORE INTO mints (mint, creator, created_at) VALUES (?, ?, ?)", creates)
+        creates.clear()
+
+    for path in paths:
+        with open(path, encoding="utf-8") as lines:
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                transactions += 1
+                try:
+                    tx = json.loads(line)
+                    tx = tx.get("result", tx)
+                    if (tx.get("meta") or {}).get("err") is not None:
+                        continue
+                    event = decode_pump_transaction(tx)
+                    if event and event.get("creator"):
+                        creates.append((b58decode(event["mint"]), b58decode(event["creator"]), int(tx.get("blockTime") or 0)))
+                        if len(creates) >= batch_size:
+                            flush_creates()
+                        continue
+                    event = decode_raydium_transaction(tx)
+                    if event:
+                        migrations.append((b58decode(event["mint"]),))
+                except (ValueError, KeyError, TypeError) as e:
+                    skipped += 1
+                    if skipped <= 10:
+                        print(f"Skipping unreadable transaction in {path}: {e}")
+    flush_creates()
+    db.executemany("UPDATE mints SET graduated = 1 WHERE mint = ?", migrations)
+    db.execute(
+        "INSERT OR REPLACE INTO creators (creator, launched, graduated, rug_flags, first_seen, last_seen) "
+        "SELECT creator, COUNT(*), SUM(graduated), SUM(rugged), MIN(created_at), MAX(created_at) FROM mints GROUP BY creator"
+    )
+    db.commit()
+    creators = db.execute("SELECT COUNT(*) FROM creators").fetchone()[0]
+    mints = db.execute("SELECT COUNT(*) FROM mints").fetchone()[0]
+    db.close()
+    elapsed = time.monotonic() - started
+    print(f"Backfilled {transactions} transactions ({skipped} skipped) into {mints} mints and {creators} creators in {elapsed:.1f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Creator-history index maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subcommands.add_parser("backfill", help="build the index from exported transaction JSONL files")
+    backfill_parser.add_argument("files", nargs="+", help="JSONL files of getTransaction jsonParsed results")
+    backfill_parser.add_argument("--db", default=CREATOR_INDEX_PATH, help="index database path")
+    backfill_parser.add_argument("--batch-size", type=int, default=10000)
+    lookup_parser = subcommands.add_parser("lookup", help="print the creator history for a mint")
+    lookup_parser.add_argument("mint")
+    lookup_parser.add_argument("--db", default=CREATOR_INDEX_PATH, help="index database path")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        backfill(args.db, args.files, args.batch_size)
+    elif args.command == "lookup":
+        index = CreatorIndex(args.db)
+        print(json.dumps(index._lookup(b58decode(args.mint))))
+        index._db.close()
+        index._executor.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import asyncio
+import time
+from array import array
+from collections import OrderedDict
+from log_decoder import WSOL_MINT, decode_pump_events
+from market_data import get_token_pairs
+from pumpfun import (
+    BondingCurveState,
+    LAMPORTS_PER_SOL,
+    TOKEN_DECIMALS,
+    INITIAL_VIRTUAL_TOKEN_RESERVES,
+    INITIAL_VIRTUAL_SOL_RESERVES,
+    INITIAL_REAL_TOKEN_RESERVES,
+    TOKEN_TOTAL_SUPPLY,
+)
+from config import CURVE_TABLE_MAX_MINTS, CURVE_STATE_MAX_AGE_SECONDS, SOL_PRICE_REFRESH_SECONDS
+
+VIRTUAL_TOKEN_OFFSET = INITIAL_VIRTUAL_TOKEN_RESERVES - INITIAL_REAL_TOKEN_RESERVES
+
+class CurveStateTable:
+    """Live bonding-curve reserves for tracked pump.fun mints, one slot per mint in parallel arrays.
+
+    Slots are filled from CreateEvent/TradeEvent logs seen on the pump.fun subscription
+    and from bonding-curve account fetches. The least recently updated mint is evicted
+    once max_mints are tracked. A mint first seen through an account fetch has an unknown
+    creation time (0) until its CreateEvent is seen or set_created_at fills it in.
+    """
+
+    def __init__(self, max_mints=CURVE_TABLE_MAX_MINTS):
+        self.max_mints = max_mints
+        self._slots = OrderedDict()  # mint -> slot, least recently updated first
+        self._free = []
+        self.virtual_token = array("Q")
+        self.virtual_sol = array("Q")
+        self.real_token = array("Q")
+        self.real_sol = array("Q")
+        self.supply = array("Q")
+        self.complete = bytearray()
+        self.created_at = array("d")  # unix time of the CreateEvent, 0 if unknown
+        self.updated_at = array("d")  # unix time of the last update
+        self.event_time = array("q")  # chain timestamp of the last applied trade
+        self.volume_sol = array("d")
+        self.trades = array("L")
+        self.names = []
+        self.symbols = []
+        self.sol_usd = None
+        self.sol_usd_updated_at = None
+        self._price_task = None
+        self.creates_seen = 0
+        self.trades_applied = 0
+        self.trades_ignored = 0
+        self.account_updates = 0
+        self.evictions = 0
+        self._update_listeners = []
+
+    def add_update_listener(self, listener):
+        """Call listener(mint) whenever a mint's reserves change."""
+        self._update_listeners.append(listener)
+
+    def _notify(self, mint):
+        for listener in self._update_listeners:
+            try:
+                listener(mint)
+            except Exception as e:
+                print(f"Curve update listener failed for {mint}: {e}")
+
+    def _allocate(self, mint):
+        if len(self._slots) >= self.max_mints:
+            _, slot = self._slots.popitem(last=False)
+            self._free.append(slot)
+            self.evictions += 1
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self.virtual_token)
+            for column in (self.virtual_token, self.virtual_sol, self.real_token, self.real_sol, self.supply, self.event_time, self.trades):
+                column.append(0)
+            for column in (self.created_at, self.updated_at, self.volume_sol):
+                column.append(0.0)
+            self.complete.append(0)
+            self.names.append(None)
+            self.symbols.append(None)
+        self.event_time[slot] = 0
+        self.trades[slot] = 0
+        self.volume_sol[slot] = 0.0
+        self.created_at[slot] = 0.0
+        self.names[slot] = None
+        self.symbols[slot] = None
+        self._slots[mint] = slot
+        return slot
+
+    def _touch(self, mint, slot):
+        self.updated_at[slot] = time.time()
+        self._slots.move_to_end(mint)
+
+    def track(self, mint, name=None, symbol=None, created_at=None):
+        """Start tracking a freshly created mint at the initial curve reserves."""
+        slot = self._slots.get(mint)
+        if slot is None:
+            slot = self._allocate(mint)
+            self.virtual_token[slot] = INITIAL_VIRTUAL_TOKEN_RESERVES
+            self.virtual_sol[slot] = INITIAL_VIRTUAL_SOL_RESERVES
+            self.real_token[slot] = INITIAL_REAL_TOKEN_RESERVES
+            self.real_sol[slot] = 0
+            self.supply[slot] = TOKEN_TOTAL_SUPPLY
+            self.complete[slot] = 0
+        if created_at:
+            self.created_at[slot] = created_at
+        elif not self.created_at[slot]:
+            # Create events arrive live, so the mint was created just now
+            self.created_at[slot] = time.time()
+        self.names[slot] = name
+        self.symbols[slot] = symbol
+        self._touch(mint, slot)
+        return slot
+
+    def set_created_at(self, mint, created_at):
+        """Fill in a tracked mint's creation time if it is still unknown."""
+        slot = self._slots.get(mint)
+        if slot is not None and created_at and not self.created_at[slot]:
+            self.created_at[slot] = created_at
+
+    def apply_trade(self, mint, virtual_sol, virtual_token, sol_amount=0, timestamp=0):
+        """Apply a TradeEvent's post-trade reserves; returns False for untracked mints or stale events."""
+        slot = self._slots.get(mint)
+        if slot is None:
+            self.trades_ignored += 1
+            return False
+        # Several endpoints can deliver trades out of order; keep the newest by chain time
+        if timestamp < self.event_time[slot]:
+            self.trades_ignored += 1
+            return False
+        self.event_time[slot] = timestamp
+        self.virtual_sol[slot] = virtual_sol
+        self.virtual_token[slot] = virtual_token
+        self.real_sol[slot] = max(0, virtual_sol - INITIAL_VIRTUAL_SOL_RESERVES)
+        self.real_token[slot] = max(0, virtual_token - VIRTUAL_TOKEN_OFFSET)
+        self.complete[slot] = 1 if self.real_token[slot] == 0 else 0
+        self.volume_sol[slot] += sol_amount / LAMPORTS_PER_SOL
+        self.trades[slot] += 1
+        self.trades_applied += 1
+        self._touch(mint, slot)
+        self._notify(mint)
+        return True
+
+    def apply_logs(self, logs):
+        """Apply every create and trade event in a pump.fun transaction's logs, in order."""
+        for event in decode_pump_events(logs):
+            if "virtual_sol_reserves" in event:
+                self.apply_trade(event["mint"], event["virtual_sol_reserves"], event["virtual_token_reserves"],
+                                 event["sol_amount"], event["timestamp"])
+            else:
+                self.creates_seen += 1
+                self.track(event["mint"], event.get("name"), event.get("symbol"))
+
+    def update_from_account(self, mint, state):
+        """Store a freshly fetched bonding-curve account, tracking the mint if it was not yet."""
+        if state is None:
+            return
+        slot = self._slots.get(mint)
+        if slot is None:
+            slot = self._allocate(mint)
+        self.virtual_token[slot] = state.virtual_token_reserves
+        self.virtual_sol[slot] = state.virtual_sol_reserves
+        self.real_token[slot] = state.real_token_reserves
+        self.real_sol[slot] = state.real_sol_reserves
+        self.supply[slot] = state.token_total_supply
+        self.complete[slot] = 1 if state.complete else 0
+        self.account_updates += 1
+        self._touch(mint, slot)
+        self._notify(mint)
+
+    def get(self, mint, max_age=CURVE_STATE_MAX_AGE_SECONDS):
+        """Return the mint's BondingCurveState if it was updated within max_age seconds, else None."""
+        slot = self._slots.get(mint)
+        if slot is None or (max_age is not None and time.time() - self.updated_at[slot] > max_age):
+            return None
+        return BondingCurveState(
+            self.virtual_token[slot],
+            self.virtual_sol[slot],
+            self.real_token[slot],
+            self.real_sol[slot],
+            self.supply[slot],
+            bool(self.complete[slot]),
+        )
+
+    def __contains__(self, mint):
+        return mint in self._slots
+
+    def market(self, mint):
+        """Price, market cap and liquidity in USD for a mint still on its curve, or None.
+
+        Liquidity counts both sides of the curve's real reserves, like an AMM pool's.
+        """
+        slot = self._slots.get(mint)
+        if slot is None or self.complete[slot] or not self.sol_usd or not self.virtual_token[slot]:
+            return None
+        price_sol = (self.virtual_sol[slot] / LAMPORTS_PER_SOL) / (self.virtual_token[slot] / 10 ** TOKEN_DECIMALS)
+        price_usd = price_sol * self.sol_usd
+        return {
+            "name": self.names[slot],
+            "symbol": self.symbols[slot],
+            "price_sol": price_sol,
+            "price_usd": price_usd,
+            "market_cap_usd": price_usd * self.supply[slot] / 10 ** TOKEN_DECIMALS,
+            "liquidity_usd": 2 * self.real_sol[slot] / LAMPORTS_PER_SOL * self.sol_usd,
+            "volume_usd": self.volume_sol[slot] * self.sol_usd,
+            "trades": self.trades[slot],
+            "created_at": self.created_at[slot] or None,
+            "updated_at": self.updated_at[slot],
+        }
+
+    async def refresh_sol_price(self):
+        """Update the SOL/USD price from DexScreener's wrapped SOL pairs."""
+        pairs = await get_token_pairs(WSOL_MINT)
+        for pair in pairs:
+            if pair.get("baseToken", {}).get("address") == WSOL_MINT and pair.get("priceUsd"):
+                self.sol_usd = float(pair["priceUsd"])
+                self.sol_usd_updated_at = time.time()
+                return
+
+    async def _refresh_sol_price_loop(self, interval):
+        while True:
+            try:
+                await self.refresh_sol_price()
+            except Exception as e:
+                print(f"Error refreshing SOL price: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval=SOL_PRICE_REFRESH_SECONDS):
+        if self._price_task is None:
+            self._price_task = asyncio.create_task(self._refresh_sol_price_loop(interval))
+
+    async def stop(self):
+        if self._price_task is not None:
+            self._price_task.cancel()
+            await asyncio.gather(self._price_task, return_exceptions=True)
+            self._price_task = None
+
+    def stats(self):
+        return {
+            "tracked": len(self._slots),
+            "capacity": len(self.virtual_token),
+            "sol_usd": self.sol_usd,
+            "creates_seen": self.creates_seen,
+            "trades_applied": self.trades_applied,
+            "trades_ignored": self.trades_ignored,
+            "account_updates": self.account_updates,
+            "evictions": self.evictions,
+        }
+
+curve_table = CurveStateTable()
@@ -0,0 +1,101 @@
+import math
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from config import SEEN_WINDOW_SECONDS, SEEN_WINDOW_MAX_ENTRIES, SEEN_BLOOM_CAPACITY, SEEN_BLOOM_FP_RATE
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for capacity items at a target false-positive rate."""
+
+    def __init__(self, capacity, fp_rate):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class SeenSet:
+    """Memory-bounded "have we seen this key" set.
+
+    Recent keys live in an exact, time-windowed LRU bounded by max_recent, so memory is
+    bounded over any uptime. Keys that age out of that window move into two rotating
+    Bloom filters sized by bloom_capacity, which are consulted only for keys not in the
+    window; a Raydium migration hours after its create is still caught there. A never-seen
+    key can be misreported as seen at roughly fp_rate. A bloom_capacity of 0 keeps only
+    the exact window.
+    """
+
+    def __init__(self, window_seconds=SEEN_WINDOW_SECONDS, max_recent=SEEN_WINDOW_MAX_ENTRIES,
+                 bloom_capacity=SEEN_BLOOM_CAPACITY, fp_rate=SEEN_BLOOM_FP_RATE):
+        self.window_seconds = window_seconds
+        self.max_recent = max_recent
+        self.bloom_capacity = bloom_capacity
+        self.fp_rate = fp_rate
+        self._recent = OrderedDict()  # key -> first seen (monotonic)
+        self._current = BloomFilter(bloom_capacity, fp_rate) if bloom_capacity else None
+        self._previous = None
+        self.checks = 0
+        self.duplicates = 0
+        self.rotations = 0
+
+    def _expire(self, now):
+        recent = self._recent
+        while recent:
+            key, seen_at = next(iter(recent.items()))
+            if now - seen_at <= self.window_seconds and len(recent) <= self.max_recent:
+                break
+            recent.popitem(last=False)
+            self._bloom_add(key)
+
+    def _bloom_add(self, key):
+        if self._current is None:
+            return
+        if self._current.count >= self.bloom_capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.bloom_capacity, self.fp_rate)
+            self.rotations += 1
+        self._current.add(key)
+
+    def __contains__(self, key):
+        if key in self._recent:
+            return True
+        if self._current is None:
+            return False
+        return key in self._current or (self._previous is not None and key in self._previous)
+
+    def add(self, key):
+        """Return True if the key is new (and record it), False if it was already seen."""
+        now = time.monotonic()
+        self.checks += 1
+        self._expire(now)
+        if key in self:
+            self.duplicates += 1
+            return False
+        self._recent[key] = now
+        return True
+
+    def stats(self):
+        bloom_bytes = (len(self._current.bits) if self._current else 0) + (len(self._previous.bits) if self._previous else 0)
+        return {
+            "recent_entries": len(self._recent),
+            "bloom_entries": self._current.count if self._current else 0,
+            "bloom_bytes": bloom_bytes,
+            "bloom_rotations": self.rotations,
+            "checks": self.checks,
+            "duplicates": self.duplicates,
+        }
@@ -1,93 +1,387 @@
-import aiohttp
+import asyncio
 import time
+from collections import OrderedDict
 from solana.rpc.async_api import AsyncClient
-from solana.rpc.types import TokenAccountOpts
-from config import MIN_LIQUIDITY_USD, MAX_TOKEN_AGE_MINUTES, MAX_TOP_10_HOLDERS_PERCENT, PUMP_FUN_PROGRAM_ID
+from solana.publickey import PublicKey
+from http_client import get_session
+from market_data import get_token_pairs, token_market_cache
+from pumpfun import fetch_bonding_curves, derive_bonding_curve, derive_associated_token_account
+import metrics
+from creator_index import get_creator_index
+from curve_state import curve_table
+from config import MIN_LIQUIDITY_USD, MAX_TOKEN_AGE_MINUTES, MAX_TOP_10_HOLDERS_PERCENT, VERDICT_TTL_SECONDS, VERDICT_CACHE_MAX_ENTRIES, RUGCHECK_API_URL
+from config import DEV_MAX_LAUNCHES, DEV_MIN_HISTORY, DEV_MAX_RUG_RATIO, DEV_MIN_GRADUATION_RATE
 
-async def validate_token(token_address, client):
-    """Validate a token based on specified filters."""
-    try:
-        # Check if token is in bonding phase
-        if not await is_in_bonding_phase(token_address, client):
-            print(f"Token {token_address} is not in bonding phase.")
-            return False
+# Context keys recorded on a Verdict so later data refreshes can invalidate it
+VERDICT_INPUT_KEYS = ("market_source", "liquidity_usd", "age_minutes", "top_10_percent")
 
-        # Fetch token data from DexScreener
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.dexscreener.com/latest/dex/tokens/{token_address}") as response:
-                data = await response.json()
-                pairs = data.get("pairs", [])
-                if not pairs:
-                    print(f"No trading pairs found for {token_address}.")
-                    return False
-
-                pair = pairs[0]
-                liquidity_usd = pair.get("liquidity", {}).get("usd", 0)
-                pair_created_at = pair.get("pairCreatedAt", 0)
-                current_time = int(time.time() * 1000)
-                age_minutes = (current_time - pair_created_at) / (1000 * 60)
-
-                # Liquidity check
-                if liquidity_usd < MIN_LIQUIDITY_USD:
-                    print(f"Token {token_address} has low liquidity: ${liquidity_usd}")
-                    return False
-
-                # Token age check
-                if age_minutes > MAX_TOKEN_AGE_MINUTES:
-                    print(f"Token {token_address} is too old: {age_minutes} minutes")
-                    return False
-
-        # Check holder distribution
-        if not await check_holder_distribution(token_address, client):
-            print(f"Token {token_address} has concentrated holder distribution.")
-            return False
+# Check cost classes: local checks run inline first, the rest run concurrently
+COST_LOCAL = 0
+COST_THREAD = 1  # Local data behind an executor thread (SQLite); awaiting it inline would delay the remote checks
+COST_RPC = 2
+COST_HTTP = 3
 
-        # Check for rug pull/honeypot risks using RugCheck
-        if await is_rug_or_honeypot(token_address):
-            print(f"Token {token_address} flagged as rug or honeypot.")
-            return False
+class FilterCheck:
+    """A single validation step with its cost and the checks it depends on."""
 
-        # Check developer history
-        if not await check_dev_history(token_address, client):
-            print(f"Token {token_address} has no successful dev history.")
-            return False
+    def __init__(self, name, func, cost, message, depends_on=()):
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.message = message
+        self.depends_on = tuple(depends_on)
+
+class Verdict:
+    """Structured result of the validation pipeline; truthy when the token passed."""
+
+    def __init__(self, token_address, platform, passed, failed_check=None, reason=None, timings=None, total_seconds=0.0, error=False):
+        self.token_address = token_address
+        self.platform = platform
+        self.passed = passed
+        self.failed_check = failed_check
+        self.reason = reason
+        self.timings = dict(timings or {})
+        self.total_seconds = total_seconds
+        self.created_at = time.time()
+        self.error = error
+        self.invalidated = False
+        self.bonding_curve = None
+        # Market inputs the verdict was based on, used to detect stale verdicts
+        self.inputs = {}
+
+    def is_fresh(self, max_age=VERDICT_TTL_SECONDS):
+        """True if the verdict is recent enough to reuse and no input has changed since."""
+        return not self.invalidated and (time.time() - self.created_at) <= max_age
 
-        # Check social sentiment and trending narrative
-        if not await check_social_sentiment(token_address):
-            print(f"Token {token_address} lacks trending narrative or social buzz.")
+    def __bool__(self):
+        return self.passed
+
+    def __repr__(self):
+        status = "passed" if self.passed else f"failed at {self.failed_check}"
+        return f"Verdict({self.token_address}, {status}, {self.total_seconds * 1000:.1f}ms)"
+
+    def to_dict(self):
+        return {
+            "token_address": self.token_address,
+            "platform": self.platform,
+            "passed": self.passed,
+            "failed_check": self.failed_check,
+            "reason": self.reason,
+            "timings": dict(self.timings),
+            "total_seconds": self.total_seconds,
+            "created_at": self.created_at,
+            "error": self.error,
+            "inputs": dict(self.inputs),
+        }
+
+async def _check_bonding_phase(ctx):
+    # Raydium pools only exist once a curve has completed, so the check is pump.fun only
+    if ctx["platform"] != "pumpfun":
+        return True
+    # The live curve table answers without an RPC round trip while its state is fresh
+    state = curve_table.get(ctx["token_address"])
+    if state is None:
+        if not await is_in_bonding_phase(ctx["token_address"], ctx["client"]):
             return False
+        # The batched fetch stored the account in the curve table
+        state = curve_table.get(ctx["token_address"], max_age=None)
+    # Kept on the verdict so the buy path can price the curve without another fetch
+    ctx["bonding_curve"] = state
+    return state is not None and not state.complete
 
+async def _check_market_data(ctx):
+    # Bonding-phase tokens are priced from the live curve table; DexScreener often has no pair yet
+    market = curve_table.market(ctx["token_address"]) if ctx["platform"] == "pumpfun" else None
+    if market is not None:
+        ctx["market_source"] = "curve_table"
+        ctx["liquidity_usd"] = market["liquidity_usd"]
+        # A mint first seen through an account fetch has no creation time in the table;
+        # fall back to the create the caller decoded, else leave the age unknown
+        created_at = market["created_at"] or ctx.get("created_at")
+        if created_at and not market["created_at"]:
+            curve_table.set_created_at(ctx["token_address"], created_at)
+        ctx["age_minutes"] = (time.time() - created_at) / 60 if created_at else None
         return True
+    pairs = await get_token_pairs(ctx["token_address"])
+    if not pairs:
+        return False
+    pair = pairs[0]
+    ctx["market_source"] = "dexscreener"
+    ctx["liquidity_usd"] = pair.get("liquidity", {}).get("usd", 0)
+    pair_created_at = pair.get("pairCreatedAt", 0)
+    ctx["age_minutes"] = (int(time.time() * 1000) - pair_created_at) / (1000 * 60)
+    return True
+
+def _liquidity_passes(liquidity_usd):
+    return liquidity_usd is not None and liquidity_usd >= MIN_LIQUIDITY_USD
+
+async def _check_liquidity(ctx):
+    return _liquidity_passes(ctx["liquidity_usd"])
+
+async def _check_token_age(ctx):
+    # An unknown age is not evaluated rather than failed, so a missed create does not reject a new token
+    return ctx["age_minutes"] is None or ctx["age_minutes"] <= MAX_TOKEN_AGE_MINUTES
+
+def _holders_pass(top_10_percent):
+    return top_10_percent <= MAX_TOP_10_HOLDERS_PERCENT
+
+async def _check_holder_distribution(ctx):
+    ctx["top_10_percent"] = await top_10_holders_percent(ctx["token_address"], ctx["client"])
+    return _holders_pass(ctx["top_10_percent"])
+
+async def _check_rugcheck(ctx):
+    if await is_rug_or_honeypot(ctx["token_address"]):
+        # Counted against the creator so their next launches are rejected locally
+        get_creator_index().record_rug_indicator(ctx["token_address"])
+        return False
+    return True
+
+async def _check_dev_history(ctx):
+    return await check_dev_history(ctx["token_address"], ctx["client"])
+
+async def _check_social_sentiment(ctx):
+    return await check_social_sentiment(ctx["token_address"])
+
+FILTER_CHECKS = [
+    FilterCheck("bonding_phase", _check_bonding_phase, COST_RPC, "Token {token_address} is not in bonding phase."),
+    FilterCheck("market_data", _check_market_data, COST_HTTP, "No market data found for {token_address}."),
+    FilterCheck("liquidity", _check_liquidity, COST_LOCAL, "Token {token_address} has low liquidity: ${liquidity_usd}", depends_on=["market_data"]),
+    FilterCheck("token_age", _check_token_age, COST_LOCAL, "Token {token_address} is too old: {age_minutes} minutes", depends_on=["market_data"]),
+    FilterCheck("holder_distribution", _check_holder_distribution, COST_RPC, "Token {token_address} has concentrated holder distribution."),
+    FilterCheck("rugcheck", _check_rugcheck, COST_HTTP, "Token {token_address} flagged as rug or honeypot."),
+    FilterCheck("dev_history", _check_dev_history, COST_THREAD, "Token {token_address} has no successful dev history."),
+    FilterCheck("social_sentiment", _check_social_sentiment, COST_LOCAL, "Token {token_address} lacks trending narrative or social buzz."),
+]
+
+def register_check(check, before=None):
+    """Add a FilterCheck to the pipeline, optionally ahead of an existing check."""
+    names = [c.name for c in FILTER_CHECKS]
+    if check.name in names:
+        raise ValueError(f"Filter check {check.name} is already registered")
+    index = names.index(before) if before in names else len(FILTER_CHECKS)
+    FILTER_CHECKS.insert(index, check)
+
+async def _timed(check, ctx, timings):
+    start = time.perf_counter()
+    try:
+        return await check.func(ctx)
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[check.name] = elapsed
+        metrics.observe(f"check_{check.name}", elapsed)
+
+async def run_pipeline(checks, ctx):
+    """Run checks cheapest-first, remote ones concurrently, cancelling the rest on the first rejection."""
+    start = time.perf_counter()
+    timings = {}
+    pending = sorted(checks, key=lambda c: c.cost)
+    known = {c.name for c in checks}
+    for check in pending:
+        missing = [d for d in check.depends_on if d not in known]
+        if missing:
+            raise ValueError(f"Filter check {check.name} depends on unknown checks: {missing}")
+    done = set()
+    running = {}
+
+    def verdict(passed, failed_check=None, reason=None, error=False):
+        result = Verdict(ctx["token_address"], ctx["platform"], passed, failed_check, reason, timings, time.perf_counter() - start, error)
+        metrics.observe("validate_token", result.total_seconds)
+        result.inputs = {key: ctx[key] for key in VERDICT_INPUT_KEYS if key in ctx}
+        result.bonding_curve = ctx.get("bonding_curve")
+        return result
+
+    try:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for check in list(pending):
+                    if not all(d in done for d in check.depends_on):
+                        continue
+                    pending.remove(check)
+                    if check.cost <= COST_LOCAL:
+                        # Cheap checks run inline so they can reject before any I/O is awaited
+                        try:
+                            passed = await _timed(check, ctx, timings)
+                        except Exception as e:
+                            return verdict(False, check.name, f"{check.name} error: {e}", error=True)
+                        if not passed:
+                            return verdict(False, check.name, check.message.format(**ctx))
+                        done.add(check.name)
+                        progressed = True
+                    else:
+                        running[asyncio.create_task(_timed(check, ctx, timings))] = check
+
+            if not running:
+                if pending:
+                    names = [c.name for c in pending]
+                    return verdict(False, names[0], f"Unresolved filter dependencies: {names}", error=True)
+                break
 
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                check = running.pop(task)
+                try:
+                    passed = task.result()
+                except Exception as e:
+                    return verdict(False, check.name, f"{check.name} error: {e}", error=True)
+                if not passed:
+                    return verdict(False, check.name, check.message.format(**ctx))
+                done.add(check.name)
+
+        return verdict(True)
+    finally:
+        for task in running:
+            task.cancel()
+
+# Recent verdicts per mint so the buy path can reuse a just-computed result
+_verdict_cache = OrderedDict()
+
+def get_fresh_verdict(token_address, max_age=VERDICT_TTL_SECONDS):
+    """Return the cached verdict for a mint if it is still fresh, else None."""
+    verdict = _verdict_cache.get(token_address)
+    if verdict is None:
+        return None
+    if not verdict.is_fresh(max_age):
+        _verdict_cache.pop(token_address, None)
+        return None
+    return verdict
+
+def invalidate_verdict(token_address):
+    """Drop the cached verdict for a mint, e.g. when its liquidity or holders changed."""
+    verdict = _verdict_cache.pop(token_address, None)
+    if verdict is not None:
+        verdict.invalidated = True
+
+def _cache_verdict(verdict):
+    # Errors are transient, so only definite pass/reject results are reused
+    if verdict.error:
+        return
+    _verdict_cache[verdict.token_address] = verdict
+    _verdict_cache.move_to_end(verdict.token_address)
+    while len(_verdict_cache) > VERDICT_CACHE_MAX_ENTRIES:
+        _verdict_cache.popitem(last=False)
+
+# Refreshed data only invalidates a cached verdict when it would flip a check's outcome,
+# compared against an input read from the same source; small moves keep the verdict reusable
+
+def _on_market_refresh(mint, document):
+    """Invalidate a cached verdict when refreshed DexScreener liquidity crosses MIN_LIQUIDITY_USD."""
+    verdict = _verdict_cache.get(mint)
+    if verdict is None or verdict.inputs.get("market_source") != "dexscreener":
+        return
+    pairs = (document or {}).get("pairs") or []
+    liquidity_usd = pairs[0].get("liquidity", {}).get("usd", 0) if pairs else None
+    if _liquidity_passes(liquidity_usd) != _liquidity_passes(verdict.inputs["liquidity_usd"]):
+        invalidate_verdict(mint)
+
+token_market_cache.add_refresh_listener(_on_market_refresh)
+
+def _on_curve_update(mint):
+    """Invalidate a cached verdict when the curve completes or its liquidity crosses MIN_LIQUIDITY_USD."""
+    verdict = _verdict_cache.get(mint)
+    if verdict is None:
+        return
+    state = curve_table.get(mint, max_age=None)
+    if verdict.bonding_curve is not None and state is not None and state.complete:
+        invalidate_verdict(mint)
+        return
+    if verdict.inputs.get("market_source") != "curve_table":
+        return
+    market = curve_table.market(mint)
+    liquidity_usd = market["liquidity_usd"] if market is not None else None
+    if _liquidity_passes(liquidity_usd) != _liquidity_passes(verdict.inputs["liquidity_usd"]):
+        invalidate_verdict(mint)
+
+curve_table.add_update_listener(_on_curve_update)
+
+def _on_holder_refresh(mint, top_10_percent):
+    """Invalidate a cached verdict when freshly read holder balances cross MAX_TOP_10_HOLDERS_PERCENT."""
+    verdict = _verdict_cache.get(mint)
+    if verdict is None or "top_10_percent" not in verdict.inputs:
+        return
+    if _holders_pass(top_10_percent) != _holders_pass(verdict.inputs["top_10_percent"]):
+        invalidate_verdict(mint)
+
+async def validate_token(token_address, client, platform="pumpfun", max_age=None, created_at=None):
+    """Validate a token based on specified filters and return a Verdict.
+
+    If max_age is given, a cached verdict no older than max_age seconds is returned instead.
+    created_at (unix time) dates the token when the live curve table has not seen its create.
+    """
+    if max_age is not None:
+        cached = get_fresh_verdict(token_address, max_age)
+        if cached is not None:
+            return cached
+
+    ctx = {"token_address": token_address, "client": client, "platform": platform, "created_at": created_at}
+    try:
+        result = await run_pipeline(FILTER_CHECKS, ctx)
     except Exception as e:
         print(f"Error validating token {token_address}: {e}")
-        return False
+        return Verdict(token_address, platform, False, reason=f"Error validating token: {e}", error=True)
+    _cache_verdict(result)
+    if not result.passed:
+        print(result.reason)
+    return result
+
+# Mints awaiting a batched curve fetch; lookups started in the same event-loop tick share one call
+_bonding_batch = {}  # mint -> future
+
+async def _flush_bonding_batch(client):
+    batch = dict(_bonding_batch)
+    _bonding_batch.clear()
+    in_bonding_phase = set(await filter_bonding_phase(list(batch), client))
+    for mint, future in batch.items():
+        if not future.done():
+            future.set_result(mint in in_bonding_phase)
 
 async def is_in_bonding_phase(token_address, client):
-    """Check if token is in bonding phase by inspecting Pump.fun program accounts."""
-    # Simplified check: Verify token is associated with Pump.fun bonding curve
-    # In production, query the bonding curve account to confirm active status
+    """Check if token is in bonding phase by reading its Pump.fun bonding curve account.
+
+    Concurrent validations are coalesced into one getMultipleAccounts call.
+    """
+    future = _bonding_batch.get(token_address)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        if not _bonding_batch:
+            loop.call_soon(lambda: asyncio.ensure_future(_flush_bonding_batch(client)))
+        future = _bonding_batch[token_address] = loop.create_future()
+    # Shielded so a cancelled pipeline does not fail the other mints in the batch
+    return await asyncio.shield(future)
+
+async def filter_bonding_phase(token_addresses, client):
+    """Return the subset of mints still in bonding phase, using one batched RPC call per 100 mints."""
     try:
-        bonding_curve_account = await client.get_program_accounts(PUMP_FUN_PROGRAM_ID)
-        # Placeholder logic: Assume bonding phase if token is newly created
-        return True  # Replace with actual bonding curve check
+        states = await fetch_bonding_curves(client, token_addresses)
     except Exception as e:
-        print(f"Error checking bonding phase for {token_address}: {e}")
-        return False
+        print(f"Error checking bonding phase for {len(token_addresses)} tokens: {e}")
+        return []
+    for mint, state in states.items():
+        curve_table.update_from_account(mint, state)
+    return [mint for mint, state in states.items() if state is not None and not state.complete]
 
-async def check_holder_distribution(token_address, client):
-    """Check if top 10 holders own less than 50% of supply."""
-    try:
-        token_accounts = await client.get_token_accounts_by_owner(TokenAccountOpts(token_address))
-        total_supply = await client.get_token_supply(token_address)
-        total_supply_value = total_supply.value.ui_amount
+async def top_10_holders_percent(token_address, client):
+    """Percentage of supply held by the top 10 holders, excluding the bonding curve."""
+    mint = PublicKey(token_address)
+    largest_accounts = await client.get_token_largest_accounts(mint)
+    total_supply = await client.get_token_supply(mint)
+    total_supply_value = total_supply.value.ui_amount
 
-        balances = [account.value.ui_amount for account in token_accounts.value]
-        balances.sort(reverse=True)
-        top_10_sum = sum(balances[:10]) if len(balances) >= 10 else sum(balances)
-        top_10_percent = (top_10_sum / total_supply_value) * 100
+    # The bonding curve's own token account holds the unsold supply; it is not a holder
+    curve_account = derive_associated_token_account(derive_bonding_curve(token_address), token_address)
+    balances = [account.amount.ui_amount or 0 for account in largest_accounts.value if account.address != curve_account]
+    balances.sort(reverse=True)
+    top_10_sum = sum(balances[:10]) if len(balances) >= 10 else sum(balances)
+    top_10_percent = (top_10_sum / total_supply_value) * 100
+    # Every holder read is a refresh; a verdict built on a different share is stale
+    _on_holder_refresh(token_address, top_10_percent)
+    return top_10_percent
 
-        return top_10_percent <= MAX_TOP_10_HOLDERS_PERCENT
+async def check_holder_distribution(token_address, client):
+    """Check that the top 10 holders, excluding the bonding curve, own at most MAX_TOP_10_HOLDERS_PERCENT of supply."""
+    try:
+        return _holders_pass(await top_10_holders_percent(token_address, client))
     except Exception as e:
         print(f"Error checking holder distribution for {token_address}: {e}")
         return False
@@ -95,23 +389,37 @@ async def check_holder_distribution(token_address, client):
 async def is_rug_or_honeypot(token_address):
     """Check if token is a rug pull or honeypot using RugCheck API."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.rugcheck.xyz/v1/tokens/{token_address}/report") as response:
-                data = await response.json()
-                risk_score = data.get("risk_score", 100)
-                return risk_score > 20  # Adjust threshold based on testing
+        session = get_session()
+        async with session.get(f"{RUGCHECK_API_URL}/v1/tokens/{token_address}/report") as response:
+            data = await response.json()
+            risk_score = data.get("risk_score", 100)
+            return risk_score > 20  # Adjust threshold based on testing
     except Exception as e:
         print(f"Error checking rug/honeypot for {token_address}: {e}")
         return False
 
 async def check_dev_history(token_address, client):
-    """Check if token's developer has a history of successful tokens."""
-    # Placeholder: Query Solana blockchain for dev's previous tokens
+    """Check the token's creator against the local creator-history index.
+
+    Rejects serial launchers and creators whose earlier tokens were flagged as rugs or
+    rarely graduated. Creators the index has not seen (no history yet) pass.
+    """
     try:
-        return True  # Replace with actual dev history check
+        history = await get_creator_index().creator_history(token_address)
     except Exception as e:
         print(f"Error checking dev history for {token_address}: {e}")
         return False
+    if history is None:
+        return True
+    launched = history["launched"]
+    if launched > DEV_MAX_LAUNCHES:
+        return False
+    # The token being validated is already counted as launched
+    if launched - 1 < DEV_MIN_HISTORY:
+        return True
+    if history["rug_flags"] / launched > DEV_MAX_RUG_RATIO:
+        return False
+    return history["graduated"] / launched >= DEV_MIN_GRADUATION_RATE
 
 async def check_social_sentiment(token_address):
     """Check social media for trending narratives."""
@@ -0,0 +1,85 @@
+import asyncio
+import aiohttp
+from config import (
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_TIMEOUT_SECONDS,
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+)
+
+# One pooled session for the whole process; created lazily inside the running loop
+_session = None
+_stats = {
+    "requests": 0,
+    "pool_hits": 0,
+    "pool_misses": 0,
+    "dns_cache_hits": 0,
+    "dns_cache_misses": 0,
+}
+
+async def _on_request_start(session, ctx, params):
+    _stats["requests"] += 1
+
+async def _on_connection_reuseconn(session, ctx, params):
+    _stats["pool_hits"] += 1
+
+async def _on_connection_create_end(session, ctx, params):
+    _stats["pool_misses"] += 1
+
+async def _on_dns_cache_hit(session, ctx, params):
+    _stats["dns_cache_hits"] += 1
+
+async def _on_dns_cache_miss(session, ctx, params):
+    _stats["dns_cache_misses"] += 1
+
+def _trace_config():
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_dns_cache_hit.append(_on_dns_cache_hit)
+    trace_config.on_dns_cache_miss.append(_on_dns_cache_miss)
+    return trace_config
+
+def get_session():
+    """Return the process-wide pooled HTTP session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True,
+        )
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[_trace_config()])
+    return _session
+
+async def close_session():
+    """Close the pooled HTTP session and release its connections."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        # Give the connector a moment to close TLS transports cleanly
+        await asyncio.sleep(0.25)
+    _session = None
+
+def pool_stats():
+    """Return connection pool hit/miss counters for the pooled session."""
+    stats = dict(_stats)
+    connections = stats["pool_hits"] + stats["pool_misses"]
+    stats["pool_hit_ratio"] = stats["pool_hits"] / connections if connections else 0.0
+    return stats
+
+async def json_rpc(endpoint, method, params=None):
+    """Send a Solana JSON-RPC request over the pooled session and return its result."""
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}
+    async with get_session().post(endpoint, json=payload) as response:
+        data = await response.json(content_type=None)
+    if data.get("error"):
+        raise RuntimeError(f"{method} failed: {data['error']}")
+    return data.get("result")
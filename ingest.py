@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import deque
+from dedup import SeenSet
+from config import (
+    INGEST_QUEUE_SIZE,
+    INGEST_WORKERS,
+    INGEST_OVERFLOW_POLICY,
+    INGEST_MAX_EVENT_AGE_SECONDS,
+)
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_STALE = "drop_stale"
+
+class IngestQueue:
+    """Bounded queue between the log subscriptions and a pool of processing workers."""
+
+    def __init__(self, handler, maxsize=INGEST_QUEUE_SIZE, workers=INGEST_WORKERS,
+                 overflow_policy=INGEST_OVERFLOW_POLICY, max_event_age=INGEST_MAX_EVENT_AGE_SECONDS,
+                 seen=None):
+        if overflow_policy not in (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_STALE):
+            raise ValueError(f"Unknown ingest overflow policy: {overflow_policy}")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.num_workers = workers
+        self.overflow_policy = overflow_policy
+        self.max_event_age = max_event_age
+        # Claimed keys are signatures, which only repeat within seconds; no Bloom tier needed
+        self.seen = seen if seen is not None else SeenSet(bloom_capacity=0)
+        self._events = deque()  # (enqueued_at, event)
+        self._wakeup = asyncio.Event()
+        self._workers = []
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+        self.max_depth = 0
+        self._age_total = 0.0
+        self._age_max = 0.0
+        self._last_age = 0.0
+
+    def start(self):
+        """Start the worker pool."""
+        for index in range(self.num_workers):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+
+    async def stop(self):
+        """Cancel the workers; queued events are discarded."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def claim(self, key):
+        """Return True the first time a key (e.g. a signature) is seen, False for repeats."""
+        if self.seen.add(key):
+            return True
+        self.duplicates += 1
+        return False
+
+    def put(self, event, key=None):
+        """Enqueue an event without blocking; returns False if it was dropped."""
+        if key is not None and not self.claim(key):
+            return False
+        now = time.monotonic()
+        if len(self._events) >= self.maxsize:
+            if self.overflow_policy == OVERFLOW_DROP_OLDEST:
+                self._events.popleft()
+                self.dropped_overflow += 1
+            else:
+                self._drop_stale(now)
+                if len(self._events) >= self.maxsize:
+                    # Everything queued is still fresh, so the newcomer is the one to shed
+                    self.dropped_overflow += 1
+                    return False
+        self._events.append((now, event))
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._events))
+        self._wakeup.set()
+        return True
+
+    def _drop_stale(self, now):
+        while self._events and now - self._events[0][0] > self.max_event_age:
+            self._events.popleft()
+            self.dropped_stale += 1
+
+    async def _worker(self, index):
+        while True:
+            if not self._events:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            enqueued_at, event = self._events.popleft()
+            age = time.monotonic() - enqueued_at
+            self._last_age = age
+            self._age_total += age
+            self._age_max = max(self._age_max, age)
+            if self.max_event_age and age > self.max_event_age:
+                self.dropped_stale += 1
+                continue
+            try:
+                await self.handler(event)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Ingest worker {index} failed to process event: {e}")
+
+    def stats(self):
+        """Return queue depth, drop counters and event age at dequeue."""
+        dequeued = self.processed + self.failed + self.dropped_stale
+        return {
+            "depth": len(self._events),
+            "max_depth": self.max_depth,
+            "workers": len(self._workers),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "dropped_overflow": self.dropped_overflow,
+            "dropped_stale": self.dropped_stale,
+            "last_age_seconds": self._last_age,
+            "avg_age_seconds": self._age_total / dequeued if dequeued else 0.0,
+            "max_age_seconds": self._age_max,
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import JOURNAL_PATH, JOURNAL_FLUSH_INTERVAL_SECONDS, JOURNAL_SNAPSHOT_EVERY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL
+);
+CREATE TABLE IF NOT EXISTS buys (
+    id INTEGER PRIMARY KEY,
+    cycle_id INTEGER NOT NULL,
+    token_address TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    amount REAL NOT NULL,
+    timestamp REAL NOT NULL,
+    tx_id TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS buys_by_cycle ON buys (cycle_id);
+CREATE TABLE IF NOT EXISTS snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    cycle_id INTEGER NOT NULL,
+    cycle_started_at REAL NOT NULL,
+    buys_completed INTEGER NOT NULL,
+    last_buy_id INTEGER NOT NULL,
+    taken_at REAL NOT NULL
+);
+"""
+
+class TradeJournal:
+    """Crash-safe record of confirmed buys and 30-day cycles in a SQLite WAL database.
+
+    Writes are queued and committed in batches on a dedicated thread, one fsync per
+    batch. A snapshot row of the cycle counters is rewritten every few buys, so
+    recovery reads the snapshot plus the buys logged after it.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, flush_interval=JOURNAL_FLUSH_INTERVAL_SECONDS,
+                 snapshot_every=JOURNAL_SNAPSHOT_EVERY):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        # One thread owns every statement, so the connection is never used concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+        self._pending = []  # (sql, params)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.cycle_id = None
+        self.cycle_started_at = None
+        self.buys_completed = 0
+        self._last_buy_id = 0
+        self._buys_since_snapshot = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_seconds = 0.0
+        self.recovery_seconds = 0.0
+
+    def recover(self):
+        """Load the current cycle from the snapshot and log tail; returns its state and buy records."""
+        started = time.monotonic()
+        db = self._db
+        self._last_buy_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM buys").fetchone()[0]
+        snapshot = db.execute(
+            "SELECT cycle_id, cycle_started_at, buys_completed, last_buy_id FROM snapshot WHERE id = 1"
+        ).fetchone()
+        if snapshot is not None:
+            cycle_id, cycle_started_at, buys_completed, last_buy_id = snapshot
+            # A cycle started after the snapshot was taken supersedes it
+            newer = db.execute(
+                "SELECT id, started_at FROM cycles WHERE id > ? ORDER BY id DESC LIMIT 1", (cycle_id,)
+            ).fetchone()
+            if newer is not None:
+                cycle_id, cycle_started_at = newer
+                buys_completed = 0
+            buys_completed += db.execute(
+                "SELECT COUNT(*) FROM buys WHERE id > ? AND cycle_id = ?", (last_buy_id, cycle_id)
+            ).fetchone()[0]
+        else:
+            latest = db.execute("SELECT id, started_at FROM cycles ORDER BY id DESC LIMIT 1").fetchone()
+            if latest is None:
+                latest = (1, time.time())
+                with db:
+                    db.execute("BEGIN")
+                    db.execute("INSERT INTO cycles (id, started_at) VALUES (?, ?)", latest)
+            cycle_id, cycle_started_at = latest
+            buys_completed = db.execute("SELECT COUNT(*) FROM buys WHERE cycle_id = ?", (cycle_id,)).fetchone()[0]
+        self.cycle_id = cycle_id
+        self.cycle_started_at = cycle_started_at
+        self.buys_completed = buys_completed
+        # The current cycle holds at most NUM_BUYS rows; older cycles stay on disk
+        buy_records = self._records(cycle_id)
+        self.recovery_seconds = time.monotonic() - started
+        print(f"Recovered cycle {cycle_id} with {buys_completed} buys in {self.recovery_seconds * 1000:.1f}ms")
+        return {
+            "cycle_id": cycle_id,
+            "cycle_started_at": cycle_started_at,
+            "buys_completed": buys_completed,
+            "buy_records": buy_records,
+        }
+
+    def _records(self, cycle_id):
+        rows = self._db.execute(
+            "SELECT token_address, platform, amount, timestamp, tx_id FROM buys WHERE cycle_id = ? ORDER BY id",
+            (cycle_id,),
+        ).fetchall()
+        return [
+            {"token_address": token_address, "platform": platform, "amount": amount, "timestamp": timestamp, "tx_id": tx_id}
+            for token_address, platform, amount, timestamp, tx_id in rows
+        ]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+
+    async def close(self):
+        """Flush queued writes with a final snapshot and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._queue_snapshot()
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._db.close)
+        self._executor.shutdown()
+
+    def record_buy(self, record):
+        """Queue a confirmed buy for the current cycle; does not block on disk."""
+        self._last_buy_id += 1
+        self._pending.append((
+            "INSERT INTO buys (id, cycle_id, token_address, platform, amount, timestamp, tx_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self._last_buy_id, self.cycle_id, record["token_address"], record["platform"],
+             record["amount"], record["timestamp"], record["tx_id"]),
+        ))
+        self.buys_completed += 1
+        self._buys_since_snapshot += 1
+        if self._buys_since_snapshot >= self.snapshot_every:
+            self._queue_snapshot()
+        self._wakeup.set()
+
+    def start_cycle(self, started_at):
+        """Close the current cycle and open the next; returns the finished cycle's id."""
+        finished = self.cycle_id
+        self._pending.append(("UPDATE cycles SET ended_at = ? WHERE id = ?", (started_at, finished)))
+        self.cycle_id = finished + 1
+        self.cycle_started_at = started_at
+        self.buys_completed = 0
+        self._pending.append(("INSERT INTO cycles (id, started_at) VALUES (?, ?)", (self.cycle_id, started_at)))
+        self._queue_snapshot()
+        self._wakeup.set()
+        return finished
+
+    def _queue_snapshot(self):
+        if self.cycle_id is None:
+            return
+        self._pending.append((
+            "INSERT OR REPLACE INTO snapshot (id, cycle_id, cycle_started_at, buys_completed, last_buy_id, taken_at) VALUES (1, ?, ?, ?, ?, ?)",
+            (self.cycle_id, self.cycle_started_at, self.buys_completed, self._last_buy_id, time.time()),
+        ))
+        self._buys_since_snapshot = 0
+
+    def _write(self, batch):
+        started = time.monotonic()
+        with self._db:
+            self._db.execute("BEGIN")
+            for sql, params in batch:
+                try:
+                    self._db.execute(sql, params)
+                except sqlite3.IntegrityError as e:
+                    # A failed statement does not abort the transaction; the rest of the batch still commits
+                    print(f"Trade journal rejected a write ({e}): {params}")
+        return time.monotonic() - started
+
+    async def flush(self):
+        """Commit everything queued so far in one transaction on the journal thread."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            self.last_flush_seconds = await asyncio.get_running_loop().run_in_executor(self._executor, self._write, batch)
+        except Exception:
+            # Keep the batch so the next flush retries it ahead of newer writes
+            self._pending = batch + self._pending
+            raise
+        self.flushes += 1
+        self.rows_written += len(batch)
+
+    async def _flusher(self):
+        while True:
+            await self._wakeup.wait()
+            # Let writes that arrive together share one commit
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing trade journal: {e}")
+
+    async def _query(self, func, *args):
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def cycle_records(self, cycle_id):
+        """Buy records of one cycle, read from disk."""
+        return await self._query(self._records, cycle_id)
+
+    def stats(self):
+        return {
+            "cycle_id": self.cycle_id,
+            "buys_completed": self.buys_completed,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "last_flush_seconds": self.last_flush_seconds,
+            "recovery_seconds": self.recovery_seconds,
+        }
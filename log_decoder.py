@@ -0,0 +1,260 @@
+import base64
+import re
+import struct
+from solders.pubkey import Pubkey
+from http_client import json_rpc
+from config import RPC_ENDPOINT, PUMP_FUN_PROGRAM_ID, RAYDIUM_PROGRAM_ID
+
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+
+# Anchor discriminators: sha256("event:<Name>")[:8] and sha256("global:<name>")[:8]
+PUMP_CREATE_EVENT_DISCRIMINATOR = bytes.fromhex("1b72a94ddeeb6376")
+PUMP_CREATE_IX_DISCRIMINATOR = bytes.fromhex("181ec828051c0777")
+PUMP_TRADE_EVENT_DISCRIMINATOR = bytes.fromhex("bddb7fd34ee661ee")
+
+# TradeEvent after the discriminator: mint, sol_amount, token_amount, is_buy, user, timestamp,
+# virtual_sol_reserves, virtual_token_reserves
+PUMP_TRADE_EVENT_LAYOUT = struct.Struct("<32sQQ?32sqQQ")
+
+PUMP_CREATE_MARKER = "Program log: Instruction: Create"
+PROGRAM_DATA_PREFIX = "Program data: "
+RAY_LOG_PREFIX = "Program log: ray_log: "
+# The first six discriminator bytes encode to exactly eight base64 characters, so event
+# lines can be told apart before decoding them
+PUMP_CREATE_EVENT_LINE_PREFIX = PROGRAM_DATA_PREFIX + base64.b64encode(PUMP_CREATE_EVENT_DISCRIMINATOR[:6]).decode()
+PUMP_TRADE_EVENT_LINE_PREFIX = PROGRAM_DATA_PREFIX + base64.b64encode(PUMP_TRADE_EVENT_DISCRIMINATOR[:6]).decode()
+RAYDIUM_INITIALIZE2_MARKER = "initialize2"
+LOG_TRUNCATED_MARKER = "Log truncated"
+
+# Precompiled new-token triggers: pump.fun emits an exact Anchor instruction line,
+# Raydium prefixes its initialize2 line with the instruction name
+RAYDIUM_INITIALIZE2_PATTERN = re.compile(r"Program log: initialize2: ")
+
+# Raydium AMM v4 initialize2: instruction tag and account positions
+RAYDIUM_INITIALIZE2_TAG = 1
+RAYDIUM_AMM_INDEX = 4
+RAYDIUM_LP_MINT_INDEX = 7
+RAYDIUM_COIN_MINT_INDEX = 8
+RAYDIUM_PC_MINT_INDEX = 9
+
+# pump.fun create: account positions
+PUMP_CREATE_MINT_INDEX = 0
+PUMP_CREATE_BONDING_CURVE_INDEX = 2
+PUMP_CREATE_USER_INDEX = 7
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+def b58decode(value):
+    """Decode a base58 string (instruction data in getTransaction responses)."""
+    number = 0
+    for char in value:
+        number = number * 58 + B58_INDEX[char]
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big") if number else b""
+    pad = len(value) - len(value.lstrip("1"))
+    return b"\x00" * pad + body
+
+def _pubkey(data, offset):
+    return str(Pubkey.from_bytes(data[offset:offset + 32])), offset + 32
+
+def _borsh_string(data, offset):
+    (length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    return data[offset:offset + length].decode("utf-8", errors="replace"), offset + length
+
+def decode_pump_create_event(data):
+    """Decode a pump.fun CreateEvent payload (without the Program data prefix)."""
+    if data[:8] != PUMP_CREATE_EVENT_DISCRIMINATOR:
+        return None
+    offset = 8
+    name, offset = _borsh_string(data, offset)
+    symbol, offset = _borsh_string(data, offset)
+    uri, offset = _borsh_string(data, offset)
+    mint, offset = _pubkey(data, offset)
+    bonding_curve, offset = _pubkey(data, offset)
+    creator, offset = _pubkey(data, offset)
+    return {
+        "platform": "pumpfun",
+        "mint": mint,
+        "bonding_curve": bonding_curve,
+        "creator": creator,
+        "name": name,
+        "symbol": symbol,
+        "uri": uri,
+    }
+
+def decode_pump_trade_event(data):
+    """Decode a pump.fun TradeEvent payload (without the Program data prefix)."""
+    if data[:8] != PUMP_TRADE_EVENT_DISCRIMINATOR or len(data) < 8 + PUMP_TRADE_EVENT_LAYOUT.size:
+        return None
+    mint, sol_amount, token_amount, is_buy, user, timestamp, virtual_sol, virtual_token = PUMP_TRADE_EVENT_LAYOUT.unpack_from(data, 8)
+    return {
+        "mint": str(Pubkey.from_bytes(mint)),
+        "sol_amount": sol_amount,
+        "token_amount": token_amount,
+        "is_buy": is_buy,
+        "user": str(Pubkey.from_bytes(user)),
+        "timestamp": timestamp,
+        "virtual_sol_reserves": virtual_sol,
+        "virtual_token_reserves": virtual_token,
+    }
+
+def decode_ray_init_log(data):
+    """Decode a Raydium ray_log InitLog (log_type 0) payload."""
+    if not data or data[0] != 0 or len(data) < 75:
+        return None
+    open_time, pc_decimals, coin_decimals, _pc_lot, _coin_lot, pc_amount, coin_amount = struct.unpack_from("<QBBQQQQ", data, 1)
+    market, _ = _pubkey(data, 43)
+    return {
+        "open_time": open_time,
+        "pc_decimals": pc_decimals,
+        "coin_decimals": coin_decimals,
+        "init_pc_amount": pc_amount,
+        "init_coin_amount": coin_amount,
+        "market": market,
+    }
+
+def matches_new_token(platform, logs):
+    """Fast check whether a transaction's logs contain a new-token instruction."""
+    if platform == "pumpfun":
+        # Exact line match runs as a single C-level list scan
+        return PUMP_CREATE_MARKER in logs
+    if platform == "raydium":
+        match = RAYDIUM_INITIALIZE2_PATTERN.match
+        for log in logs:
+            if match(log):
+                return True
+    return False
+
+def _program_data(logs):
+    for log in logs:
+        if log.startswith(PROGRAM_DATA_PREFIX):
+            try:
+                yield base64.b64decode(log[len(PROGRAM_DATA_PREFIX):])
+            except ValueError:
+                continue
+
+def _is_truncated(logs):
+    return any(LOG_TRUNCATED_MARKER in log for log in logs)
+
+def decode_pump_logs(logs):
+    """Return the decoded create event from pump.fun logs, or None if there is none."""
+    for data in _program_data(logs):
+        try:
+            event = decode_pump_create_event(data)
+        except (struct.error, ValueError):
+            continue
+        if event:
+            return event
+    return None
+
+def decode_pump_events(logs):
+    """Yield pump.fun create and trade events from logs in order, skipping other Program data lines."""
+    for log in logs:
+        if log.startswith(PUMP_TRADE_EVENT_LINE_PREFIX):
+            decode = decode_pump_trade_event
+        elif log.startswith(PUMP_CREATE_EVENT_LINE_PREFIX):
+            decode = decode_pump_create_event
+        else:
+            continue
+        try:
+            event = decode(base64.b64decode(log[len(PROGRAM_DATA_PREFIX):]))
+        except (struct.error, ValueError):
+            continue
+        if event:
+            yield event
+
+def decode_raydium_logs(logs):
+    """Return the InitLog details from Raydium initialize2 logs, or None."""
+    for log in logs:
+        if log.startswith(RAY_LOG_PREFIX):
+            try:
+                event = decode_ray_init_log(base64.b64decode(log[len(RAY_LOG_PREFIX):]))
+            except (struct.error, ValueError):
+                continue
+            if event:
+                return event
+    return None
+
+async def fetch_transaction(signature, endpoint=RPC_ENDPOINT):
+    """Fetch a transaction as jsonParsed with its inner instructions."""
+    return await json_rpc(endpoint, "getTransaction", [
+        signature,
+        {"encoding": "jsonParsed", "commitment": "confirmed", "maxSupportedTransactionVersion": 0},
+    ])
+
+def _program_instructions(tx, program_id):
+    """Yield (accounts, data) for every top-level and inner instruction of a program."""
+    message = tx["transaction"]["message"]
+    instructions = list(message.get("instructions", []))
+    for inner in (tx.get("meta") or {}).get("innerInstructions") or []:
+        instructions.extend(inner.get("instructions", []))
+    for ix in instructions:
+        if ix.get("programId") == program_id and "data" in ix:
+            yield ix.get("accounts", []), b58decode(ix["data"])
+
+def decode_pump_transaction(tx):
+    """Recover a pump.fun create from a full transaction when the logs were truncated.
+
+    The event carries the transaction's blockTime as created_at when the RPC reports one.
+    """
+    logs = (tx.get("meta") or {}).get("logMessages") or []
+    event = decode_pump_logs(logs)
+    if not event:
+        for accounts, data in _program_instructions(tx, PUMP_FUN_PROGRAM_ID):
+            if data[:8] == PUMP_CREATE_IX_DISCRIMINATOR and len(accounts) > PUMP_CREATE_USER_INDEX:
+                event = {
+                    "platform": "pumpfun",
+                    "mint": accounts[PUMP_CREATE_MINT_INDEX],
+                    "bonding_curve": accounts[PUMP_CREATE_BONDING_CURVE_INDEX],
+                    "creator": accounts[PUMP_CREATE_USER_INDEX],
+                }
+                break
+    if event and tx.get("blockTime"):
+        event["created_at"] = tx["blockTime"]
+    return event
+
+def decode_raydium_transaction(tx):
+    """Resolve the pool and mints of a Raydium initialize2 from its transaction."""
+    for accounts, data in _program_instructions(tx, RAYDIUM_PROGRAM_ID):
+        if data[:1] == bytes([RAYDIUM_INITIALIZE2_TAG]) and len(accounts) > RAYDIUM_PC_MINT_INDEX:
+            coin_mint = accounts[RAYDIUM_COIN_MINT_INDEX]
+            pc_mint = accounts[RAYDIUM_PC_MINT_INDEX]
+            return {
+                "platform": "raydium",
+                # The new token is whichever side of the pool is not wrapped SOL
+                "mint": pc_mint if coin_mint == WSOL_MINT else coin_mint,
+                "pool": accounts[RAYDIUM_AMM_INDEX],
+                "lp_mint": accounts[RAYDIUM_LP_MINT_INDEX],
+                "coin_mint": coin_mint,
+                "pc_mint": pc_mint,
+            }
+    return None
+
+async def decode_new_token_event(logs, platform, signature=None):
+    """Decode a new-token event from logsSubscribe logs, fetching the transaction only if needed.
+
+    pump.fun creates are read from the Anchor CreateEvent in "Program data:". Raydium
+    initialize2 logs carry the market and amounts but not the pool accounts, so the
+    mints are resolved with a single getTransaction call.
+    """
+    if platform == "pumpfun":
+        event = decode_pump_logs(logs)
+        if event or not signature:
+            return event
+        if not any(PUMP_CREATE_MARKER in log for log in logs) or not _is_truncated(logs):
+            return None
+        tx = await fetch_transaction(signature)
+        return decode_pump_transaction(tx) if tx else None
+
+    if platform == "raydium":
+        if not any(RAYDIUM_INITIALIZE2_MARKER in log for log in logs) or not signature:
+            return None
+        init_log = decode_raydium_logs(logs) or {}
+        tx = await fetch_transaction(signature)
+        event = decode_raydium_transaction(tx) if tx else None
+        if event:
+            event.update(init_log)
+        return event
+
+    return None
@@ -1,35 +1,85 @@
 import asyncio
-import aiohttp
+import metrics
 from trading import TradingBot
 from reporting import send_report
-from utils import monitor_new_tokens, telegram_webhook
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, ADMIN_USER_ID
+from utils import monitor_new_tokens, telegram_webhook, send_token_notification, update_receiver
+from http_client import close_session, pool_stats
+from telegram_dispatcher import telegram, PRIORITY_ADMIN
+from market_data import token_market_cache
+from creator_index import get_creator_index, close_creator_index
+from subscribers import get_subscribers, close_subscribers
+from curve_state import curve_table
+from config import TELEGRAM_CHAT_ID, ADMIN_USER_ID, NUM_BUYS
 
 async def main():
     bot = TradingBot()
+    bot.start()
     chat_id = TELEGRAM_CHAT_ID
 
-    async def handle_new_token(token_address, chat_id=chat_id, platform="pumpfun"):
+    async def handle_new_token(token_address, chat_id=chat_id, platform="pumpfun", verdict=None):
         if await bot.check_cycle():
             print("New 30-day cycle started.")
-            bot.buy_records = []
-            await send_report(bot, chat_id)
-        if bot.buys_completed < bot.NUM_BUYS:
-            if await bot.buy_token(token_address, ADMIN_USER_ID, platform):
-                async with aiohttp.ClientSession() as session:
-                    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-                    payload = {
-                        "chat_id": chat_id,
-                        "text": f"✅ Admin bought token {token_address} on {platform.capitalize()}!",
-                        "parse_mode": "Markdown"
-                    }
-                    async with session.post(url, json=payload) as response:
-                        if response.status != 200:
-                            print(f"Failed to send buy confirmation: {await response.text()}")
+            # Report the cycle that just finished, read back from the journal
+            await send_report(bot, chat_id, bot.previous_cycle_id)
+        if bot.buys_completed < NUM_BUYS:
+            if await bot.buy_token(token_address, ADMIN_USER_ID, platform, verdict):
+                paper = " (paper trade)" if bot.paper is not None else ""
+                telegram.send_message(
+                    chat_id,
+                    f"✅ Admin bought token {token_address} on {platform.capitalize()}{paper}!",
+                    PRIORITY_ADMIN
+                )
         await send_token_notification(token_address, chat_id, platform)
 
+    for prefix, collect in (
+        ("http_pool", pool_stats),
+        ("market_cache", token_market_cache.stats),
+        ("chain_state", bot.chain_state.stats),
+        ("sender", bot.sender.stats),
+        ("journal", bot.journal.stats),
+        ("creator_index", lambda: get_creator_index().stats()),
+        ("curve_table", curve_table.stats),
+        ("telegram", telegram.stats),
+        ("subscribers", lambda: get_subscribers().stats()),
+        ("telegram_updates", update_receiver.stats),
+    ):
+        metrics.register_collector(prefix, collect)
+    if bot.paper is not None:
+        metrics.register_collector("paper", bot.paper.stats)
+    metrics_runner = await metrics.start_metrics_server()
+    metrics.start_trace_log()
+
+    # Load the subscriber log now rather than on the first alert's broadcast
+    get_subscribers()
+    telegram.start()
+    curve_table.start()
     asyncio.create_task(telegram_webhook())
-    await monitor_new_tokens(handle_new_token, chat_id)
+    try:
+        await monitor_new_tokens(handle_new_token, chat_id)
+    finally:
+        print(f"HTTP pool stats: {pool_stats()}")
+        print(f"Market data cache stats: {token_market_cache.stats()}")
+        print(f"Chain state stats: {bot.chain_state.stats()}")
+        print(f"Transaction sender stats: {bot.sender.stats()}")
+        print(f"Trade journal stats: {bot.journal.stats()}")
+        print(f"Creator index stats: {get_creator_index().stats()}")
+        print(f"Curve table stats: {curve_table.stats()}")
+        if bot.paper is not None:
+            print(f"Paper trading stats: {bot.paper.stats()}")
+        for stage, summary in metrics.snapshot().items():
+            print(f"Stage {stage}: {summary}")
+        await bot.stop()
+        await curve_table.stop()
+        await telegram.stop()
+        await close_creator_index()
+        print(f"Telegram dispatcher stats: {telegram.stats()}")
+        print(f"Subscriber stats: {get_subscribers().stats()}")
+        print(f"Telegram update stats: {update_receiver.stats()}")
+        close_subscribers()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        metrics.stop_trace_log()
+        await close_session()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
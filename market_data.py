@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict
+from http_client import get_session
+from config import MARKET_DATA_TTL_SECONDS, MARKET_DATA_MAX_ENTRIES, DEXSCREENER_API_URL
+
+DEXSCREENER_TOKENS_URL = DEXSCREENER_API_URL + "/latest/dex/tokens/{}"
+
+class TokenMarketCache:
+    """TTL + LRU cache of DexScreener token documents with in-flight request coalescing."""
+
+    def __init__(self, ttl=MARKET_DATA_TTL_SECONDS, max_entries=MARKET_DATA_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # mint -> (fetched_at, document)
+        self._inflight = {}  # mint -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+        self._refresh_listeners = []
+
+    def add_refresh_listener(self, listener):
+        """Call listener(mint, document) whenever a mint's document is refreshed."""
+        self._refresh_listeners.append(listener)
+
+    async def get(self, mint):
+        """Return the DexScreener document for a mint, fetching it at most once per TTL."""
+        entry = self._entries.get(mint)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self._entries.move_to_end(mint)
+                self.hits += 1
+                self._hit_age_total += age
+                self._hit_age_max = max(self._hit_age_max, age)
+                return entry[1]
+
+        task = self._inflight.get(mint)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(mint))
+            self._inflight[mint] = task
+            task.add_done_callback(lambda _: self._inflight.pop(mint, None))
+        # Shield so one cancelled caller does not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _fetch(self, mint):
+        session = get_session()
+        async with session.get(DEXSCREENER_TOKENS_URL.format(mint)) as response:
+            if response.status != 200:
+                # Do not cache rate-limit or server errors
+                self.errors += 1
+                return None
+            document = await response.json()
+        self.put(mint, document)
+        return document
+
+    def put(self, mint, document):
+        """Store a freshly fetched document, evicting the least recently used entries."""
+        self._entries[mint] = (time.monotonic(), document)
+        self._entries.move_to_end(mint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        for listener in self._refresh_listeners:
+            try:
+                listener(mint, document)
+            except Exception as e:
+                print(f"Error in market data refresh listener for {mint}: {e}")
+
+    def invalidate(self, mint):
+        """Drop a cached document so the next lookup refetches it."""
+        self._entries.pop(mint, None)
+
+    def stats(self):
+        """Return hit ratio and staleness metrics for the cache."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "avg_hit_age_seconds": self._hit_age_total / self.hits if self.hits else 0.0,
+            "max_hit_age_seconds": self._hit_age_max,
+        }
+
+token_market_cache = TokenMarketCache()
+
+async def get_token_pairs(mint):
+    """Return the DexScreener pairs for a mint, or an empty list if unavailable."""
+    document = await token_market_cache.get(mint)
+    if not document:
+        return []
+    return document.get("pairs") or []
@@ -0,0 +1,199 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from bisect import bisect_left
+from aiohttp import web
+from config import METRICS_HOST, METRICS_PORT, METRICS_TRACE_FILE, METRICS_TRACE_MAX_BYTES, METRICS_TRACE_BACKUP_COUNT
+
+# 50us doubling up to ~105s; wide enough for both local decoding and transaction confirmation
+BUCKET_BOUNDS = [50e-6 * 2 ** i for i in range(22)]
+
+class Histogram:
+    """Fixed-bucket latency histogram with estimated quantiles."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+_histograms = {}
+_collectors = []
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def observe(stage, seconds):
+    """Record one duration for a stage."""
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        histogram = _histograms[stage] = Histogram()
+    histogram.observe(seconds)
+
+def register_collector(prefix, func):
+    """Export the numeric values of func()'s dict as gauges named <prefix>_<key>."""
+    _collectors.append((prefix, func))
+
+def snapshot():
+    """Per-stage count, mean, p50, p99 and max in milliseconds."""
+    return {
+        stage: {
+            "count": histogram.count,
+            "mean_ms": histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+            "p50_ms": histogram.quantile(0.5) * 1000,
+            "p99_ms": histogram.quantile(0.99) * 1000,
+            "max_ms": histogram.max * 1000,
+        }
+        for stage, histogram in sorted(_histograms.items())
+    }
+
+class Trace:
+    """Monotonic stage timestamps for one token, from its log notification onwards."""
+
+    __slots__ = ("key", "started", "last", "stages", "fields")
+
+    def __init__(self, key, started=None):
+        self.key = key
+        self.started = started if started is not None else time.monotonic()
+        self.last = self.started
+        self.stages = []
+        self.fields = {}
+
+    def mark(self, stage):
+        """Close a stage: its duration is the time since the previous mark."""
+        now = time.monotonic()
+        observe(stage, now - self.last)
+        self.stages.append((stage, now - self.started))
+        self.last = now
+
+    def finish(self, outcome):
+        total = time.monotonic() - self.started
+        observe(f"end_to_end_{outcome}", total)
+        if _trace_logger is not None:
+            _trace_logger.info(json.dumps({
+                "key": self.key,
+                "outcome": outcome,
+                "total_ms": round(total * 1000, 3),
+                "stages": [[stage, round(elapsed * 1000, 3)] for stage, elapsed in self.stages],
+                **self.fields,
+            }))
+
+def start_trace(key, started=None):
+    """Begin a trace and make it current for this task and the tasks it creates."""
+    trace = Trace(key, started)
+    _current_trace.set(trace)
+    return trace
+
+def current_trace():
+    return _current_trace.get()
+
+def mark(stage, **fields):
+    """Mark a stage on the current trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
+        if fields:
+            trace.fields.update(fields)
+
+_trace_logger = None
+_trace_listener = None
+
+def start_trace_log(path=METRICS_TRACE_FILE, max_bytes=METRICS_TRACE_MAX_BYTES, backup_count=METRICS_TRACE_BACKUP_COUNT):
+    """Write finished traces as JSON lines to a rotating file from a background thread."""
+    global _trace_logger, _trace_listener
+    if not path or _trace_logger is not None:
+        return
+    records = queue.SimpleQueue()
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    _trace_listener = logging.handlers.QueueListener(records, file_handler)
+    _trace_listener.start()
+    logger = logging.getLogger("sniper.trace")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    _trace_logger = logger
+
+def stop_trace_log():
+    global _trace_logger, _trace_listener
+    if _trace_listener is not None:
+        _trace_listener.stop()
+        for handler in list(_trace_logger.handlers):
+            _trace_logger.removeHandler(handler)
+        _trace_listener = None
+        _trace_logger = None
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def render_prometheus():
+    """Render histograms, quantiles and collector gauges in the Prometheus text format."""
+    lines = [
+        "# HELP sniper_stage_seconds Latency of each hot-path stage.",
+        "# TYPE sniper_stage_seconds histogram",
+    ]
+    for stage, histogram in sorted(_histograms.items()):
+        label = _label(stage)
+        cumulative = 0
+        for bound, count in zip(BUCKET_BOUNDS, histogram.counts):
+            cumulative += count
+            lines.append(f'sniper_stage_seconds_bucket{{stage="{label}",le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'sniper_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+        lines.append(f'sniper_stage_seconds_sum{{stage="{label}"}} {histogram.total:.9f}')
+        lines.append(f'sniper_stage_seconds_count{{stage="{label}"}} {histogram.count}')
+    lines.append("# HELP sniper_stage_quantile_seconds Estimated p50 and p99 of each stage.")
+    lines.append("# TYPE sniper_stage_quantile_seconds gauge")
+    for stage, histogram in sorted(_histograms.items()):
+        for q in (0.5, 0.99):
+            lines.append(f'sniper_stage_quantile_seconds{{stage="{_label(stage)}",quantile="{q}"}} {histogram.quantile(q):.9f}')
+    for prefix, func in _collectors:
+        try:
+            values = func()
+        except Exception as e:
+            print(f"Error collecting {prefix} metrics: {e}")
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"sniper_{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+async def _handle_metrics(request):
+    return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics; returns the runner to clean up, or None when METRICS_PORT is 0."""
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Metrics listening on {host}:{port}/metrics")
+    return runner
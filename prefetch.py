@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+import websockets
+from solders.hash import Hash
+from http_client import json_rpc
+from config import (
+    RPC_ENDPOINT,
+    RPC_WEBSOCKET_ENDPOINTS,
+    PUMP_FUN_PROGRAM_ID,
+    BLOCKHASH_REFRESH_SECONDS,
+    BLOCKHASH_MAX_AGE_SECONDS,
+    PRIORITY_FEE_REFRESH_SECONDS,
+    PRIORITY_FEE_MAX_AGE_SECONDS,
+    PRIORITY_FEE_PERCENTILE,
+    PRIORITY_FEE_MIN_MICRO_LAMPORTS,
+    PRIORITY_FEE_MAX_MICRO_LAMPORTS,
+)
+
+# Writable accounts touched by every pump.fun buy; their recent fees price our buys
+PRIORITY_FEE_ACCOUNTS = [
+    PUMP_FUN_PROGRAM_ID,
+    "4wTV1YmiEkRvAtNtsSGPtUrqRYQMe5SKy2uB4Jjaxnjf",  # pump.fun global
+    "CebN5WGQ4jvEPvsVU4EoHEpgzq1VV7AbicfhtW4xC9iM",  # pump.fun fee recipient
+]
+
+def _percentile(values, percentile):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+    return values[index]
+
+class ChainStatePrefetcher:
+    """Keeps a recent blockhash, priority-fee estimate and wallet balance in memory."""
+
+    def __init__(self, wallet, rpc_endpoint=RPC_ENDPOINT, ws_endpoint=None):
+        self.wallet = str(wallet)
+        self.rpc_endpoint = rpc_endpoint
+        # RPC_WEBSOCKET_ENDPOINTS is derived from RPC_ENDPOINT when no websocket URL is configured
+        self.ws_endpoint = ws_endpoint or (RPC_WEBSOCKET_ENDPOINTS[0] if RPC_WEBSOCKET_ENDPOINTS else None)
+        self.blockhash = None
+        self.last_valid_block_height = None
+        self.priority_fee = None
+        self.balance_lamports = None
+        self.balance_subscribed = False
+        self._blockhash_at = 0.0
+        self._priority_fee_at = 0.0
+        self._balance_at = 0.0
+        self._tasks = []
+
+    def start(self):
+        """Start the background refresh loops."""
+        self._tasks = [
+            asyncio.create_task(self._refresh_loop(self.refresh_blockhash, BLOCKHASH_REFRESH_SECONDS)),
+            asyncio.create_task(self._refresh_loop(self.refresh_priority_fee, PRIORITY_FEE_REFRESH_SECONDS)),
+        ]
+        if self.ws_endpoint:
+            self._tasks.append(asyncio.create_task(self._balance_subscription()))
+        else:
+            print("No websocket endpoint configured; wallet balance will be read over RPC.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _refresh_loop(self, refresh, interval):
+        while True:
+            try:
+                await refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in {refresh.__name__}: {e}")
+            await asyncio.sleep(interval)
+
+    async def refresh_blockhash(self):
+        result = await json_rpc(self.rpc_endpoint, "getLatestBlockhash", [{"commitment": "confirmed"}])
+        value = result["value"]
+        self.blockhash = Hash.from_string(value["blockhash"])
+        self.last_valid_block_height = value["lastValidBlockHeight"]
+        self._blockhash_at = time.monotonic()
+
+    async def refresh_priority_fee(self):
+        result = await json_rpc(self.rpc_endpoint, "getRecentPrioritizationFees", [PRIORITY_FEE_ACCOUNTS])
+        fees = [entry["prioritizationFee"] for entry in result or [] if entry.get("prioritizationFee")]
+        fee = _percentile(fees, PRIORITY_FEE_PERCENTILE)
+        self.priority_fee = max(PRIORITY_FEE_MIN_MICRO_LAMPORTS, min(PRIORITY_FEE_MAX_MICRO_LAMPORTS, fee))
+        self._priority_fee_at = time.monotonic()
+
+    async def refresh_balance(self):
+        result = await json_rpc(self.rpc_endpoint, "getBalance", [self.wallet, {"commitment": "confirmed"}])
+        self._set_balance(result["value"])
+
+    def _set_balance(self, lamports):
+        self.balance_lamports = lamports
+        self._balance_at = time.monotonic()
+
+    async def _balance_subscription(self):
+        """Track the wallet balance with accountSubscribe, reconnecting with backoff."""
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.ws_endpoint, ping_interval=20) as ws:
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "id": 1,
+                        "method": "accountSubscribe",
+                        "params": [self.wallet, {"encoding": "base64", "commitment": "confirmed"}],
+                    }))
+                    # Seed the balance after subscribing so no change can slip in between
+                    await self.refresh_balance()
+                    self.balance_subscribed = True
+                    backoff = 1
+                    async for message in ws:
+                        data = json.loads(message)
+                        if data.get("method") == "accountNotification":
+                            self._set_balance(data["params"]["result"]["value"]["lamports"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Balance subscription error: {e}")
+            self.balance_subscribed = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def fresh_blockhash(self):
+        """Return the cached blockhash, or None if it is older than BLOCKHASH_MAX_AGE_SECONDS."""
+        if self.blockhash is None or time.monotonic() - self._blockhash_at > BLOCKHASH_MAX_AGE_SECONDS:
+            return None
+        return self.blockhash
+
+    def fresh_priority_fee(self):
+        """Return the cached priority fee, or None if it is older than PRIORITY_FEE_MAX_AGE_SECONDS."""
+        if self.priority_fee is None or time.monotonic() - self._priority_fee_at > PRIORITY_FEE_MAX_AGE_SECONDS:
+            return None
+        return self.priority_fee
+
+    def fresh_balance(self):
+        """Return the subscribed wallet balance in lamports, or None while the subscription is down."""
+        if not self.balance_subscribed:
+            return None
+        return self.balance_lamports
+
+    def stats(self):
+        """Return cached values with their ages and staleness flags for monitoring."""
+        now = time.monotonic()
+        blockhash_age = now - self._blockhash_at if self.blockhash is not None else None
+        fee_age = now - self._priority_fee_at if self.priority_fee is not None else None
+        return {
+            "blockhash": str(self.blockhash) if self.blockhash else None,
+            "blockhash_age_seconds": blockhash_age,
+            "blockhash_stale": self.fresh_blockhash() is None,
+            "priority_fee_micro_lamports": self.priority_fee,
+            "priority_fee_age_seconds": fee_age,
+            "priority_fee_stale": self.fresh_priority_fee() is None,
+            "balance_lamports": self.balance_lamports,
+            "balance_age_seconds": now - self._balance_at if self.balance_lamports is not None else None,
+            "balance_subscribed": self.balance_subscribed,
+        }
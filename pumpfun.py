@@ -0,0 +1,176 @@
+import struct
+from solana.publickey import PublicKey
+from solders.instruction import AccountMeta, Instruction
+from solders.pubkey import Pubkey
+from solders.transaction import Transaction
+from config import PUMP_FUN_PROGRAM_ID
+
+PUMP_FUN_PROGRAM = Pubkey.from_string(PUMP_FUN_PROGRAM_ID)
+BONDING_CURVE_SEED = b"bonding-curve"
+
+# Anchor account discriminator followed by five u64 fields and the complete flag
+BONDING_CURVE_LAYOUT = struct.Struct("<8sQQQQQ?")
+
+# getMultipleAccounts accepts at most 100 keys per request
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+TOKEN_DECIMALS = 6
+LAMPORTS_PER_SOL = 1_000_000_000
+
+# Every pump.fun curve starts from the same reserves; virtual minus real stays constant,
+# so real reserves can be derived from the virtual reserves a TradeEvent reports
+INITIAL_VIRTUAL_TOKEN_RESERVES = 1_073_000_000 * 10 ** TOKEN_DECIMALS
+INITIAL_VIRTUAL_SOL_RESERVES = 30 * LAMPORTS_PER_SOL
+INITIAL_REAL_TOKEN_RESERVES = 793_100_000 * 10 ** TOKEN_DECIMALS
+TOKEN_TOTAL_SUPPLY = 1_000_000_000 * 10 ** TOKEN_DECIMALS
+
+class BondingCurveState:
+    """Decoded pump.fun bonding curve account."""
+
+    def __init__(self, virtual_token_reserves, virtual_sol_reserves, real_token_reserves, real_sol_reserves, token_total_supply, complete):
+        self.virtual_token_reserves = virtual_token_reserves
+        self.virtual_sol_reserves = virtual_sol_reserves
+        self.real_token_reserves = real_token_reserves
+        self.real_sol_reserves = real_sol_reserves
+        self.token_total_supply = token_total_supply
+        self.complete = complete
+
+    @property
+    def price_sol(self):
+        """Spot price of one whole token in SOL, from the virtual reserves."""
+        if not self.virtual_token_reserves:
+            return 0.0
+        return (self.virtual_sol_reserves / LAMPORTS_PER_SOL) / (self.virtual_token_reserves / 10 ** TOKEN_DECIMALS)
+
+    def __repr__(self):
+        return (
+            f"BondingCurveState(virtual_sol={self.virtual_sol_reserves}, virtual_token={self.virtual_token_reserves}, "
+            f"real_sol={self.real_sol_reserves}, complete={self.complete})"
+        )
+
+def derive_bonding_curve(mint):
+    """Derive the bonding curve PDA for a pump.fun mint."""
+    mint_key = mint if isinstance(mint, Pubkey) else Pubkey.from_string(str(mint))
+    pda, _ = Pubkey.find_program_address([BONDING_CURVE_SEED, bytes(mint_key)], PUMP_FUN_PROGRAM)
+    return pda
+
+def decode_bonding_curve(data):
+    """Decode bonding curve account data, or return None if it is not one."""
+    if not data or len(data) < BONDING_CURVE_LAYOUT.size:
+        return None
+    _, vtoken, vsol, rtoken, rsol, supply, complete = BONDING_CURVE_LAYOUT.unpack_from(bytes(data))
+    return BondingCurveState(vtoken, vsol, rtoken, rsol, supply, complete)
+
+async def fetch_bonding_curve(client, mint):
+    """Fetch and decode one mint's bonding curve with a single getAccountInfo."""
+    response = await client.get_account_info(PublicKey(str(derive_bonding_curve(mint))))
+    account = response.value
+    return decode_bonding_curve(account.data) if account else None
+
+async def fetch_bonding_curves(client, mints):
+    """Fetch the bonding curves of many mints via getMultipleAccounts; returns {mint: state or None}."""
+    mints = list(mints)
+    states = {}
+    for start in range(0, len(mints), MAX_ACCOUNTS_PER_REQUEST):
+        chunk = mints[start:start + MAX_ACCOUNTS_PER_REQUEST]
+        keys = [PublicKey(str(derive_bonding_curve(mint))) for mint in chunk]
+        response = await client.get_multiple_accounts(keys)
+        for mint, account in zip(chunk, response.value):
+            states[mint] = decode_bonding_curve(account.data) if account else None
+    return states
+
+# Accounts used by the pump.fun buy instruction
+PUMP_GLOBAL = Pubkey.from_string("4wTV1YmiEkRvAtNtsSGPtUrqRYQMe5SKy2uB4Jjaxnjf")
+PUMP_FEE_RECIPIENT = Pubkey.from_string("CebN5WGQ4jvEPvsVU4EoHEpgzq1VV7AbicfhtW4xC9iM")
+PUMP_EVENT_AUTHORITY = Pubkey.from_string("Ce6TQqeHC9p8KetsN6JsjHK7UKZk7nKZpZBz7FJ4sG8V")
+SYSTEM_PROGRAM = Pubkey.from_string("11111111111111111111111111111111")
+TOKEN_PROGRAM = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+ASSOCIATED_TOKEN_PROGRAM = Pubkey.from_string("ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")
+RENT_SYSVAR = Pubkey.from_string("SysvarRent111111111111111111111111111111111")
+COMPUTE_BUDGET_PROGRAM = Pubkey.from_string("ComputeBudget111111111111111111111111111111")
+
+# sha256("global:buy")[:8]
+PUMP_BUY_DISCRIMINATOR = bytes.fromhex("66063d1201daebea")
+PUMP_FEE_BPS = 100
+
+def _to_pubkey(value):
+    return value if isinstance(value, Pubkey) else Pubkey.from_string(str(value))
+
+def derive_associated_token_account(owner, mint):
+    """Derive the associated token account of owner for mint."""
+    ata, _ = Pubkey.find_program_address(
+        [bytes(_to_pubkey(owner)), bytes(TOKEN_PROGRAM), bytes(_to_pubkey(mint))],
+        ASSOCIATED_TOKEN_PROGRAM,
+    )
+    return ata
+
+def tokens_out_for_sol(state, sol_lamports, fee_bps=PUMP_FEE_BPS):
+    """Tokens (base units) received for sol_lamports against the curve, after the pump.fun fee."""
+    net_sol = sol_lamports * 10_000 // (10_000 + fee_bps)
+    tokens = state.virtual_token_reserves * net_sol // (state.virtual_sol_reserves + net_sol)
+    return min(tokens, state.real_token_reserves)
+
+def sol_for_tokens(state, token_amount, fee_bps=PUMP_FEE_BPS):
+    """Lamports the program charges, fee included, to buy exactly token_amount base units."""
+    sol_cost = state.virtual_sol_reserves * token_amount // (state.virtual_token_reserves - token_amount) + 1
+    return sol_cost + sol_cost * fee_bps // 10_000
+
+def sol_out_for_tokens(state, token_amount, fee_bps=PUMP_FEE_BPS):
+    """Lamports received, after the fee, for selling token_amount base units back to the curve."""
+    sol_out = state.virtual_sol_reserves * token_amount // (state.virtual_token_reserves + token_amount)
+    return sol_out - sol_out * fee_bps // 10_000
+
+def compute_budget_instructions(unit_limit, unit_price_micro_lamports):
+    """SetComputeUnitLimit and SetComputeUnitPrice instructions."""
+    instructions = [Instruction(COMPUTE_BUDGET_PROGRAM, bytes([2]) + struct.pack("<I", unit_limit), [])]
+    if unit_price_micro_lamports:
+        instructions.append(Instruction(COMPUTE_BUDGET_PROGRAM, bytes([3]) + struct.pack("<Q", unit_price_micro_lamports), []))
+    return instructions
+
+def create_associated_token_account_idempotent(payer, owner, mint):
+    """CreateIdempotent instruction for owner's associated token account."""
+    owner, mint = _to_pubkey(owner), _to_pubkey(mint)
+    accounts = [
+        AccountMeta(payer, True, True),
+        AccountMeta(derive_associated_token_account(owner, mint), False, True),
+        AccountMeta(owner, False, False),
+        AccountMeta(mint, False, False),
+        AccountMeta(SYSTEM_PROGRAM, False, False),
+        AccountMeta(TOKEN_PROGRAM, False, False),
+    ]
+    return Instruction(ASSOCIATED_TOKEN_PROGRAM, bytes([1]), accounts)
+
+def buy_instruction(mint, user, token_amount, max_sol_cost):
+    """pump.fun buy instruction for token_amount base units, paying at most max_sol_cost lamports."""
+    mint, user = _to_pubkey(mint), _to_pubkey(user)
+    bonding_curve = derive_bonding_curve(mint)
+    accounts = [
+        AccountMeta(PUMP_GLOBAL, False, False),
+        AccountMeta(PUMP_FEE_RECIPIENT, False, True),
+        AccountMeta(mint, False, False),
+        AccountMeta(bonding_curve, False, True),
+        AccountMeta(derive_associated_token_account(bonding_curve, mint), False, True),
+        AccountMeta(derive_associated_token_account(user, mint), False, True),
+        AccountMeta(user, True, True),
+        AccountMeta(SYSTEM_PROGRAM, False, False),
+        AccountMeta(TOKEN_PROGRAM, False, False),
+        AccountMeta(RENT_SYSVAR, False, False),
+        AccountMeta(PUMP_EVENT_AUTHORITY, False, False),
+        AccountMeta(PUMP_FUN_PROGRAM, False, False),
+    ]
+    data = PUMP_BUY_DISCRIMINATOR + struct.pack("<QQ", token_amount, max_sol_cost)
+    return Instruction(PUMP_FUN_PROGRAM, data, accounts)
+
+def build_buy_transaction(keypair, mint, state, sol_lamports, slippage_bps, recent_blockhash,
+                          compute_unit_limit, compute_unit_price):
+    """Build and sign a pump.fun buy; returns (transaction, token_amount, max_sol_cost)."""
+    token_amount = tokens_out_for_sol(state, sol_lamports)
+    if token_amount <= 0:
+        raise ValueError("Bonding curve has no tokens left to buy")
+    max_sol_cost = sol_lamports * (10_000 + slippage_bps) // 10_000
+    user = keypair.pubkey()
+    instructions = compute_budget_instructions(compute_unit_limit, compute_unit_price)
+    instructions.append(create_associated_token_account_idempotent(user, user, mint))
+    instructions.append(buy_instruction(mint, user, token_amount, max_sol_cost))
+    tx = Transaction.new_signed_with_payer(instructions, user, [keypair], recent_blockhash)
+    return tx, token_amount, max_sol_cost
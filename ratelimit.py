@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per `per` seconds, with bursts up to `burst`."""
+
+    def __init__(self, rate, per=1.0, burst=None):
+        self.rate = rate
+        self.per = per
+        self.capacity = burst if burst is not None else rate
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    def delay(self):
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) * self.per / self.rate
+
+    def try_acquire(self):
+        """Take a token if one is available right now."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep(self.delay())
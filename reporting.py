@@ -1,57 +1,140 @@
-import aiohttp
-from config import TELEGRAM_BOT_TOKEN, ADMIN_USER_ID
+import asyncio
+from http_client import get_session
+from market_data import get_token_pairs, token_market_cache, DEXSCREENER_TOKENS_URL
+from ratelimit import RateLimiter
+from curve_state import curve_table
+from telegram_dispatcher import telegram, PRIORITY_REPORT
+from config import ADMIN_USER_ID, REPORT_BATCH_CONCURRENCY, REPORT_REQUESTS_PER_MINUTE
 from trading import TradingBot
 
-async def send_report(bot: TradingBot, chat_id):
-    """Send a report of buys and PnL via Telegram to admin only."""
+# DexScreener's multi-token endpoint accepts up to 30 comma-separated mints
+DEXSCREENER_BATCH_SIZE = 30
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+dexscreener_limiter = RateLimiter(REPORT_REQUESTS_PER_MINUTE, per=60, burst=REPORT_BATCH_CONCURRENCY)
+
+async def send_report(bot: TradingBot, chat_id, cycle_id=None):
+    """Send a report of buys and PnL via Telegram to admin only.
+
+    Reports the current cycle by default, or a past cycle read from the trade journal.
+    """
     if str(chat_id) != ADMIN_USER_ID:
         return  # Only send reports to admin
 
-    message = "30-Day Trading Report\n\n"
-    message += "Buys Completed:\n"
-
-    total_pnl = 0
-    for record in bot.buy_records:
-        token_address = record["token_address"]
-        buy_amount = record["amount"]
-        tx_id = record["tx_id"]
-
-        # Fetch current token price
-        current_price = await fetch_token_price(token_address)
-        buy_price = buy_amount  # Simplify: Assume buy price in SOL
-        pnl = (current_price - buy_price) if current_price else 0
-
-        message += f"Token: {token_address}\n"
-        message += f"Buy Amount: {buy_amount} SOL\n"
-        message += f"Tx ID: {tx_id}\n"
-        message += f"PnL: {pnl:.4f} SOL\n\n"
-        total_pnl += pnl
-
-    message += f"Total PnL: {total_pnl:.4f} SOL\n"
-
-    async with aiohttp.ClientSession() as session:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                print("Report sent successfully.")
-            else:
-                print(f"Failed to send report: {await response.text()}")
+    # Snapshot so the PnL pass does not depend on records changing underneath it
+    if cycle_id is None or cycle_id == bot.cycle_id:
+        records = list(bot.buy_records)
+    else:
+        records = await bot.journal.cycle_records(cycle_id)
+    token_addresses = [record["token_address"] for record in records]
+    buy_amounts = [record["amount"] for record in records]
+    tx_ids = [record["tx_id"] for record in records]
+
+    prices = await fetch_token_prices(set(token_addresses))
+    current_prices = [prices.get(token_address) or 0.0 for token_address in token_addresses]
+
+    # Simplify: Assume buy price in SOL; tokens without a price contribute no PnL
+    pnls = [(price - amount) if price else 0.0 for price, amount in zip(current_prices, buy_amounts)]
+    total_pnl = sum(pnls)
+
+    blocks = ["30-Day Trading Report\n\nBuys Completed:\n"]
+    for token_address, buy_amount, tx_id, pnl in zip(token_addresses, buy_amounts, tx_ids, pnls):
+        blocks.append(
+            f"Token: {token_address}\n"
+            f"Buy Amount: {buy_amount} SOL\n"
+            f"Tx ID: {tx_id}\n"
+            f"PnL: {pnl:.4f} SOL\n\n"
+        )
+    blocks.append(f"Total PnL: {total_pnl:.4f} SOL\n")
+
+    # Pages to one chat go out in order behind buy confirmations and token alerts
+    pages = paginate(blocks)
+    for page_number, page in enumerate(pages, start=1):
+        if len(pages) > 1:
+            page = f"({page_number}/{len(pages)})\n{page}"
+        telegram.send_message(chat_id, page, PRIORITY_REPORT)
+    print(f"Report queued ({len(pages)} pages).")
+
+def paginate(blocks, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Join text blocks into pages under Telegram's message limit, splitting only between blocks."""
+    # Leave room for the "(n/m)" page header
+    limit -= 16
+    pages = []
+    current = ""
+    for block in blocks:
+        while len(block) > limit:
+            # A single oversized block is hard-split
+            if current:
+                pages.append(current)
+                current = ""
+            pages.append(block[:limit])
+            block = block[limit:]
+        if len(current) + len(block) > limit:
+            pages.append(current)
+            current = ""
+        current += block
+    if current:
+        pages.append(current)
+    return pages
+
+async def _fetch_price_batch(mints):
+    await dexscreener_limiter.acquire()
+    session = get_session()
+    async with session.get(DEXSCREENER_TOKENS_URL.format(",".join(mints))) as response:
+        if response.status != 200:
+            print(f"Failed to fetch prices for {len(mints)} tokens: HTTP {response.status}")
+            return {}
+        data = await response.json()
+    pairs_by_mint = {}
+    for pair in data.get("pairs") or []:
+        mint = pair.get("baseToken", {}).get("address")
+        if mint in mints:
+            pairs_by_mint.setdefault(mint, []).append(pair)
+    prices = {}
+    for mint, pairs in pairs_by_mint.items():
+        # Share the result with validation and notifications through the market data cache
+        token_market_cache.put(mint, {"pairs": pairs})
+        prices[mint] = float(pairs[0].get("priceUsd", 0))
+    return prices
+
+async def fetch_token_prices(token_addresses):
+    """Fetch current prices for many tokens in concurrent, rate-limited batches of 30.
+
+    Tokens still on their bonding curve are priced from the live curve table instead.
+    """
+    prices = {}
+    mints = []
+    for mint in token_addresses:
+        market = curve_table.market(mint)
+        if market is not None:
+            prices[mint] = market["price_usd"]
+        else:
+            mints.append(mint)
+    batches = [mints[i:i + DEXSCREENER_BATCH_SIZE] for i in range(0, len(mints), DEXSCREENER_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(REPORT_BATCH_CONCURRENCY)
+
+    async def run(batch):
+        async with semaphore:
+            try:
+                return await _fetch_price_batch(set(batch))
+            except Exception as e:
+                print(f"Error fetching prices for batch of {len(batch)} tokens: {e}")
+                return {}
+
+    for result in await asyncio.gather(*(run(batch) for batch in batches)):
+        prices.update(result)
+    return prices
 
 async def fetch_token_price(token_address):
-    """Fetch current token price from DexScreener."""
+    """Fetch current token price from the live curve table or DexScreener."""
+    market = curve_table.market(token_address)
+    if market is not None:
+        return market["price_usd"]
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.dexscreener.com/latest/dex/tokens/{token_address}") as response:
-                data = await response.json()
-                pairs = data.get("pairs", [])
-                if pairs:
-                    return float(pairs[0].get("priceUsd", 0))
-                return None
+        pairs = await get_token_pairs(token_address)
+        if pairs:
+            return float(pairs[0].get("priceUsd", 0))
+        return None
     except Exception as e:
         print(f"Error fetching price for {token_address}: {e}")
-        return None
\ No newline at end of file
+        return None
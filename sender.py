@@ -0,0 +1,203 @@
+import asyncio
+import base64
+import json
+import time
+import websockets
+import metrics
+from http_client import json_rpc
+from config import (
+    RPC_ENDPOINT,
+    RPC_WEBSOCKET_ENDPOINTS,
+    RPC_SEND_ENDPOINTS,
+    REBROADCAST_INTERVAL_SECONDS,
+    CONFIRMATION_TIMEOUT_SECONDS,
+)
+
+class EndpointStats:
+    """Submission statistics for one RPC send endpoint.
+
+    Every endpoint receives the same signed transaction, so a confirmation cannot be
+    attributed to the endpoint that landed it. The ack-to-confirm figures credit each
+    endpoint that acknowledged a send which later confirmed; they show how far ahead of
+    confirmation an endpoint accepts transactions, not which endpoint lands them.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.submissions = 0
+        self.errors = 0
+        self.acked_confirmed = 0
+        self.ack_latency_total = 0.0
+        self.ack_to_confirm_total = 0.0
+        self.ack_to_confirm_min = None
+
+    def to_dict(self):
+        acks = self.submissions - self.errors
+        return {
+            "endpoint": self.endpoint,
+            "submissions": self.submissions,
+            "errors": self.errors,
+            "acked_confirmed": self.acked_confirmed,
+            "avg_ack_seconds": self.ack_latency_total / acks if acks else None,
+            "avg_ack_to_confirm_seconds": self.ack_to_confirm_total / self.acked_confirmed if self.acked_confirmed else None,
+            "min_ack_to_confirm_seconds": self.ack_to_confirm_min,
+        }
+
+class TransactionSender:
+    """Fans a signed transaction out to several RPC endpoints and rebroadcasts until it confirms."""
+
+    def __init__(self, endpoints=RPC_SEND_ENDPOINTS, rpc_endpoint=RPC_ENDPOINT, ws_endpoint=None,
+                 rebroadcast_interval=REBROADCAST_INTERVAL_SECONDS):
+        self.endpoints = list(endpoints) or [rpc_endpoint]
+        self.rpc_endpoint = rpc_endpoint
+        # RPC_WEBSOCKET_ENDPOINTS is derived from RPC_ENDPOINT when no websocket URL is configured
+        self.ws_endpoint = ws_endpoint or (RPC_WEBSOCKET_ENDPOINTS[0] if RPC_WEBSOCKET_ENDPOINTS else None)
+        self.rebroadcast_interval = rebroadcast_interval
+        self.endpoint_stats = {endpoint: EndpointStats(endpoint) for endpoint in self.endpoints}
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.expired = 0
+
+    async def _submit(self, endpoint, encoded_tx, first_sent):
+        stats = self.endpoint_stats[endpoint]
+        stats.submissions += 1
+        start = time.monotonic()
+        try:
+            await json_rpc(endpoint, "sendTransaction", [
+                encoded_tx,
+                {"encoding": "base64", "skipPreflight": True, "maxRetries": 0},
+            ])
+            stats.ack_latency_total += time.monotonic() - start
+            metrics.observe("rpc_send_transaction", time.monotonic() - start)
+            first_sent.setdefault(endpoint, start)
+        except Exception as e:
+            stats.errors += 1
+            print(f"sendTransaction to {endpoint} failed: {e}")
+
+    async def _subscribe_signature(self, signature):
+        """Wait for a signatureNotification, resubscribing on errors; returns {"err": ...}.
+
+        Without a websocket endpoint this never returns and confirmation relies on status polls.
+        """
+        if not self.ws_endpoint:
+            await asyncio.Future()
+        while True:
+            try:
+                async with websockets.connect(self.ws_endpoint, ping_interval=20) as ws:
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "id": 1,
+                        "method": "signatureSubscribe",
+                        "params": [signature, {"commitment": "confirmed"}],
+                    }))
+                    async for message in ws:
+                        data = json.loads(message)
+                        if data.get("method") == "signatureNotification":
+                            return {"err": data["params"]["result"]["value"].get("err")}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Signature subscription for {signature} failed: {e}")
+            await asyncio.sleep(self.rebroadcast_interval)
+
+    async def _next_result(self, confirmation, signature):
+        """Wait one rebroadcast interval for confirmation, then fall back to a status poll."""
+        try:
+            return await asyncio.wait_for(asyncio.shield(confirmation), self.rebroadcast_interval)
+        except asyncio.TimeoutError:
+            pass
+        # The subscription can miss a confirmation that landed before it was set up
+        try:
+            return await self._signature_status(signature)
+        except Exception as e:
+            print(f"Error checking status of {signature}: {e}")
+            return None
+
+    async def _expired(self, last_valid_block_height):
+        if last_valid_block_height is None:
+            return False
+        try:
+            return await self._block_height() > last_valid_block_height
+        except Exception as e:
+            print(f"Error fetching block height: {e}")
+            return False
+
+    async def _signature_status(self, signature):
+        result = await json_rpc(self.rpc_endpoint, "getSignatureStatuses", [[signature]])
+        status = (result or {}).get("value", [None])[0]
+        if status and status.get("confirmationStatus") in ("confirmed", "finalized"):
+            return {"err": status.get("err")}
+        return None
+
+    async def _block_height(self):
+        return await json_rpc(self.rpc_endpoint, "getBlockHeight", [{"commitment": "confirmed"}])
+
+    def _record_confirmation(self, first_sent, confirmed_at):
+        for endpoint, sent_at in first_sent.items():
+            stats = self.endpoint_stats[endpoint]
+            latency = confirmed_at - sent_at
+            stats.acked_confirmed += 1
+            stats.ack_to_confirm_total += latency
+            if stats.ack_to_confirm_min is None or latency < stats.ack_to_confirm_min:
+                stats.ack_to_confirm_min = latency
+
+    async def send_and_confirm(self, tx_bytes, signature, last_valid_block_height=None,
+                               timeout=CONFIRMATION_TIMEOUT_SECONDS):
+        """Broadcast until confirmed, failed, expired or timed out; True only if it landed without error."""
+        encoded_tx = base64.b64encode(tx_bytes).decode()
+        first_sent = {}
+        self.sent += 1
+        deadline = time.monotonic() + timeout
+        confirmation = asyncio.create_task(self._subscribe_signature(signature))
+        try:
+            while True:
+                await asyncio.gather(*(self._submit(endpoint, encoded_tx, first_sent) for endpoint in self.endpoints))
+                result = await self._next_result(confirmation, signature)
+                if result is not None:
+                    return self._finish(signature, result, first_sent)
+                if await self._expired(last_valid_block_height):
+                    self.expired += 1
+                    print(f"Transaction {signature} expired before confirmation.")
+                    return False
+                if time.monotonic() > deadline:
+                    self.expired += 1
+                    print(f"Transaction {signature} not confirmed within {timeout}s.")
+                    return False
+        finally:
+            confirmation.cancel()
+
+    def _finish(self, signature, result, first_sent):
+        if result["err"] is not None:
+            self.failed += 1
+            print(f"Transaction {signature} failed on-chain: {result['err']}")
+            return False
+        self.confirmed += 1
+        self._record_confirmation(first_sent, time.monotonic())
+        return True
+
+    async def confirm(self, signature, last_valid_block_height=None, timeout=CONFIRMATION_TIMEOUT_SECONDS):
+        """Wait for a transaction sent elsewhere to confirm, without rebroadcasting it."""
+        deadline = time.monotonic() + timeout
+        confirmation = asyncio.create_task(self._subscribe_signature(signature))
+        try:
+            while time.monotonic() < deadline:
+                result = await self._next_result(confirmation, signature)
+                if result is not None:
+                    return self._finish(signature, result, {})
+                if await self._expired(last_valid_block_height):
+                    break
+            self.expired += 1
+            return False
+        finally:
+            confirmation.cancel()
+
+    def stats(self):
+        """Return overall and per-endpoint send statistics."""
+        return {
+            "sent": self.sent,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "endpoints": [stats.to_dict() for stats in self.endpoint_stats.values()],
+        }
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from log_decoder import decode_pump_events
+from pumpfun import (
+    BondingCurveState,
+    LAMPORTS_PER_SOL,
+    PUMP_FEE_BPS,
+    INITIAL_VIRTUAL_SOL_RESERVES,
+    INITIAL_VIRTUAL_TOKEN_RESERVES,
+    TOKEN_TOTAL_SUPPLY,
+    tokens_out_for_sol,
+    sol_for_tokens,
+    sol_out_for_tokens,
+)
+from curve_state import curve_table, VIRTUAL_TOKEN_OFFSET
+from subscriptions import loads
+from config import (
+    BUY_AMOUNT,
+    BUY_SLIPPAGE_BPS,
+    COMPUTE_UNIT_LIMIT,
+    COMPUTE_UNIT_PRICE_MICRO_LAMPORTS,
+    PAPER_STARTING_BALANCE_SOL,
+    PAPER_LANDING_DELAY_SECONDS,
+)
+
+# Base signature fee plus the priority fee; paid whether or not the buy succeeds
+NETWORK_FEE_LAMPORTS = 5000 + COMPUTE_UNIT_LIMIT * COMPUTE_UNIT_PRICE_MICRO_LAMPORTS // 1_000_000
+
+def simulate_fill(quoted, landed, sol_lamports, slippage_bps=BUY_SLIPPAGE_BPS, fee_bps=PUMP_FEE_BPS):
+    """Fill a buy the way the pump.fun program does; returns (token_amount, sol_cost) or None if it fails.
+
+    The token amount and maximum SOL cost are fixed when the transaction is built from the
+    quoted curve state; the cost is charged against the curve as it is when the buy lands.
+    """
+    token_amount = tokens_out_for_sol(quoted, sol_lamports, fee_bps)
+    max_sol_cost = sol_lamports * (10_000 + slippage_bps) // 10_000
+    if token_amount <= 0 or landed.complete or token_amount > landed.real_token_reserves:
+        return None
+    sol_cost = sol_for_tokens(landed, token_amount, fee_bps)
+    if sol_cost > max_sol_cost:
+        return None  # The program rejects the buy for exceeding the slippage limit
+    return token_amount, sol_cost
+
+class PaperExchange:
+    """Simulated pump.fun buys for paper trading, priced from the live curve table.
+
+    A buy is quoted from the curve state seen at validation and filled after the landing
+    delay against whatever the curve has moved to. Positions are marked to market from
+    the same table.
+    """
+
+    def __init__(self, table=curve_table, balance_sol=PAPER_STARTING_BALANCE_SOL,
+                 landing_delay=PAPER_LANDING_DELAY_SECONDS, slippage_bps=BUY_SLIPPAGE_BPS,
+                 network_fee=NETWORK_FEE_LAMPORTS):
+        self.table = table
+        self.balance_lamports = int(balance_sol * LAMPORTS_PER_SOL)
+        self.landing_delay = landing_delay
+        self.slippage_bps = slippage_bps
+        self.network_fee = network_fee
+        self.positions = {}  # mint -> [token_amount, cost_lamports]
+        self.fills = 0
+        self.slippage_failures = 0
+        self.fees_lamports = 0
+
+    async def buy(self, mint, sol_lamports, state=None):
+        """Simulate a bonding-curve buy; returns a paper transaction id once filled, else None."""
+        quoted = state or self.table.get(mint, max_age=None)
+        if quoted is None or quoted.complete:
+            raise ValueError(f"Token {mint} has no active bonding curve")
+        # Reserve the worst-case cost up front so concurrent buys cannot overdraw the balance
+        reserved = sol_lamports * (10_000 + self.slippage_bps) // 10_000 + self.network_fee
+        if self.balance_lamports < reserved:
+            print(f"Paper balance too low to buy {mint}.")
+            return None
+        self.balance_lamports -= reserved
+        try:
+            if self.landing_delay:
+                await asyncio.sleep(self.landing_delay)
+            landed = self.table.get(mint, max_age=None) or quoted
+            fill = simulate_fill(quoted, landed, sol_lamports, self.slippage_bps)
+        finally:
+            self.balance_lamports += reserved
+        # Settled without awaiting in between: the network fee is paid whether or not the buy fills
+        self.balance_lamports -= self.network_fee
+        self.fees_lamports += self.network_fee
+        if fill is None:
+            self.slippage_failures += 1
+            print(f"Paper buy of {mint} failed: price moved past the slippage limit.")
+            return None
+        token_amount, sol_cost = fill
+        self.balance_lamports -= sol_cost
+        position = self.positions.setdefault(mint, [0, 0])
+        position[0] += token_amount
+        position[1] += sol_cost
+        self.fills += 1
+        # Unique across restarts; the journal keys buys on tx_id
+        tx_id = f"paper-{uuid.uuid4().hex}"
+        print(f"Paper buy of {token_amount} base units of {mint} for {sol_cost} lamports: {tx_id}")
+        return tx_id
+
+    def mark_to_market(self):
+        """Sell-side value of every position in lamports, or None where the curve is not tracked."""
+        values = {}
+        for mint, (token_amount, _) in self.positions.items():
+            state = self.table.get(mint, max_age=None)
+            values[mint] = sol_out_for_tokens(state, token_amount) if state is not None else None
+        return values
+
+    def stats(self):
+        values = self.mark_to_market()
+        cost = sum(position[1] for mint, position in self.positions.items() if values[mint] is not None)
+        value = sum(v for v in values.values() if v is not None)
+        return {
+            "balance_sol": self.balance_lamports / LAMPORTS_PER_SOL,
+            "positions": len(self.positions),
+            "fills": self.fills,
+            "slippage_failures": self.slippage_failures,
+            "fees_sol": self.fees_lamports / LAMPORTS_PER_SOL,
+            "unrealized_pnl_sol": (value - cost) / LAMPORTS_PER_SOL,
+        }
+
+class _Curve:
+    """Replayed curve of one mint: reserves plus per-wallet balances from its trades."""
+
+    __slots__ = ("virtual_sol", "virtual_token", "holders")
+
+    def __init__(self):
+        self.virtual_sol = INITIAL_VIRTUAL_SOL_RESERVES
+        self.virtual_token = INITIAL_VIRTUAL_TOKEN_RESERVES
+        self.holders = {}
+
+    def state(self):
+        real_token = max(0, self.virtual_token - VIRTUAL_TOKEN_OFFSET)
+        return BondingCurveState(
+            self.virtual_token,
+            self.virtual_sol,
+            real_token,
+            max(0, self.virtual_sol - INITIAL_VIRTUAL_SOL_RESERVES),
+            TOKEN_TOTAL_SUPPLY,
+            real_token == 0,
+        )
+
+def _frames(paths):
+    for path in paths:
+        with open(path, "rb") as lines:
+            for line in lines:
+                if line.strip():
+                    yield loads(line)
+
+def extract_candidates(paths, sol_lamports=int(BUY_AMOUNT * LAMPORTS_PER_SOL), sol_usd=150.0,
+                       decision_latency=0.2, landing_delay=PAPER_LANDING_DELAY_SECONDS, hold_seconds=600,
+                       slippage_bps=BUY_SLIPPAGE_BPS, network_fee=NETWORK_FEE_LAMPORTS):
+    """Replay recorded streams once and return one candidate buy per pump.fun create.
+
+    A candidate holds the filter inputs the bot would see at decision time (liquidity and
+    top-10 holder share, both from the stream), and the outcome of buying it then:
+    filled against the curve after the landing delay and valued by selling back to the
+    curve hold_seconds later (or at the end of the data). Paper buys do not move the
+    replayed curves, so the outcome does not depend on which other candidates are bought.
+    """
+    curves = {}
+    pending = []  # (due, seq, action, mint, candidate)
+    sequence = itertools.count()
+    candidates = []
+
+    def run_due(now):
+        while pending and pending[0][0] <= now:
+            due, _, action, mint, candidate = heapq.heappop(pending)
+            curve = curves[mint]
+            state = curve.state()
+            if action == "decide":
+                if state.complete:
+                    del curves[mint]
+                    continue
+                top_10 = sum(heapq.nlargest(10, curve.holders.values()))
+                candidate = {
+                    "t": due,
+                    "liquidity_usd": 2 * state.real_sol_reserves / LAMPORTS_PER_SOL * sol_usd,
+                    "top_10_percent": top_10 / TOKEN_TOTAL_SUPPLY * 100,
+                    "quoted": state,
+                }
+                heapq.heappush(pending, (due + landing_delay, next(sequence), "land", mint, candidate))
+            elif action == "land":
+                fill = simulate_fill(candidate.pop("quoted"), state, sol_lamports, slippage_bps)
+                candidate["filled"] = fill is not None
+                candidate["pnl_lamports"] = -network_fee
+                candidates.append(candidate)
+                if fill is None:
+                    del curves[mint]
+                    continue
+                candidate["token_amount"], candidate["cost_lamports"] = fill
+                heapq.heappush(pending, (due + hold_seconds, next(sequence), "exit", mint, candidate))
+            else:
+                candidate["pnl_lamports"] += sol_out_for_tokens(state, candidate["token_amount"]) - candidate["cost_lamports"]
+                del curves[mint]
+
+    for frame in _frames(paths):
+        run_due(frame["t"])
+        if frame["platform"] != "pumpfun" or frame.get("err") is not None:
+            continue
+        for event in decode_pump_events(frame["logs"]):
+            mint = event["mint"]
+            if "virtual_sol_reserves" not in event:
+                if mint not in curves:
+                    curves[mint] = _Curve()
+                    heapq.heappush(pending, (frame["t"] + decision_latency, next(sequence), "decide", mint, None))
+                continue
+            curve = curves.get(mint)
+            if curve is None:
+                continue
+            curve.virtual_sol = event["virtual_sol_reserves"]
+            curve.virtual_token = event["virtual_token_reserves"]
+            change = event["token_amount"] if event["is_buy"] else -event["token_amount"]
+            balance = curve.holders.get(event["user"], 0) + change
+            if balance > 0:
+                curve.holders[event["user"]] = balance
+            else:
+                curve.holders.pop(event["user"], None)
+    # Positions still open when the data ends are valued at the last curve state
+    run_due(float("inf"))
+    candidates.sort(key=lambda candidate: candidate["t"])
+    return candidates
+
+_columns = None
+_max_buys = 0
+
+def _init_worker(columns, max_buys):
+    global _columns, _max_buys
+    _columns = columns
+    _max_buys = max_buys
+
+def evaluate(config):
+    """Buys, fills and PnL of one (min_liquidity_usd, max_top_10_percent) config.
+
+    MAX_TOKEN_AGE_MINUTES is not swept: the bot decides once per create, decision_latency
+    after it, so every candidate has the same age and the threshold would never bind.
+    """
+    min_liquidity, max_top_10 = config
+    liquidity, top_10, filled, pnl = _columns
+    buys = fills = 0
+    total = 0
+    for index in range(len(pnl)):
+        if liquidity[index] >= min_liquidity and top_10[index] <= max_top_10:
+            buys += 1
+            fills += filled[index]
+            total += pnl[index]
+            if buys == _max_buys:
+                break
+    return {
+        "min_liquidity_usd": min_liquidity,
+        "max_top_10_holders_percent": max_top_10,
+        "buys": buys,
+        "fills": fills,
+        "pnl_sol": total / LAMPORTS_PER_SOL,
+    }
+
+def sweep(candidates, configs, max_buys=0, workers=None):
+    """Evaluate every config against the candidates on a process pool; results sorted by PnL."""
+    columns = (
+        [candidate["liquidity_usd"] for candidate in candidates],
+        [candidate["top_10_percent"] for candidate in candidates],
+        [int(candidate["filled"]) for candidate in candidates],
+        [candidate["pnl_lamports"] for candidate in candidates],
+    )
+    workers = workers or os.cpu_count() or 1
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(columns, max_buys)) as pool:
+        results = pool.map(evaluate, configs, chunksize=max(1, len(configs) // (workers * 4)))
+    results.sort(key=lambda result: result["pnl_sol"], reverse=True)
+    return results
+
+def parse_values(text):
+    """Comma-separated values and start:stop:step ranges (stop inclusive), e.g. "0,500:5000:500"."""
+    values = []
+    for part in text.split(","):
+        if ":" in part:
+            start, stop, step = (float(value) for value in part.split(":"))
+            count = int(round((stop - start) / step)) + 1
+            values.extend(start + step * index for index in range(count))
+        else:
+            values.append(float(part))
+    return values
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paper-trading simulator over recorded logsSubscribe streams")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    sweep_parser = subcommands.add_parser("sweep", help="evaluate a grid of filter thresholds over recorded streams")
+    sweep_parser.add_argument("files", nargs="+", help="JSONL streams recorded with benchmarks/replay.py")
+    sweep_parser.add_argument("--min-liquidity", default="0,250:5000:250", help="MIN_LIQUIDITY_USD values")
+    sweep_parser.add_argument("--max-top10", default="10:100:10", help="MAX_TOP_10_HOLDERS_PERCENT values")
+    sweep_parser.add_argument("--buy-amount", type=float, default=BUY_AMOUNT, help="SOL per buy")
+    sweep_parser.add_argument("--sol-usd", type=float, default=150.0)
+    sweep_parser.add_argument("--decision-latency", type=float, default=0.2, help="seconds from create to buy decision")
+    sweep_parser.add_argument("--landing-delay", type=float, default=PAPER_LANDING_DELAY_SECONDS)
+    sweep_parser.add_argument("--hold-seconds", type=float, default=600, help="seconds until a position is valued")
+    sweep_parser.add_argument("--max-buys", type=int, default=0, help="stop buying after this many (0: no limit)")
+    sweep_parser.add_argument("--workers", type=int, default=None)
+    sweep_parser.add_argument("--top", type=int, default=20)
+    sweep_parser.add_argument("--output", help="write every result as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "sweep":
+        started = time.monotonic()
+        candidates = extract_candidates(
+            args.files, int(args.buy_amount * LAMPORTS_PER_SOL), args.sol_usd,
+            args.decision_latency, args.landing_delay, args.hold_seconds,
+        )
+        extracted = time.monotonic()
+        configs = list(itertools.product(parse_values(args.min_liquidity), parse_values(args.max_top10)))
+        results = sweep(candidates, configs, args.max_buys, args.workers)
+        finished = time.monotonic()
+        print(f"{len(candidates)} candidates extracted in {extracted - started:.1f}s; "
+              f"{len(configs)} configs evaluated in {finished - extracted:.1f}s")
+        for result in results[:args.top]:
+            print(json.dumps(result))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                json.dump({"candidates": len(candidates), "results": results}, out, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
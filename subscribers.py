@@ -0,0 +1,162 @@
+import os
+import time
+from config import SUBSCRIBERS_FILE
+
+# Rewrite the log once it holds this many more lines than there are subscribers
+COMPACT_SLACK = 1000
+
+class SubscriberRegistry:
+    """Chats that sent /start, persisted as an append-only log of "+chat_id" / "-chat_id" lines.
+
+    Adding or removing a chat appends one line; startup replays the log into a dict.
+    The log is compacted to one "+" line per subscriber when removals pile up.
+    """
+
+    def __init__(self, path=SUBSCRIBERS_FILE):
+        self.path = path
+        self._chats = {}  # chat_id -> subscribed at (unix time)
+        self._log_lines = 0
+        self._log = None
+        self.added = 0
+        self.removed = 0
+        self.pruned = 0
+        self.broadcasts = 0
+        self.delivered = 0
+        self.failed = 0
+        self.last_broadcast = None
+        self._load()
+
+    def _load(self):
+        started = time.monotonic()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as log:
+                for line in log:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._log_lines += 1
+                    fields = line[1:].split(" ")
+                    if line[0] == "+":
+                        self._chats[fields[0]] = float(fields[1]) if len(fields) > 1 else time.time()
+                    elif line[0] == "-":
+                        self._chats.pop(fields[0], None)
+        self._log = open(self.path, "a", encoding="utf-8", buffering=1)
+        print(f"Loaded {len(self._chats)} subscribers in {time.monotonic() - started:.3f}s")
+        self._maybe_compact()
+
+    def _append(self, line):
+        self._log.write(line + "\n")
+        self._log_lines += 1
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._log_lines <= len(self._chats) + COMPACT_SLACK:
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as log:
+            for chat_id, subscribed_at in self._chats.items():
+                log.write(f"+{chat_id} {subscribed_at:.0f}\n")
+            log.flush()
+            os.fsync(log.fileno())
+        self._log.close()
+        os.replace(temp_path, self.path)
+        self._log = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._log_lines = len(self._chats)
+
+    def add(self, chat_id):
+        """Subscribe a chat; returns False if it was already subscribed."""
+        chat_id = str(chat_id)
+        if chat_id in self._chats:
+            return False
+        subscribed_at = time.time()
+        self._chats[chat_id] = subscribed_at
+        self.added += 1
+        self._append(f"+{chat_id} {subscribed_at:.0f}")
+        return True
+
+    def remove(self, chat_id):
+        """Unsubscribe a chat; returns False if it was not subscribed."""
+        chat_id = str(chat_id)
+        if self._chats.pop(chat_id, None) is None:
+            return False
+        self.removed += 1
+        self._append(f"-{chat_id}")
+        return True
+
+    def prune_failed_chat(self, chat_id, error_code, description):
+        """Failure listener: drop chats that blocked the bot or no longer exist."""
+        if error_code == 403 or (error_code == 400 and "chat not found" in description.lower()):
+            if self.remove(chat_id):
+                self.pruned += 1
+                print(f"Pruned subscriber {chat_id}: {description}")
+
+    def __contains__(self, chat_id):
+        return str(chat_id) in self._chats
+
+    def __len__(self):
+        return len(self._chats)
+
+    def __iter__(self):
+        return iter(list(self._chats))
+
+    def track_broadcast(self, futures):
+        """Count deliveries of one broadcast and record its throughput once every send settles."""
+        self.broadcasts += 1
+        started = time.monotonic()
+        pending = len(futures)
+        counts = {"delivered": 0, "failed": 0}
+
+        def settle(future):
+            nonlocal pending
+            delivered = not future.cancelled() and future.result() is not None
+            counts["delivered" if delivered else "failed"] += 1
+            if delivered:
+                self.delivered += 1
+            else:
+                self.failed += 1
+            pending -= 1
+            if pending == 0:
+                seconds = time.monotonic() - started
+                self.last_broadcast = {
+                    "recipients": len(futures),
+                    "delivered": counts["delivered"],
+                    "failed": counts["failed"],
+                    "seconds": seconds,
+                    "per_second": counts["delivered"] / seconds if seconds else 0.0,
+                }
+
+        for future in futures:
+            future.add_done_callback(settle)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._chats),
+            "added": self.added,
+            "removed": self.removed,
+            "pruned": self.pruned,
+            "log_lines": self._log_lines,
+            "broadcasts": self.broadcasts,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "last_broadcast": self.last_broadcast,
+        }
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+_subscribers = None
+
+def get_subscribers():
+    """Return the shared subscriber registry, loading its log on first use."""
+    global _subscribers
+    if _subscribers is None:
+        _subscribers = SubscriberRegistry()
+    return _subscribers
+
+def close_subscribers():
+    global _subscribers
+    if _subscribers is not None:
+        _subscribers.close()
+        _subscribers = None
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import random
+import time
+import websockets
+from solana.rpc.commitment import Confirmed
+from solana.rpc.websocket_api import connect
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcTransactionLogsFilterMentions
+from solders.rpc.responses import SubscriptionResult
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib decoder is slower but equivalent
+    loads = json.loads
+from dedup import SeenSet
+from config import LOG_SUBSCRIPTION_DEDUP_SIZE, WS_RECONNECT_MAX_BACKOFF_SECONDS
+
+class EndpointDeliveryStats:
+    """How often one websocket endpoint delivered a transaction before the others."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.received = 0
+        self.first_deliveries = 0
+        self.last_message_at = None
+
+    def to_dict(self):
+        return {
+            "endpoint": self.endpoint,
+            "connected": self.connected,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "received": self.received,
+            "first_deliveries": self.first_deliveries,
+            "first_ratio": self.first_deliveries / self.received if self.received else 0.0,
+            "seconds_since_last_message": time.monotonic() - self.last_message_at if self.last_message_at else None,
+        }
+
+class LogSubscriptionRacer:
+    """Opens the same logsSubscribe subscriptions on several websocket endpoints.
+
+    Notifications are deduplicated by platform and signature so the first endpoint to
+    deliver a transaction wins; later copies only count towards that endpoint's
+    statistics. A transaction mentioning both programs is delivered once per platform.
+    """
+
+    def __init__(self, endpoints, programs, on_event, dedup_size=LOG_SUBSCRIPTION_DEDUP_SIZE):
+        if not endpoints:
+            raise ValueError("No websocket endpoint configured: set RPC_WEBSOCKET_ENDPOINTS, RPC_WEBSOCKET_ENDPOINT or RPC_ENDPOINT")
+        self.endpoints = list(endpoints)
+        self.programs = list(programs)  # [(program_id, platform)]
+        self.on_event = on_event
+        self.endpoint_stats = {endpoint: EndpointDeliveryStats(endpoint) for endpoint in self.endpoints}
+        # Endpoints redeliver a signature within seconds, so the exact window alone is enough
+        self._seen_signatures = SeenSet(max_recent=dedup_size, bloom_capacity=0)
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run_endpoint(endpoint)) for endpoint in self.endpoints]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self):
+        self.start()
+        await asyncio.gather(*self._tasks)
+
+    def deliver(self, endpoint, platform, signature, logs, err):
+        """Record a notification from an endpoint and forward it if it is the first copy."""
+        stats = self.endpoint_stats[endpoint]
+        stats.received += 1
+        stats.last_message_at = time.monotonic()
+        if not self._seen_signatures.add(f"{platform}:{signature}"):
+            return
+        stats.first_deliveries += 1
+        self.on_event(platform, signature, logs, err)
+
+    async def _subscribe(self, ws, endpoint):
+        """Subscribe to every program in turn; returns {subscription id: platform}."""
+        platforms = {}
+        for program_id, platform in self.programs:
+            await ws.logs_subscribe(RpcTransactionLogsFilterMentions(Pubkey.from_string(program_id)), commitment=Confirmed)
+            while True:
+                messages = await ws.recv()
+                result = next((m for m in messages if isinstance(m, SubscriptionResult)), None)
+                self._dispatch(endpoint, platforms, messages)
+                if result is not None:
+                    platforms[result.result] = platform
+                    break
+        return platforms
+
+    def _dispatch(self, endpoint, platforms, messages):
+        for message in messages:
+            platform = platforms.get(getattr(message, "subscription", None))
+            if platform is None:
+                continue
+            value = message.result.value
+            self.deliver(endpoint, platform, str(value.signature), value.logs, value.err)
+
+    async def _run_endpoint(self, endpoint):
+        """Keep one endpoint subscribed, reconnecting with jittered exponential backoff."""
+        stats = self.endpoint_stats[endpoint]
+        backoff = 0.5
+        while True:
+            try:
+                async with connect(endpoint, ping_interval=20) as ws:
+                    platforms = await self._subscribe(ws, endpoint)
+                    stats.connected = True
+                    stats.connects += 1
+                    backoff = 0.5
+                    print(f"Subscribed to program logs on {endpoint}")
+                    async for messages in ws:
+                        self._dispatch(endpoint, platforms, messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Log subscription on {endpoint} dropped: {e}")
+            if stats.connected:
+                stats.disconnects += 1
+            stats.connected = False
+            await asyncio.sleep(backoff + random.uniform(0, backoff / 2))
+            backoff = min(backoff * 2, WS_RECONNECT_MAX_BACKOFF_SECONDS)
+
+    def stats(self):
+        """Return per-endpoint first-delivery statistics."""
+        return [stats.to_dict() for stats in self.endpoint_stats.values()]
+
+class RawLogSubscriptionRacer(LogSubscriptionRacer):
+    """LogSubscriptionRacer that reads logsNotification JSON frames straight off the websocket.
+
+    Skips solana-py's model parsing; failed transactions are dropped before their logs
+    are looked at.
+    """
+
+    async def _subscribe(self, ws, endpoint):
+        platforms = {}
+        pending = {}
+        for request_id, (program_id, platform) in enumerate(self.programs, start=1):
+            pending[request_id] = platform
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "logsSubscribe",
+                "params": [{"mentions": [program_id]}, {"commitment": "confirmed"}],
+            }))
+        while pending:
+            frame = loads(await ws.recv())
+            request_id = frame.get("id")
+            if request_id in pending:
+                if "error" in frame:
+                    raise RuntimeError(f"logsSubscribe failed: {frame['error']}")
+                platforms[frame["result"]] = pending.pop(request_id)
+            else:
+                self._dispatch_frame(endpoint, platforms, frame)
+        return platforms
+
+    def _dispatch_frame(self, endpoint, platforms, frame):
+        params = frame.get("params")
+        if params is None:
+            return
+        platform = platforms.get(params.get("subscription"))
+        if platform is None:
+            return
+        value = params["result"]["value"]
+        err = value.get("err")
+        if err is not None:
+            # Still counts as a delivery for endpoint statistics
+            self.endpoint_stats[endpoint].received += 1
+            return
+        self.deliver(endpoint, platform, value["signature"], value["logs"], err)
+
+    async def _run_endpoint(self, endpoint):
+        stats = self.endpoint_stats[endpoint]
+        backoff = 0.5
+        while True:
+            try:
+                async with websockets.connect(endpoint, ping_interval=20, max_size=None) as ws:
+                    platforms = await self._subscribe(ws, endpoint)
+                    stats.connected = True
+                    stats.connects += 1
+                    backoff = 0.5
+                    print(f"Subscribed to raw program logs on {endpoint}")
+                    async for message in ws:
+                        self._dispatch_frame(endpoint, platforms, loads(message))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Raw log subscription on {endpoint} dropped: {e}")
+            if stats.connected:
+                stats.disconnects += 1
+            stats.connected = False
+            await asyncio.sleep(backoff + random.uniform(0, backoff / 2))
+            backoff = min(backoff * 2, WS_RECONNECT_MAX_BACKOFF_SECONDS)
@@ -0,0 +1,306 @@
+import asyncio
+import heapq
+import itertools
+import time
+import metrics
+from http_client import get_session
+from ratelimit import RateLimiter
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_API_URL,
+    TELEGRAM_GLOBAL_RATE_PER_SECOND,
+    TELEGRAM_CHAT_RATE_PER_SECOND,
+    TELEGRAM_GROUP_RATE_PER_MINUTE,
+    TELEGRAM_MAX_IN_FLIGHT,
+    TELEGRAM_DIGEST_THRESHOLD,
+    TELEGRAM_MAX_ATTEMPTS,
+)
+
+# Lower values are sent first
+PRIORITY_ADMIN = 0
+PRIORITY_REPLY = 1
+PRIORITY_ALERT = 2
+PRIORITY_REPORT = 3
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+class OutboundMessage:
+    """One queued Telegram API call and the future its caller holds."""
+
+    def __init__(self, method, payload, priority, seq, future, digest_lines=None):
+        self.method = method
+        self.payload = payload
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.chat_id = str(payload.get("chat_id"))
+        self.digest_lines = digest_lines
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+        self.merged = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class TelegramDispatcher:
+    """Single outbound queue for Telegram Bot API calls.
+
+    Messages are sent in priority order within Telegram's global and per-chat rate
+    limits, one at a time per chat so replies and report pages stay in order. A 429
+    pauses the chat for retry_after seconds. When alerts back up for a chat they are
+    merged into one digest message.
+    """
+
+    def __init__(self, token=TELEGRAM_BOT_TOKEN, global_rate=TELEGRAM_GLOBAL_RATE_PER_SECOND,
+                 chat_rate=TELEGRAM_CHAT_RATE_PER_SECOND, group_rate_per_minute=TELEGRAM_GROUP_RATE_PER_MINUTE,
+                 max_in_flight=TELEGRAM_MAX_IN_FLIGHT, digest_threshold=TELEGRAM_DIGEST_THRESHOLD,
+                 max_attempts=TELEGRAM_MAX_ATTEMPTS):
+        self.base_url = f"{TELEGRAM_API_URL}/bot{token}"
+        self.chat_rate = chat_rate
+        self.group_rate_per_minute = group_rate_per_minute
+        self.digest_threshold = digest_threshold
+        self.max_attempts = max_attempts
+        self.max_in_flight = max_in_flight
+        self._global_limiter = RateLimiter(global_rate)
+        self._chat_limiters = {}
+        self._blocked_until = {}  # chat_id -> monotonic time retry_after / backoff expires
+        self._busy_chats = set()
+        self._queued_alerts = {}  # chat_id -> [OutboundMessage] eligible for a digest
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots = None
+        self._task = None
+        self._in_flight = set()
+        self._failure_listeners = []
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+        self.digests = 0
+        self.merged = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout=5):
+        """Give queued messages up to drain_timeout seconds to go out, then cancel the rest."""
+        deadline = time.monotonic() + drain_timeout
+        while (self._heap or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._in_flight):
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        for message in self._heap:
+            if not message.future.done():
+                message.future.set_result(None)
+        self._heap = []
+        self._queued_alerts = {}
+
+    def add_failure_listener(self, listener):
+        """Call listener(chat_id, error_code, description) when Telegram rejects a message outright."""
+        self._failure_listeners.append(listener)
+
+    def send(self, method, payload, priority=PRIORITY_ALERT, digest_line=None):
+        """Queue an API call and return a future for its result (None if it was not delivered).
+
+        Messages given a digest_line may be folded into a digest when the chat's queue backs up.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        message = OutboundMessage(method, payload, priority, next(self._seq), future,
+                                  [digest_line] if digest_line else None)
+        self._push(message)
+        if message.digest_lines is not None:
+            queued = self._queued_alerts.setdefault(message.chat_id, [])
+            queued.append(message)
+            if len(queued) > self.digest_threshold:
+                self._merge_digest(message.chat_id)
+        return future
+
+    def send_message(self, chat_id, text, priority=PRIORITY_ALERT, digest_line=None, **fields):
+        """Queue a Markdown sendMessage."""
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown", **fields}
+        return self.send("sendMessage", payload, priority, digest_line)
+
+    def _push(self, message):
+        heapq.heappush(self._heap, message)
+        self._wakeup.set()
+
+    def _merge_digest(self, chat_id):
+        queued = self._queued_alerts.pop(chat_id)
+        lines = []
+        for message in queued:
+            message.merged = True
+            lines.extend(message.digest_lines)
+            # Follow-up calls (replies, photos) are skipped for merged alerts
+            message.future.set_result(None)
+        self.merged += len(queued)
+        self.digests += 1
+        header = f"🔔 {len(lines)} new tokens while alerts were backed up:\n"
+        text = header
+        for index, line in enumerate(lines):
+            if len(text) + len(line) + 40 > TELEGRAM_MESSAGE_LIMIT:
+                text += f"...and {len(lines) - index} more"
+                break
+            text += f"• {line}\n"
+        digest = OutboundMessage(
+            "sendMessage",
+            {"chat_id": queued[0].payload["chat_id"], "text": text, "parse_mode": "Markdown"},
+            PRIORITY_ALERT,
+            min(message.seq for message in queued),  # keeps the place of the oldest merged alert
+            asyncio.get_running_loop().create_future(),
+            lines,
+        )
+        self._push(digest)
+        # The digest can itself be folded into a larger one if the backlog keeps growing
+        self._queued_alerts[chat_id] = [digest]
+
+    def _chat_limiter(self, chat_id):
+        limiter = self._chat_limiters.get(chat_id)
+        if limiter is None:
+            if len(self._chat_limiters) > 10000:
+                self._chat_limiters = {
+                    key: value for key, value in self._chat_limiters.items() if value.delay() > 0
+                }
+            if chat_id.startswith("-"):
+                limiter = RateLimiter(self.group_rate_per_minute, per=60, burst=1)
+            else:
+                limiter = RateLimiter(self.chat_rate, burst=1)
+            self._chat_limiters[chat_id] = limiter
+        return limiter
+
+    def _next_ready(self):
+        """Pop the highest-priority message whose chat may be sent to now; else (None, wait seconds)."""
+        now = time.monotonic()
+        deferred = []
+        wait = None
+        chosen = None
+        while self._heap:
+            message = heapq.heappop(self._heap)
+            if message.merged:
+                continue
+            chat_id = message.chat_id
+            if chat_id in self._busy_chats:
+                deferred.append(message)
+                continue
+            delay = max(self._blocked_until.get(chat_id, 0) - now, self._chat_limiter(chat_id).delay())
+            if delay > 0:
+                deferred.append(message)
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            self._chat_limiter(chat_id).try_acquire()
+            chosen = message
+            break
+        for message in deferred:
+            heapq.heappush(self._heap, message)
+        return chosen, wait
+
+    async def _run(self):
+        while True:
+            message, wait = self._next_ready()
+            if message is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._busy_chats.add(message.chat_id)
+            if message.digest_lines is not None:
+                queued = self._queued_alerts.get(message.chat_id, [])
+                if message in queued:
+                    queued.remove(message)
+            await self._slots.acquire()
+            await self._global_limiter.acquire()
+            task = asyncio.create_task(self._deliver(message))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, message):
+        chat_id = message.chat_id
+        retry_delay = None
+        throttled = False
+        rejected = None
+        try:
+            message.attempts += 1
+            session = get_session()
+            started = time.monotonic()
+            async with session.post(f"{self.base_url}/{message.method}", json=message.payload) as response:
+                status = response.status
+                data = await response.json(content_type=None)
+            metrics.observe("telegram_send", time.monotonic() - started)
+            if status == 200 and data.get("ok"):
+                wait = started - message.queued_at
+                metrics.observe("telegram_queue_wait", wait)
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self.sent += 1
+                message.future.set_result(data.get("result"))
+                return
+            if status == 429:
+                self.rate_limited += 1
+                throttled = True
+                retry_delay = data.get("parameters", {}).get("retry_after", 1)
+            elif status >= 500:
+                retry_delay = 2 ** message.attempts
+            else:
+                rejected = (data.get("error_code", status), data.get("description", ""))
+                print(f"Telegram {message.method} to {chat_id} failed: {rejected[1] or status}")
+        except asyncio.CancelledError:
+            if not message.future.done():
+                message.future.set_result(None)
+            raise
+        except Exception as e:
+            print(f"Telegram {message.method} to {chat_id} failed: {e}")
+            retry_delay = 2 ** message.attempts
+        finally:
+            self._busy_chats.discard(chat_id)
+            self._slots.release()
+            self._wakeup.set()
+
+        # 429s are always retried after retry_after; other transient errors up to max_attempts
+        if retry_delay is not None and (throttled or message.attempts < self.max_attempts):
+            self.retried += 1
+            # Blocking the whole chat keeps its later messages behind this one
+            self._blocked_until[chat_id] = time.monotonic() + retry_delay
+            self._push(message)
+            return
+        self.failed += 1
+        message.future.set_result(None)
+        if rejected is not None:
+            for listener in self._failure_listeners:
+                try:
+                    listener(message.payload["chat_id"], *rejected)
+                except Exception as e:
+                    print(f"Error in Telegram failure listener for {chat_id}: {e}")
+
+    def stats(self):
+        """Return queue depth by priority, delivery counters and queueing delay."""
+        depth = {}
+        for message in self._heap:
+            if not message.merged:
+                depth[message.priority] = depth.get(message.priority, 0) + 1
+        return {
+            "depth": sum(depth.values()),
+            "depth_by_priority": depth,
+            "in_flight": len(self._in_flight),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+            "digests": self.digests,
+            "merged_alerts": self.merged,
+            "avg_wait_seconds": self._wait_total / self.sent if self.sent else 0.0,
+            "max_wait_seconds": self._wait_max,
+        }
+
+telegram = TelegramDispatcher()
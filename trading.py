@@ -1,79 +1,193 @@
 import time
 from solana.rpc.async_api import AsyncClient
 from solana.transaction import Transaction
-from solana.system_program import TransferParams, transfer
 from solders.keypair import Keypair
 from jupiter_python_sdk.jupiter import Jupiter
-from config import PRIVATE_KEY, RPC_ENDPOINT, BUY_AMOUNT, TRANSACTION_FEE, NUM_BUYS, ADMIN_USER_ID
+from config import PRIVATE_KEY, RPC_ENDPOINT, BUY_AMOUNT, TRANSACTION_FEE, NUM_BUYS, ADMIN_USER_ID, VERDICT_TTL_SECONDS
+from config import BUY_SLIPPAGE_BPS, COMPUTE_UNIT_LIMIT, COMPUTE_UNIT_PRICE_MICRO_LAMPORTS
+from config import JOURNAL_PATH, PAPER_TRADING, PAPER_JOURNAL_PATH
 from filters import validate_token
+from pumpfun import fetch_bonding_curve, build_buy_transaction
+from curve_state import curve_table
+from prefetch import ChainStatePrefetcher
+from sender import TransactionSender
+from journal import TradeJournal
+from simulator import PaperExchange
+import metrics
 
 class TradingBot:
     def __init__(self):
         self.client = AsyncClient(RPC_ENDPOINT)
-        self.keypair = Keypair.from_base58_string(PRIVATE_KEY)
-        self.jupiter = Jupiter(rpc_endpoint=RPC_ENDPOINT, private_key=PRIVATE_KEY)
-        self.buys_completed = 0
-        self.buy_records = []
-        self.last_cycle_time = time.time()
-
-    async def buy_token(self, token_address, user_id=None, platform="pumpfun"):
-        """Execute a buy transaction for a token on Pump.fun or Raydium."""
+        # Paper trading fills buys locally, so it needs no funded wallet and keeps its own journal
+        self.paper = PaperExchange() if PAPER_TRADING else None
+        self.keypair = Keypair.from_base58_string(PRIVATE_KEY) if PRIVATE_KEY or not PAPER_TRADING else Keypair()
+        self.jupiter = None if PAPER_TRADING else Jupiter(rpc_endpoint=RPC_ENDPOINT, private_key=PRIVATE_KEY)
+        # Cycle counters and this cycle's buys survive restarts through the journal
+        self.journal = TradeJournal(PAPER_JOURNAL_PATH if PAPER_TRADING else JOURNAL_PATH)
+        state = self.journal.recover()
+        self.cycle_id = state["cycle_id"]
+        self.previous_cycle_id = None
+        self.buys_completed = state["buys_completed"]
+        # Buys sent but not yet confirmed still count against NUM_BUYS
+        self.buys_pending = 0
+        self.buy_records = state["buy_records"]
+        self.last_cycle_time = state["cycle_started_at"]
+        self.chain_state = ChainStatePrefetcher(self.keypair.pubkey())
+        self.sender = TransactionSender()
+
+    def start(self):
+        """Start background prefetching of blockhash, priority fees and wallet balance."""
+        self.chain_state.start()
+        self.journal.start()
+
+    async def stop(self):
+        await self.chain_state.stop()
+        await self.journal.close()
+        await self.client.close()
+
+    async def buy_token(self, token_address, user_id=None, platform="pumpfun", verdict=None):
+        """Execute a buy transaction for a token on Pump.fun or Raydium.
+
+        A still-fresh passing verdict (passed in, or cached by validate_token) skips re-validation.
+        """
         if user_id and str(user_id) != ADMIN_USER_ID:
             print("Only admin can buy tokens.")
             return False
 
-        if self.buys_completed >= NUM_BUYS:
+        if self.buys_completed + self.buys_pending >= NUM_BUYS:
             print("Reached maximum buys for this cycle.")
             return False
 
-        if not await validate_token(token_address, self.client, platform):
+        if self.paper is not None and platform != "pumpfun":
+            print("Paper trading only simulates bonding-curve buys.")
+            return False
+
+        if verdict is None or verdict.token_address != token_address or not verdict.is_fresh():
+            verdict = await validate_token(token_address, self.client, platform, max_age=VERDICT_TTL_SECONDS)
+        if not verdict:
             print(f"Token {token_address} failed validation on {platform}.")
             return False
+        metrics.mark("buy_validated")
+        # A reused verdict keeps the curve it was validated against; price from the live table when it is fresher
+        curve = curve_table.get(token_address) or verdict.bonding_curve
 
+        self.buys_pending += 1
+        start = time.monotonic()
         try:
             # Calculate total cost
             total_cost = BUY_AMOUNT + TRANSACTION_FEE
 
-            # Check wallet balance
-            balance = await self.client.get_balance(self.keypair.pubkey())
-            if balance.value / 1e9 < total_cost:
+            # Check wallet balance, from the account subscription when it is live
+            balance_lamports = self.paper.balance_lamports if self.paper is not None else self.chain_state.fresh_balance()
+            if balance_lamports is None:
+                balance_lamports = (await self.client.get_balance(self.keypair.pubkey())).value
+            if balance_lamports / 1e9 < total_cost:
                 print("Insufficient balance for buy.")
                 return False
 
-            # Execute swap via Jupiter for Raydium or Pump.fun
-            swap_result = await self.jupiter.swap(
-                input_mint="So11111111111111111111111111111111111111112",  # SOL
-                output_mint=token_address,
-                amount=int(BUY_AMOUNT * 1e9),  # SOL to lamports
-                slippage_bps=100  # 1% slippage
-            )
-
-            # Sign and send transaction
-            tx = Transaction().add(swap_result["transaction"])
-            tx_resp = await self.client.send_transaction(tx, self.keypair)
-            print(f"Buy executed for {token_address} on {platform}: {tx_resp.value}")
-
-            # Record buy details
-            self.buy_records.append({
+            if self.paper is not None:
+                tx_id = await self.paper.buy(token_address, int(BUY_AMOUNT * 1e9), curve)
+            elif platform == "pumpfun":
+                # Bonding-curve tokens are bought directly from the pump.fun program
+                tx_id = await self.buy_on_bonding_curve(token_address, curve)
+            else:
+                # Execute swap via Jupiter for Raydium
+                swap_result = await self.jupiter.swap(
+                    input_mint="So11111111111111111111111111111111111111112",  # SOL
+                    output_mint=token_address,
+                    amount=int(BUY_AMOUNT * 1e9),  # SOL to lamports
+                    slippage_bps=BUY_SLIPPAGE_BPS
+                )
+
+                # Sign locally so the swap gets the same fan-out and rebroadcast as bonding-curve buys
+                tx = Transaction().add(swap_result["transaction"])
+                blockhash, last_valid_block_height = await self._recent_blockhash()
+                tx.recent_blockhash = str(blockhash)
+                tx.sign(self.keypair)
+                signature = str(tx.signature())
+                confirmed = await self.sender.send_and_confirm(tx.serialize(), signature, last_valid_block_height)
+                tx_id = signature if confirmed else None
+
+            metrics.mark("buy_confirmed" if tx_id else "buy_unconfirmed")
+            if not tx_id:
+                print(f"Buy for {token_address} on {platform} was not confirmed.")
+                return False
+            print(f"Buy confirmed for {token_address} on {platform}: {tx_id}")
+
+            # Record buy details, only once the transaction has landed
+            record = {
                 "token_address": token_address,
                 "platform": platform,
                 "amount": BUY_AMOUNT,
                 "timestamp": time.time(),
-                "tx_id": tx_resp.value
-            })
+                "tx_id": tx_id
+            }
+            self.buy_records.append(record)
             self.buys_completed += 1
+            self.journal.record_buy(record)
 
             return True
 
         except Exception as e:
             print(f"Error executing buy for {token_address} on {platform}: {e}")
             return False
+        finally:
+            self.buys_pending -= 1
+            metrics.observe("buy_token", time.monotonic() - start)
+
+    async def _recent_blockhash(self):
+        """Return (blockhash, last_valid_block_height), prefetched when fresh, else from RPC."""
+        blockhash = self.chain_state.fresh_blockhash()
+        if blockhash is not None:
+            return blockhash, self.chain_state.last_valid_block_height
+        latest = (await self.client.get_latest_blockhash()).value
+        return latest.blockhash, latest.last_valid_block_height
+
+    async def buy_on_bonding_curve(self, token_address, state=None):
+        """Build, sign and fan out a pump.fun buy; returns the signature once confirmed, else None.
+
+        Uses the curve state from validation and the prefetched blockhash and priority fee,
+        falling back to RPC only when those are missing or stale.
+        """
+        start = time.monotonic()
+        if state is None:
+            state = await fetch_bonding_curve(self.client, token_address)
+        if state is None or state.complete:
+            raise ValueError(f"Token {token_address} has no active bonding curve")
+        blockhash, last_valid_block_height = await self._recent_blockhash()
+        priority_fee = self.chain_state.fresh_priority_fee()
+        if priority_fee is None:
+            priority_fee = COMPUTE_UNIT_PRICE_MICRO_LAMPORTS
+        tx, token_amount, max_sol_cost = build_buy_transaction(
+            self.keypair,
+            token_address,
+            state,
+            int(BUY_AMOUNT * 1e9),
+            BUY_SLIPPAGE_BPS,
+            blockhash,
+            COMPUTE_UNIT_LIMIT,
+            priority_fee,
+        )
+        signature = str(tx.signatures[0])
+        built = time.monotonic()
+        metrics.observe("buy_build", built - start)
+        metrics.mark("buy_built")
+        print(f"Buying {token_amount} base units of {token_address} for at most {max_sol_cost} lamports: {signature}")
+        confirmed = await self.sender.send_and_confirm(bytes(tx), signature, last_valid_block_height)
+        metrics.observe("buy_send_confirm", time.monotonic() - built)
+        return signature if confirmed else None
 
     async def check_cycle(self):
-        """Check if 30 days have passed to reset buy cycle."""
+        """Check if 30 days have passed to reset buy cycle.
+
+        The finished cycle's id is kept in previous_cycle_id so it can still be reported.
+        """
         current_time = time.time()
         if (current_time - self.last_cycle_time) >= 30 * 24 * 60 * 60:
+            self.previous_cycle_id = self.journal.start_cycle(current_time)
+            self.cycle_id = self.journal.cycle_id
             self.buys_completed = 0
+            self.buy_records = []
             self.last_cycle_time = current_time
             return True
         return False
\ No newline at end of file
@@ -1,98 +1,178 @@
 import asyncio
-import aiohttp
 import time
 import json
 from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed
-from solders.pubkey import Pubkey
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, ADMIN_USER_ID, RPC_ENDPOINT, PUMP_FUN_PROGRAM_ID, RAYDIUM_PROGRAM_ID
+from config import TELEGRAM_CHAT_ID, ADMIN_USER_ID, RPC_ENDPOINT, RPC_WEBSOCKET_ENDPOINTS, PUMP_FUN_PROGRAM_ID, RAYDIUM_PROGRAM_ID, INGEST_STATS_INTERVAL_SECONDS, LOG_INGEST_MODE
+from config import PUMP_FUN_API_URL, RAYDIUM_API_URL
 from filters import validate_token
+from http_client import get_session
+from telegram_dispatcher import telegram, PRIORITY_ALERT, PRIORITY_REPLY
+from market_data import get_token_pairs
+from log_decoder import decode_new_token_event, matches_new_token
+from ingest import IngestQueue
+from dedup import SeenSet
+import metrics
+from creator_index import get_creator_index
+from curve_state import curve_table
+from subscriptions import LogSubscriptionRacer, RawLogSubscriptionRacer
+from subscribers import get_subscribers
+from webhook import UpdateReceiver
+
+# Mints already handled on any platform or subscription; constant memory over long uptimes
+seen_mints = SeenSet()
+
+# Chats that sent /start; chats that blocked the bot are pruned as their sends fail
+def _prune_failed_chat(chat_id, error_code, description):
+    get_subscribers().prune_failed_chat(chat_id, error_code, description)
+
+telegram.add_failure_listener(_prune_failed_chat)
 
 async def monitor_new_tokens(callback, chat_id=TELEGRAM_CHAT_ID):
     """Monitor new tokens on Pump.fun and Raydium via WebSocket."""
     async with AsyncClient(RPC_ENDPOINT) as client:
-        # Monitor Pump.fun
-        asyncio.create_task(monitor_program(PUMP_FUN_PROGRAM_ID, "pumpfun", callback, client, chat_id))
-        # Monitor Raydium
-        asyncio.create_task(monitor_program(RAYDIUM_PROGRAM_ID, "raydium", callback, client, chat_id))
-        # Keep running
-        await asyncio.Event().wait()
+        queue = None
+
+        async def handle_event(event):
+            await process_log_event(event, queue, callback, client, chat_id)
+
+        # Same Pump.fun and Raydium subscriptions on every websocket endpoint; first arrival wins
+        racer_class = RawLogSubscriptionRacer if LOG_INGEST_MODE == "raw" else LogSubscriptionRacer
+        racer = racer_class(
+            RPC_WEBSOCKET_ENDPOINTS,
+            [(PUMP_FUN_PROGRAM_ID, "pumpfun"), (RAYDIUM_PROGRAM_ID, "raydium")],
+            lambda platform, signature, logs, err: monitor_program(queue, platform, signature, logs, err),
+        )
+        queue = IngestQueue(handle_event)
+        queue.start()
+        stats_task = asyncio.create_task(log_ingest_stats(queue, racer))
+        try:
+            await racer.run_forever()
+        finally:
+            stats_task.cancel()
+            await racer.stop()
+            await queue.stop()
+            print(f"Ingest queue stats: {queue.stats()}")
+            print(f"Log subscription stats: {racer.stats()}")
+            print(f"Seen mint stats: {seen_mints.stats()}")
+
+def monitor_program(queue, platform, signature, logs, err=None):
+    """Enqueue a program log notification if it is a successful new-token transaction."""
+    if err is not None:
+        return
+    received_at = time.monotonic()
+    if platform == "pumpfun":
+        # Creates and trades keep the live curve table current; decoding is local and cheap
+        curve_table.apply_logs(logs)
+    if matches_new_token(platform, logs):
+        # Decoding, validation and buying happen on the worker pool, never inline here
+        queue.put({"logs": logs, "signature": signature, "platform": platform, "received_at": received_at}, key=signature)
+    metrics.observe("monitor_program", time.monotonic() - received_at)
+
+async def process_log_event(event, queue, callback, client, chat_id):
+    """Decode, validate and hand a queued log event to the new-token callback."""
+    platform = event["platform"]
+    # Stage timings run from the websocket notification; buy and notify paths mark the same trace
+    trace = metrics.start_trace(event["signature"], event.get("received_at"))
+    trace.mark("queue_wait")
+    token_event = await extract_token_event(event["logs"], platform, event["signature"])
+    trace.mark("extract_token_address")
+    if not token_event:
+        trace.finish("undecoded")
+        return
+    # Creates and migrations both feed the creator index, before migrations are deduplicated away
+    get_creator_index().record_event(token_event)
+    token_address = token_event["mint"]
+    trace.fields.update(mint=token_address, platform=platform)
+    # Migrations and repeated log lines resolve to the same mint; drop them before validation.
+    # Raydium mints only come out of getTransaction, so those duplicates have already paid that call.
+    if not seen_mints.add(token_address):
+        trace.finish("duplicate")
+        return
+    # Dates the token if the curve table missed its create: the fetched blockTime, else when the event reached us
+    received_at = event.get("received_at")
+    created_at = token_event.get("created_at") or (time.time() - (time.monotonic() - received_at) if received_at else time.time())
+    verdict = await validate_token(token_address, client, platform, created_at=created_at)
+    trace.mark("validate_token")
+    if not verdict:
+        trace.fields["failed_check"] = verdict.failed_check
+        trace.finish("rejected")
+        return
+    # The buy path reuses this verdict while it is fresh instead of validating again
+    await callback(token_address, chat_id, platform, verdict)
+    trace.mark("callback")
+    trace.finish("passed")
 
-async def monitor_program(program_id_str, platform, callback, client, chat_id):
-    """Monitor a Solana program for new token events."""
-    program_id = Pubkey.from_string(program_id_str)
-    async for response in client.logs_subscribe(
-        program_id=program_id,
-        commitment=Confirmed
-    ):
-        for log in response.value.logs:
-            trigger = "initialize" if platform == "pumpfun" else "initialize2"
-            if trigger in log.lower():
-                token_address = await extract_token_address(log, platform)
-                if token_address and await validate_token(token_address, client, platform):
-                    await callback(token_address, chat_id, platform)
+async def log_ingest_stats(queue, racer, interval=INGEST_STATS_INTERVAL_SECONDS):
+    """Periodically print ingest queue depth, event age and per-endpoint delivery stats."""
+    while True:
+        await asyncio.sleep(interval)
+        print(f"Ingest queue stats: {queue.stats()}")
+        print(f"Log subscription stats: {racer.stats()}")
 
-async def extract_token_address(log, platform):
-    """Extract token mint address from logs."""
+async def extract_token_event(logs, platform, signature=None):
+    """Decode the new-token event (mint, creator or pool) from a transaction's logs."""
     try:
-        async with aiohttp.ClientSession() as session:
-            if platform == "pumpfun":
-                async with session.get("https://api.pump.fun/tokens/latest") as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("mint_address", None)
-            elif platform == "raydium":
-                async with session.get("https://api.raydium.io/v2/amm/pools") as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("tokens", [{}])[0].get("mint_address", None)
+        return await decode_new_token_event(logs, platform, signature)
     except Exception as e:
         print(f"Error extracting token address for {platform}: {e}")
     return None
 
 async def fetch_token_info(token_address, platform):
-    """Fetch token info from DexScreener or platform API."""
+    """Fetch token info from the live curve table, DexScreener or platform API."""
+    market = curve_table.market(token_address) if platform == "pumpfun" else None
+    if market is not None:
+        return {
+            "name": market["name"] or "Unknown Token",
+            "symbol": market["symbol"] or "UNKNOWN",
+            "contract_address": token_address,
+            "price": market["price_usd"],
+            "market_cap": market["market_cap_usd"],
+            "volume": market["volume_usd"],
+            "liquidity": market["liquidity_usd"],
+            "chain": "Solana",
+            "platform": platform,
+            "listed_time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(market["created_at"])) if market["created_at"] else "Unknown",
+            "image_url": None,
+            "dex_paid": False
+        }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.dexscreener.com/latest/dex/tokens/{token_address}") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    pairs = data.get("pairs", [])
-                    if pairs:
-                        pair = pairs[0]
-                        return {
-                            "name": pair["baseToken"]["name"],
-                            "symbol": pair["baseToken"]["symbol"],
-                            "contract_address": token_address,
-                            "price": float(pair.get("priceUsd", 0.0001)),
-                            "market_cap": float(pair.get("marketCap", 1000000)),
-                            "volume": float(pair.get("volume", {}).get("h24", 50000)),
-                            "liquidity": float(pair.get("liquidity", {}).get("usd", 200000)),
-                            "chain": "Solana",
-                            "platform": platform,
-                            "listed_time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(pair.get("pairCreatedAt", time.time() * 1000) / 1000)),
-                            "image_url": pair.get("info", {}).get("imageUrl", None),
-                            "dex_paid": pair.get("dexPaid", platform == "raydium")  # Raydium tokens are DEX paid
-                        }
-            # Fallback to platform API
-            api_url = f"https://api.pump.fun/tokens/{token_address}" if platform == "pumpfun" else f"https://api.raydium.io/v2/amm/pools/{token_address}"
-            async with session.get(api_url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {
-                        "name": data.get("name", "Unknown Token"),
-                        "symbol": data.get("symbol", "UNKNOWN"),
-                        "contract_address": token_address,
-                        "price": float(data.get("price", 0.0001)),
-                        "market_cap": float(data.get("market_cap", 1000000)),
-                        "volume": float(data.get("volume", 50000)),
-                        "liquidity": float(data.get("liquidity", 200000)),
-                        "chain": "Solana",
-                        "platform": platform,
-                        "listed_time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
-                        "image_url": data.get("image_url", None),
-                        "dex_paid": data.get("dex_paid", platform == "raydium")
-                    }
+        pairs = await get_token_pairs(token_address)
+        if pairs:
+            pair = pairs[0]
+            return {
+                "name": pair["baseToken"]["name"],
+                "symbol": pair["baseToken"]["symbol"],
+                "contract_address": token_address,
+                "price": float(pair.get("priceUsd", 0.0001)),
+                "market_cap": float(pair.get("marketCap", 1000000)),
+                "volume": float(pair.get("volume", {}).get("h24", 50000)),
+                "liquidity": float(pair.get("liquidity", {}).get("usd", 200000)),
+                "chain": "Solana",
+                "platform": platform,
+                "listed_time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(pair.get("pairCreatedAt", time.time() * 1000) / 1000)),
+                "image_url": pair.get("info", {}).get("imageUrl", None),
+                "dex_paid": pair.get("dexPaid", platform == "raydium")  # Raydium tokens are DEX paid
+            }
+        # Fallback to platform API
+        session = get_session()
+        api_url = f"{PUMP_FUN_API_URL}/tokens/{token_address}" if platform == "pumpfun" else f"{RAYDIUM_API_URL}/v2/amm/pools/{token_address}"
+        async with session.get(api_url) as response:
+            if response.status == 200:
+                data = await response.json()
+                return {
+                    "name": data.get("name", "Unknown Token"),
+                    "symbol": data.get("symbol", "UNKNOWN"),
+                    "contract_address": token_address,
+                    "price": float(data.get("price", 0.0001)),
+                    "market_cap": float(data.get("market_cap", 1000000)),
+                    "volume": float(data.get("volume", 50000)),
+                    "liquidity": float(data.get("liquidity", 200000)),
+                    "chain": "Solana",
+                    "platform": platform,
+                    "listed_time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+                    "image_url": data.get("image_url", None),
+                    "dex_paid": data.get("dex_paid", platform == "raydium")
+                }
     except Exception as e:
         print(f"Error fetching token info for {token_address} on {platform}: {e}")
     return {
@@ -115,11 +195,11 @@ async def is_dex_paid(token_address, platform):
     if platform == "raydium":
         return True  # Raydium tokens are inherently DEX paid
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.pump.fun/tokens/{token_address}/status") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("dex_paid", False)
+        session = get_session()
+        async with session.get(f"{PUMP_FUN_API_URL}/tokens/{token_address}/status") as response:
+            if response.status == 200:
+                data = await response.json()
+                return data.get("dex_paid", False)
     except Exception as e:
         print(f"Error checking DEX payment for {token_address} on {platform}: {e}")
     return False
@@ -139,141 +219,119 @@ async def format_token_info(token_info):
     )
 
 async def send_token_notification(token_address, chat_id, platform):
-    """Send Telegram notification for a new token."""
-    async with aiohttp.ClientSession() as session:
-        token_info = await fetch_token_info(token_address, platform)
-        text = await format_token_info(token_info)
-        ca_text = f"CA📃: `{token_info['contract_address']}`"
-        report_text = f"{text}\n\n{ca_text}\n\nOther users can send /start to get reports of new tokens and other functions!"
+    """Render a new-token alert once and queue it for the main chat and every subscriber."""
+    token_info = await fetch_token_info(token_address, platform)
+    text = await format_token_info(token_info)
+    ca_text = f"CA📃: `{token_info['contract_address']}`"
+    report_text = f"{text}\n\n{ca_text}\n\nOther users can send /start to get reports of new tokens and other functions!"
 
-        if await is_dex_paid(token_address, platform):
-            market_cap = token_info["market_cap"]
-            report_text += f"\n\n✅ DEX Paid! Market Cap: ${market_cap:,.2f}"
+    if await is_dex_paid(token_address, platform):
+        market_cap = token_info["market_cap"]
+        report_text += f"\n\n✅ DEX Paid! Market Cap: ${market_cap:,.2f}"
 
-        reply_markup = {
-            "inline_keyboard": [
-                [
-                    {"text": "5x Report", "callback_data": f"report_5x_{token_address}_{platform}"},
-                    {"text": "10x Report", "callback_data": f"report_10x_{token_address}_{platform}"},
-                    {"text": "15x Report", "callback_data": f"report_15x_{token_address}_{platform}"}
-                ],
-                [
-                    {"text": "20x Report", "callback_data": f"report_20x_{token_address}_{platform}"},
-                    {"text": "30x Report", "callback_data": f"report_30x_{token_address}_{platform}"},
-                    {"text": "50x Report", "callback_data": f"report_50x_{token_address}_{platform}"}
-                ]
+    reply_markup = {
+        "inline_keyboard": [
+            [
+                {"text": "5x Report", "callback_data": f"report_5x_{token_address}_{platform}"},
+                {"text": "10x Report", "callback_data": f"report_10x_{token_address}_{platform}"},
+                {"text": "15x Report", "callback_data": f"report_15x_{token_address}_{platform}"}
+            ],
+            [
+                {"text": "20x Report", "callback_data": f"report_20x_{token_address}_{platform}"},
+                {"text": "30x Report", "callback_data": f"report_30x_{token_address}_{platform}"},
+                {"text": "50x Report", "callback_data": f"report_50x_{token_address}_{platform}"}
             ]
-        }
+        ]
+    }
 
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "Markdown"
-        }
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                message_data = await response.json()
-                message_id = message_data["result"]["message_id"]
+    reply_markup = json.dumps(reply_markup)
+    metrics.mark("notification_rendered")
+    digest_line = f"{token_info['name']} ({token_info['symbol']}) on {platform.capitalize()}: `{token_address}`"
 
-                report_payload = {
-                    "chat_id": chat_id,
-                    "text": report_text,
-                    "parse_mode": "Markdown",
-                    "reply_to_message_id": message_id,
-                    "reply_markup": json.dumps(reply_markup)
-                }
-                if token_info["image_url"]:
-                    photo_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-                    photo_payload = {
-                        "chat_id": chat_id,
-                        "photo": token_info["image_url"],
-                        "caption": report_text,
-                        "parse_mode": "Markdown",
-                        "reply_to_message_id": message_id,
-                        "reply_markup": json.dumps(reply_markup)
-                    }
-                    async with session.post(photo_url, json=photo_payload) as photo_response:
-                        if photo_response.status == 200:
-                            return
-                async with session.post(url, json=report_payload) as report_response:
-                    if report_response.status == 200:
-                        return
-            print(f"Failed to send notification: {await response.text()}")
+    futures = []
+    for recipient in dict.fromkeys([str(chat_id), *get_subscribers()]):
+        future = telegram.send_message(recipient, text, PRIORITY_ALERT, digest_line=digest_line)
+        # The report with the buttons is a reply, so it can only be queued once the first message is out
+        future.add_done_callback(
+            lambda done, recipient=recipient: _send_token_report(done, recipient, token_info["image_url"], report_text, reply_markup)
+        )
+        futures.append(future)
+    get_subscribers().track_broadcast(futures)
+
+def _send_token_report(message_future, chat_id, image_url, report_text, reply_markup):
+    """Queue the reply carrying the token report, as a photo caption when there is an image."""
+    if message_future.cancelled() or message_future.result() is None:
+        return  # Not delivered, or folded into a digest
+    message_id = message_future.result()["message_id"]
+    fields = {"reply_to_message_id": message_id, "reply_markup": reply_markup}
+    if not image_url:
+        telegram.send_message(chat_id, report_text, PRIORITY_ALERT, **fields)
+        return
+    photo_future = telegram.send("sendPhoto", {
+        "chat_id": chat_id,
+        "photo": image_url,
+        "caption": report_text,
+        "parse_mode": "Markdown",
+        **fields
+    }, PRIORITY_ALERT)
+
+    def fall_back_to_text(done):
+        if not done.cancelled() and done.result() is None:
+            telegram.send_message(chat_id, report_text, PRIORITY_ALERT, **fields)
+
+    photo_future.add_done_callback(fall_back_to_text)
 
 async def handle_callback_query(query, chat_id):
     """Handle inline button callbacks for multiplier reports."""
-    async with aiohttp.ClientSession() as session:
-        data = query["data"]
-        parts = data.split("_")
-        multiplier = parts[1]
-        token_address = parts[2]
-        platform = parts[3]
+    data = query["data"]
+    parts = data.split("_")
+    multiplier = parts[1]
+    token_address = parts[2]
+    platform = parts[3]
 
-        token_info = await fetch_token_info(token_address, platform)
-        current_price = token_info["price"]
-        target_price = current_price * float(multiplier.replace("x", ""))
+    token_info = await fetch_token_info(token_address, platform)
+    current_price = token_info["price"]
+    target_price = current_price * float(multiplier.replace("x", ""))
 
-        report_text = (
-            f"{multiplier} Report for {token_info['name']} ({token_info['symbol']}) on {platform.capitalize()}:\n"
-            f"Current Price: ${current_price:.8f}\n"
-            f"Target {multiplier} Price: ${target_price:.8f}\n"
-            f"Contract Address: `{token_info['contract_address']}`\n"
-            f"Other users can send /start to get reports of new tokens and other functions!"
-        )
+    report_text = (
+        f"{multiplier} Report for {token_info['name']} ({token_info['symbol']}) on {platform.capitalize()}:\n"
+        f"Current Price: ${current_price:.8f}\n"
+        f"Target {multiplier} Price: ${target_price:.8f}\n"
+        f"Contract Address: `{token_info['contract_address']}`\n"
+        f"Other users can send /start to get reports of new tokens and other functions!"
+    )
 
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": report_text,
-            "parse_mode": "Markdown"
-        }
-        async with session.post(url, json=payload) as response:
-            if response.status != 200:
-                print(f"Failed to send callback response: {await response.text()}")
+    telegram.send_message(chat_id, report_text, PRIORITY_REPLY)
 
 async def handle_start_command(chat_id):
     """Handle /start command."""
-    async with aiohttp.ClientSession() as session:
-        message = (
-            "Welcome to the Solana PumpFun & Raydium Sniper Bot! 🚀\n"
-            "Receive reports of new tokens on Pump.fun and Raydium.\n"
-            f"{'As the admin, you can also buy tokens through the bot.' if str(chat_id) == str(ADMIN_USER_ID) else 'Note: Token purchasing is available only to the admin.'}"
-        )
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
-        async with session.post(url, json=payload) as response:
-            if response.status != 200:
-                print(f"Failed to send start message: {await response.text()}")
+    get_subscribers().add(chat_id)
+    message = (
+        "Welcome to the Solana PumpFun & Raydium Sniper Bot! 🚀\n"
+        "Receive reports of new tokens on Pump.fun and Raydium.\n"
+        f"{'As the admin, you can also buy tokens through the bot.' if str(chat_id) == str(ADMIN_USER_ID) else 'Note: Token purchasing is available only to the admin.'}\n"
+        "Send /stop to stop receiving reports."
+    )
+    telegram.send_message(chat_id, message, PRIORITY_REPLY)
 
-async def telegram_webhook():
-    """Handle Telegram webhook updates."""
-    async with aiohttp.ClientSession() as session:
-        webhook_url = os.getenv("WEBHOOK_URL")
-        if webhook_url:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/setWebhook"
-            payload = {"url": webhook_url}
-            async with session.post(url, json=payload) as response:
-                if response.status != 200:
-                    print(f"Failed to set webhook: {await response.text()}")
+async def handle_stop_command(chat_id):
+    """Handle /stop command."""
+    get_subscribers().remove(chat_id)
+    telegram.send_message(chat_id, "You will no longer receive new token reports. Send /start to subscribe again.", PRIORITY_REPLY)
+
+async def handle_update(update):
+    """Route one Telegram update to its command or callback handler."""
+    message = update.get("message")
+    if message and message.get("text") == "/start":
+        await handle_start_command(message["chat"]["id"])
+    elif message and message.get("text") == "/stop":
+        await handle_stop_command(message["chat"]["id"])
+    elif "callback_query" in update:
+        chat_id = update["callback_query"]["message"]["chat"]["id"]
+        await handle_callback_query(update["callback_query"], chat_id)
 
-        offset = None
-        while True:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
-            params = {"offset": offset, "timeout": 30}
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    updates = await response.json()
-                    for update in updates.get("result", []):
-                        offset = update["update_id"] + 1
-                        if "message" in update and update["message"].get("text") == "/start":
-                            chat_id = update["message"]["chat"]["id"]
-                            await handle_start_command(chat_id)
-                        elif "callback_query" in update:
-                            chat_id = update["callback_query"]["message"]["chat"]["id"]
-                            await handle_callback_query(update["callback_query"], chat_id)
-            await asyncio.sleep(1)
\ No newline at end of file
+update_receiver = UpdateReceiver(handle_update)
+
+async def telegram_webhook():
+    """Handle Telegram updates via the webhook server, or long polling without WEBHOOK_URL."""
+    await update_receiver.run()
@@ -0,0 +1,147 @@
+import asyncio
+import hmac
+import json
+import secrets
+import aiohttp
+from aiohttp import web
+from http_client import get_session
+from ingest import IngestQueue, OVERFLOW_DROP_OLDEST
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_API_URL,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_LISTEN_HOST,
+    WEBHOOK_LISTEN_PORT,
+    WEBHOOK_PATH,
+    TELEGRAM_UPDATE_WORKERS,
+    TELEGRAM_UPDATE_QUEUE_SIZE,
+)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+class UpdateReceiver:
+    """Receives Telegram updates and hands them to a bounded pool of handler workers.
+
+    With WEBHOOK_URL set it runs an aiohttp.web server that checks Telegram's secret
+    token header; otherwise it falls back to long polling getUpdates. Callback queries
+    are answered as soon as they arrive, before their handler runs.
+    """
+
+    def __init__(self, handler, url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET_TOKEN,
+                 host=WEBHOOK_LISTEN_HOST, port=WEBHOOK_LISTEN_PORT, path=WEBHOOK_PATH,
+                 workers=TELEGRAM_UPDATE_WORKERS, queue_size=TELEGRAM_UPDATE_QUEUE_SIZE):
+        self.url = url
+        # Telegram echoes whatever secret we register, so a random one works when none is configured
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.base_url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}"
+        # Update ids are the dedup key, so Telegram's webhook retries are handled once
+        self.queue = IngestQueue(handler, maxsize=queue_size, workers=workers,
+                                 overflow_policy=OVERFLOW_DROP_OLDEST, max_event_age=0)
+        self.mode = "webhook" if url else "polling"
+        self.rejected = 0
+        self.callbacks_answered = 0
+        self._runner = None
+        self._answer_tasks = set()
+
+    async def run(self):
+        """Receive updates until cancelled."""
+        self.queue.start()
+        try:
+            if self.mode == "webhook":
+                await self._serve()
+            else:
+                await self._poll()
+        finally:
+            if self._runner is not None:
+                await self._runner.cleanup()
+                self._runner = None
+            await self.queue.stop()
+
+    def _enqueue(self, update):
+        update_id = update.get("update_id")
+        self.queue.put(update, key=None if update_id is None else str(update_id))
+
+    async def _handle_webhook(self, request):
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            self.rejected += 1
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        self._enqueue(update)
+        callback_query = update.get("callback_query")
+        if callback_query:
+            # Answering in the webhook response stops the button spinner without another API call
+            self.callbacks_answered += 1
+            return web.json_response({"method": "answerCallbackQuery", "callback_query_id": callback_query["id"]})
+        return web.Response()
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_post(self.path, self._handle_webhook)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Telegram webhook listening on {self.host}:{self.port}{self.path}")
+
+        session = get_session()
+        payload = {"url": self.url, "secret_token": self.secret_token, "allowed_updates": ALLOWED_UPDATES}
+        async with session.post(f"{self.base_url}/setWebhook", json=payload) as response:
+            if response.status != 200:
+                print(f"Failed to set webhook: {await response.text()}")
+        await asyncio.Event().wait()
+
+    async def _answer_callback_query(self, callback_query_id):
+        try:
+            session = get_session()
+            async with session.post(f"{self.base_url}/answerCallbackQuery", json={"callback_query_id": callback_query_id}) as response:
+                if response.status == 200:
+                    self.callbacks_answered += 1
+                else:
+                    print(f"Failed to answer callback query: {await response.text()}")
+        except Exception as e:
+            print(f"Failed to answer callback query: {e}")
+
+    async def _poll(self):
+        session = get_session()
+        # getUpdates is refused while a webhook is registered
+        async with session.post(f"{self.base_url}/deleteWebhook") as response:
+            if response.status != 200:
+                print(f"Failed to delete webhook: {await response.text()}")
+        print("Telegram updates: long polling")
+
+        offset = None
+        while True:
+            params = {"timeout": 30, "allowed_updates": json.dumps(ALLOWED_UPDATES)}
+            if offset is not None:
+                params["offset"] = offset
+            try:
+                async with session.get(f"{self.base_url}/getUpdates", params=params, timeout=aiohttp.ClientTimeout(total=40)) as response:
+                    if response.status != 200:
+                        print(f"getUpdates failed: {await response.text()}")
+                        await asyncio.sleep(1)
+                        continue
+                    updates = await response.json()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates.get("result", []):
+                offset = update["update_id"] + 1
+                callback_query = update.get("callback_query")
+                if callback_query:
+                    task = asyncio.create_task(self._answer_callback_query(callback_query["id"]))
+                    self._answer_tasks.add(task)
+                    task.add_done_callback(self._answer_tasks.discard)
+                self._enqueue(update)
+
+    def stats(self):
+        return {"mode": self.mode, "rejected": self.rejected, "callbacks_answered": self.callbacks_answered, **self.queue.stats()}